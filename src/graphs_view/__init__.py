@@ -1,160 +1,38 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-import multiprocessing
-import queue
+# first of all: the profile starts when it is imported, so --startup-profile
+# counts the Qt, numpy and package imports below
+from .startup_profile import startup_profile
+import argparse
+import os
 import re
-import types
-import time
-import threading
 import signal
-import socket
+import tempfile
 from PyQt5 import QtWidgets, QtCore, QtGui
-import pyqtgraph
-import serial
 from .settings import Settings
+from .io_worker import IoWorker
+from .capture import CaptureWriter, INDEX_SUFFIX
+from .channel_buffer import ChannelStore
+from .ingestor import Ingestor
+from .profiler import tracer
+from .relay import Relay
+from .exporter import Exporter, BufferSource, StoreSource, CaptureSource
 from .console_frame import ConsoleFrame
 from .settings_frame import SettingFrame
 from .parameters_frame import ParametersFrame
+from .latency_frame import LatencyFrame
+from .channels_frame import ChannelsFrame
+from .recording_frame import RecordingFrame
+from .rules_frame import RulesFrame
+from .snapshot import write_snapshot, read_snapshot
 
-# SERIAL PORT READER
-
-
-def process_port_serial(in_queue, out_queue, settings):
-    try:
-        with serial.Serial(**settings['serial']) as ser:
-            is_string_parsing = settings['parsing_mode']
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-            out_queue.put((0, time.time(), b''))
-            state = types.SimpleNamespace(stop=False)
-
-            def send_proc():
-                try:
-                    while 1:
-                        data = in_queue.get()
-                        # exit
-                        if not data:
-                            break
-                        ser.write(data)
-                finally:
-                    state.stop = True
-
-            send_thread = threading.Thread(target=send_proc)
-            send_thread.start()
-
-            r_state = 0
-            # row mode
-            if not is_string_parsing:
-                while not state.stop:
-                    packet = ser.read(100)
-                    packet_time = time.time()
-                    if packet:
-                        out_queue.put((r_state, packet_time, packet))
-                        r_state = 1
-            # string parsing
-            else:
-                data = b''
-                packet_time = time.time()
-                while not state.stop:
-                    symbol = ser.read(1)
-                    # splitter detected
-                    if symbol in b'\r\n':
-                        if r_state != 1:
-                            data = data.strip()
-                            if data:
-                                packet = (r_state, packet_time, data)
-                                out_queue.put(packet)
-                            data = b''
-                        r_state = 1
-                    # collecting data
-                    else:
-                        if r_state == 1:
-                            packet_time = time.time()
-                            r_state = 2
-                        data += symbol
-            send_thread.join()
-    finally:
-        out_queue.put(None)
-
-# PROCESS PORT UDP
-
-
-def process_port_udp(in_queue, out_queue, settings):
-    try:
-        # Setup UDP socket
-        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        udp_socket.bind((
-            settings['udp']['bind_ip'],
-            settings['udp']['bind_port']))
-        udp_socket.settimeout(settings['udp']['timeout'])
-
-        # If sending data, set up destination IP and port
-        dest_ip = settings['udp']['dest_ip']
-        dest_port = settings['udp']['dest_port']
-
-        is_string_parsing = settings['parsing_mode']
-        out_queue.put((0, time.time(), b''))
-        state = types.SimpleNamespace(stop=False)
-
-        def send_proc():
-            try:
-                while 1:
-                    data = in_queue.get()
-                    # exit
-                    if not data:
-                        break
-                    udp_socket.sendto(data, (dest_ip, dest_port))
-            finally:
-                state.stop = True
-
-        send_thread = threading.Thread(target=send_proc)
-        send_thread.start()
-
-        r_state = 0
-        # row mode
-        if not is_string_parsing:
-            while not state.stop:
-                packet, __addr = udp_socket.recvfrom(1024)
-                packet_time = time.time()
-                if packet:
-                    out_queue.put((r_state, packet_time, packet))
-                    r_state = 1
-        # string parsing
-        else:
-            data = b''
-            packet_time = time.time()
-            while not state.stop:
-                try:
-                    packet, __addr = udp_socket.recvfrom(1024)
-                    for symbol in packet:
-                        # convert to bytes
-                        symbol = symbol.to_bytes(1, byteorder='big')
-                        # splitter detected
-                        if symbol in b'\r\n':
-                            if r_state != 1:
-                                data = data.strip()
-                                if data:
-                                    packet = (r_state, packet_time, data)
-                                    out_queue.put(packet)
-                                data = b''
-                            r_state = 1
-                        # collecting data
-                        else:
-                            if r_state == 1:
-                                packet_time = time.time()
-                                r_state = 2
-                            data += symbol
-                except TimeoutError:
-                    pass
-        send_thread.join()
-    finally:
-        out_queue.put(None)
-        udp_socket.close()
-
+startup_profile.mark("package import")
 
 class GraphsView(QtWidgets.QMainWindow):
     TIMEOUT = 0.5
+    # minimal raw mode read, more is read when the port has it buffered
+    RAW_BLOCK = 100
     GRAPH_WIDTH = 2
     COLOURS = [
         QtGui.QColor(QtCore.Qt.white),
@@ -174,7 +52,9 @@ class GraphsView(QtWidgets.QMainWindow):
         QtGui.QColor(QtCore.Qt.darkYellow)]
 
     UPDATE_RATE = 80  # ms
-    NEW_LINE_SIGNAL = QtCore.pyqtSignal(object)
+    # lines, times, framed
+    NEW_LINE_SIGNAL = QtCore.pyqtSignal(list, list, bool)
+    READER_EVENT_SIGNAL = QtCore.pyqtSignal(object)
     CONTROL_KEYS_SIGNAL = QtCore.pyqtSignal(int)
     CONTROL_KEYS = [
         QtCore.Qt.Key_Up,
@@ -184,6 +64,10 @@ class GraphsView(QtWidgets.QMainWindow):
         QtCore.Qt.Key_Space]
 
     SHOW_POINTS = False
+    # legend entries per plot, the channels dock lists all of them
+    MAX_LEGEND = 16
+    # s, how long the reader may take to send its spans
+    TRACE_TIMEOUT = 1.0
 
     def __init__(self):
         super().__init__()
@@ -191,14 +75,12 @@ class GraphsView(QtWidgets.QMainWindow):
         self.setWindowTitle("Graph View")
         self.points = {}
 
-        self.plot_graph = pyqtgraph.PlotWidget(self)
-        self.plot_graph.installEventFilter(self)
-        self.setCentralWidget(self.plot_graph)
-        self.plot_graph.setLabel("left", "value")
-        self.plot_graph.setLabel("bottom", "time")
-        self.plot_graph.setTitle("test curve")
-        self.plot_graph.showGrid(x=True, y=True)
-        self.legend = self.plot_graph.addLegend()
+        # imports pyqtgraph
+        from .plot_panes import PlotPanes
+        startup_profile.mark("pyqtgraph import")
+        self.plot_panes = PlotPanes(self)
+        self.plot_panes.installEventFilter(self)
+        self.setCentralWidget(self.plot_panes)
 
         self.parameters_frame = ParametersFrame()
         self.CONTROL_KEYS_SIGNAL.connect(
@@ -243,14 +125,21 @@ class GraphsView(QtWidgets.QMainWindow):
         self.settings_frame.check_box_xy_mode.toggled.connect(
             self.xy_mode_changed)
         self.curves = {}
-        self.results = {}
+        self.store = ChannelStore(
+            self.settings_frame.spin_box_max_points.value(),
+            self.settings_frame.spin_box_memory_budget.value() << 20,
+            self.settings_frame.check_box_compact.isChecked())
+        # the queue is drained here even while the drawing is paused
+        self.ingestor = Ingestor(self.store, self)
 
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.update)
         self.setWindowState(QtCore.Qt.WindowMaximized)
 
         self.console_frame = ConsoleFrame()
-        self.NEW_LINE_SIGNAL.connect(self.console_frame.on_new_line)
+        self.NEW_LINE_SIGNAL.connect(self.console_frame.on_new_lines)
+        self.console_frame.time_selected.connect(self.on_console_time_selected)
+        self.READER_EVENT_SIGNAL.connect(self.console_frame.on_reader_event)
         self.console_dock_widget = QtWidgets.QDockWidget("Console", self)
         self.console_dock_widget.setObjectName("console_dock_widget")
         self.console_dock_widget.setFeatures(
@@ -262,8 +151,69 @@ class GraphsView(QtWidgets.QMainWindow):
         self.console_dock_widget.setWidget(self.console_frame)
         self.addDockWidget(QtCore.Qt.BottomDockWidgetArea,
                            self.console_dock_widget)
+        self.latency_frame = LatencyFrame()
+        self.READER_EVENT_SIGNAL.connect(self.latency_frame.on_reader_event)
+        self.latency_dock_widget = QtWidgets.QDockWidget("Latency", self)
+        self.latency_dock_widget.setObjectName("latency_dock_widget")
+        self.latency_dock_widget.setFeatures(
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetMovable |
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.latency_dock_widget.setAllowedAreas(
+            QtCore.Qt.AllDockWidgetAreas)
+        self.latency_dock_widget.setWidget(self.latency_frame)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea,
+                           self.latency_dock_widget)
+
+        self.channels_frame = ChannelsFrame()
+        self.plot_panes.set_count(self.channels_frame.pane_count())
+        self.channels_frame.pane_count_changed.connect(self.plot_panes.set_count)
+        self.channels_frame.assignment_changed.connect(self.on_channel_panes_changed)
+        self.channels_frame.visibility_changed.connect(self.on_channel_visibility_changed)
+        self.channels_dock_widget = QtWidgets.QDockWidget("Channels", self)
+        self.channels_dock_widget.setObjectName("channels_dock_widget")
+        self.channels_dock_widget.setFeatures(
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetMovable |
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.channels_dock_widget.setAllowedAreas(
+            QtCore.Qt.AllDockWidgetAreas)
+        self.channels_dock_widget.setWidget(self.channels_frame)
+        self.addDockWidget(QtCore.Qt.LeftDockWidgetArea,
+                           self.channels_dock_widget)
+
+        self.recording_frame = RecordingFrame()
+        self.recording_dock_widget = QtWidgets.QDockWidget("Recording", self)
+        self.recording_dock_widget.setObjectName("recording_dock_widget")
+        self.recording_dock_widget.setFeatures(
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetMovable |
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.recording_dock_widget.setAllowedAreas(
+            QtCore.Qt.AllDockWidgetAreas)
+        self.recording_dock_widget.setWidget(self.recording_frame)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea,
+                           self.recording_dock_widget)
+
+        self.rules_frame = RulesFrame()
+        self.rules_frame.rules_changed.connect(self.on_rules_changed)
+        self.READER_EVENT_SIGNAL.connect(self.rules_frame.on_reader_event)
+        self.rules_dock_widget = QtWidgets.QDockWidget("Rules", self)
+        self.rules_dock_widget.setObjectName("rules_dock_widget")
+        self.rules_dock_widget.setFeatures(
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetMovable |
+            QtWidgets.QDockWidget.DockWidgetFeature.DockWidgetFloatable)
+        self.rules_dock_widget.setAllowedAreas(
+            QtCore.Qt.AllDockWidgetAreas)
+        self.rules_dock_widget.setWidget(self.rules_frame)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea,
+                           self.rules_dock_widget)
+
         self.parameters_frame.parameter_changed.connect(
             self.console_frame.send_line)
+        self.parameters_frame.parameter_value_changed.connect(
+            self.console_frame.send_line_coalesced)
+        self.console_frame.command_scheduler.set_rate(
+            self.parameters_frame.spin_box_max_rate.value())
+        self.parameters_frame.max_rate_changed.connect(
+            self.console_frame.command_scheduler.set_rate)
 
         self.file_menu = self.menuBar().addMenu("&View")
 
@@ -285,6 +235,70 @@ class GraphsView(QtWidgets.QMainWindow):
         self.show_parameters.toggled.connect(
             self.on_visible_parameters_changed)
 
+        self.show_latency = QtWidgets.QAction("Latency")
+        self.show_latency.setCheckable(True)
+        self.file_menu.addAction(self.show_latency)
+        self.show_latency.toggled.connect(
+            self.on_visible_latency_changed)
+
+        self.show_channels = QtWidgets.QAction("Channels")
+        self.show_channels.setCheckable(True)
+        self.file_menu.addAction(self.show_channels)
+        self.show_channels.toggled.connect(
+            self.on_visible_channels_changed)
+
+        self.show_recording = QtWidgets.QAction("Recording")
+        self.show_recording.setCheckable(True)
+        self.file_menu.addAction(self.show_recording)
+        self.show_recording.toggled.connect(
+            self.on_visible_recording_changed)
+
+        self.show_rules = QtWidgets.QAction("Rules")
+        self.show_rules.setCheckable(True)
+        self.file_menu.addAction(self.show_rules)
+        self.show_rules.toggled.connect(
+            self.on_visible_rules_changed)
+
+        self.data_menu = self.menuBar().addMenu("&Data")
+        self.action_export_view = QtWidgets.QAction("Export view...")
+        self.data_menu.addAction(self.action_export_view)
+        self.action_export_view.triggered.connect(self.on_export_view)
+
+        self.action_export_history = QtWidgets.QAction("Export history...")
+        self.data_menu.addAction(self.action_export_history)
+        self.action_export_history.triggered.connect(self.on_export_history)
+
+        self.action_save_recording = QtWidgets.QAction("Save recording...")
+        self.data_menu.addAction(self.action_save_recording)
+        self.action_save_recording.triggered.connect(self.on_save_recording)
+
+        self.data_menu.addSeparator()
+        self.action_save_snapshot = QtWidgets.QAction("Save snapshot...")
+        self.data_menu.addAction(self.action_save_snapshot)
+        self.action_save_snapshot.triggered.connect(self.on_save_snapshot)
+
+        self.action_open_snapshot = QtWidgets.QAction("Open snapshot...")
+        self.data_menu.addAction(self.action_open_snapshot)
+        self.action_open_snapshot.triggered.connect(self.on_open_snapshot)
+
+        self.action_keep_session = QtWidgets.QAction("Keep data across restarts")
+        self.action_keep_session.setCheckable(True)
+        keep_session = Settings.value('keep_session')
+        self.action_keep_session.setChecked(
+            int(keep_session) if keep_session is not None else 1)
+        self.action_keep_session.toggled.connect(self.on_keep_session_changed)
+        self.data_menu.addAction(self.action_keep_session)
+
+        self.data_menu.addSeparator()
+        self.action_trace = QtWidgets.QAction("Record trace")
+        self.action_trace.setCheckable(True)
+        self.action_trace.setToolTip(
+            "Record pipeline spans, unchecking saves them as a Chrome trace (chrome://tracing, Perfetto).")
+        self.data_menu.addAction(self.action_trace)
+        self.action_trace.toggled.connect(self.on_trace_changed)
+        # set by --trace, the trace is saved there on exit
+        self.trace_path = None
+
         self.help_menu = self.menuBar().addMenu("&Help")
         self.action_about = QtWidgets.QAction("About")
         self.help_menu.addAction(self.action_about)
@@ -312,9 +326,73 @@ class GraphsView(QtWidgets.QMainWindow):
             int(parameters_visible) if parameters_visible is not None else 0)
         self.on_visible_parameters_changed(self.show_parameters.isChecked())
 
-        self.process_port = None
+        latency_visible = Settings.value('latency_visible')
+        self.show_latency.setChecked(
+            int(latency_visible) if latency_visible is not None else 0)
+        self.on_visible_latency_changed(self.show_latency.isChecked())
+
+        channels_visible = Settings.value('channels_visible')
+        self.show_channels.setChecked(
+            int(channels_visible) if channels_visible is not None else 0)
+        self.on_visible_channels_changed(self.show_channels.isChecked())
+
+        recording_visible = Settings.value('recording_visible')
+        self.show_recording.setChecked(
+            int(recording_visible) if recording_visible is not None else 0)
+        self.on_visible_recording_changed(self.show_recording.isChecked())
+
+        rules_visible = Settings.value('rules_visible')
+        self.show_rules.setChecked(
+            int(rules_visible) if rules_visible is not None else 0)
+        self.on_visible_rules_changed(self.show_rules.isChecked())
+
+        if self.action_keep_session.isChecked() and os.path.exists(self.session_path()):
+            QtCore.QTimer.singleShot(0, lambda: self.restore_snapshot(self.session_path()))
+
+        self.io_worker = None
+        self.port_kind = None
+        self.port_session = None
         self.in_queue = None
         self.out_queue = None
+        # the reader process is started before it is needed
+        QtCore.QTimer.singleShot(0, self.start_io_worker)
+        self.ingestor.lines_received.connect(self.on_lines_received)
+        self.ingestor.event_received.connect(self.on_reader_event)
+        self.ingestor.start()
+        self.settings_frame.combo_box_speed.currentIndexChanged.connect(
+            self.reconfigure_port)
+        self.settings_frame.combo_box_parser.currentIndexChanged.connect(
+            self.reconfigure_port)
+        self.settings_frame.group_box_line_parsing.toggled.connect(
+            self.reconfigure_port)
+
+        self.dropped = 0
+        self.label_dropped = QtWidgets.QLabel()
+        self.label_dropped.setToolTip(
+            "Packets dropped by the reader because the display did not keep up.")
+        self.statusBar().addPermanentWidget(self.label_dropped)
+        self.label_socket = QtWidgets.QLabel()
+        self.label_socket.setToolTip(
+            "Datagrams dropped by the kernel because the socket buffer was full.")
+        self.statusBar().addPermanentWidget(self.label_socket)
+        self.label_parser = QtWidgets.QLabel()
+        self.label_parser.setToolTip(
+            "Parse cost per line and lines the parser could not read.")
+        self.statusBar().addPermanentWidget(self.label_parser)
+        self.label_memory = QtWidgets.QLabel()
+        self.label_memory.setToolTip("Memory used by the samples and the budget for them.")
+        self.statusBar().addPermanentWidget(self.label_memory)
+
+        self.capture = None
+        self.exporter = None
+        self.export_progress = None
+        self.settings_frame.check_box_history.toggled.connect(
+            self.restart_capture)
+
+        self.relay = None
+        self.settings_frame.check_box_relay.toggled.connect(self.restart_relay)
+        self.settings_frame.line_edit_relay.editingFinished.connect(self.restart_relay)
+        self.restart_relay()
 
     def eventFilter(self, watched, event):
         if event.type() == QtCore.QEvent.KeyPress:
@@ -334,6 +412,67 @@ class GraphsView(QtWidgets.QMainWindow):
         Settings.setValue('parameters_visible', int(checked))
         self.parameters_dock_widget.setVisible(int(checked))
 
+    def on_visible_latency_changed(self, checked):
+        Settings.setValue('latency_visible', int(checked))
+        self.latency_dock_widget.setVisible(int(checked))
+
+    def on_visible_channels_changed(self, checked):
+        Settings.setValue('channels_visible', int(checked))
+        self.channels_dock_widget.setVisible(int(checked))
+
+    def on_visible_recording_changed(self, checked):
+        Settings.setValue('recording_visible', int(checked))
+        self.recording_dock_widget.setVisible(int(checked))
+
+    def on_visible_rules_changed(self, checked):
+        Settings.setValue('rules_visible', int(checked))
+        self.rules_dock_widget.setVisible(int(checked))
+
+    def on_channel_panes_changed(self, panes):
+        # only the moved curves change plots, the others are not touched
+        for index, desc in self.curves.items():
+            pane = self.plot_panes.plot(panes.get(index, 0))
+            if desc['plot'] is pane:
+                continue
+            self.remove_curve(desc)
+            for item in self.curve_items(desc):
+                pane.addItem(item)
+                self.add_legend(pane, item, index)
+            desc['plot'] = pane
+
+    def on_channel_visibility_changed(self, changes):
+        # hidden channels lose their curves, their samples stay in the store
+        for index, visible in changes.items():
+            if not visible and index in self.curves:
+                self.remove_curve(self.curves.pop(index))
+        self.store.mark_dirty([index for index, visible in changes.items() if visible])
+
+    def curve_items(self, desc):
+        return [desc['curve']] + ([desc['scatter']] if self.SHOW_POINTS else [])
+
+    def remove_curve(self, desc):
+        for item in self.curve_items(desc):
+            desc['plot'].removeItem(item)
+            desc['plot'].legend.removeItem(item)
+
+    def add_legend(self, plot, item, index):
+        if len(plot.legend.items) < self.MAX_LEGEND:
+            plot.legend.addItem(item, f"{index}")
+
+    def set_curve_data(self, index, desc):
+        # the curve gets only the samples that arrived since the last frame
+        generation, total, _time, val, first, reset = self.store.since(
+            index, desc.get('generation'), desc.get('total', 0))
+        with tracer.span('setData', 'gui', {'channel': str(index), 'points': len(_time)}):
+            if reset:
+                desc['curve'].setData(_time, val, first)
+            else:
+                desc['curve'].append(_time, val)
+                desc['curve'].drop_before(first)
+        desc['generation'], desc['total'] = generation, total
+        if self.SHOW_POINTS:
+            desc['scatter'].setData(*self.store.data(index))
+
     def on_clear_graphs(self):
         self.clear(False)
 
@@ -351,144 +490,358 @@ class GraphsView(QtWidgets.QMainWindow):
             "Alexey Kalmykov\n"
             "alexlexx1@gmail.com")
 
-    def on_open_port_serial(self):
-        if not self.process_port:
+    def parser_settings(self):
+        settings = {
+            'name': self.settings_frame.combo_box_parser.currentText(),
+            'pattern': self.settings_frame.line_edit_re.text(),
+            'time_sync': self.settings_frame.check_box_time_sync.isChecked()}
+        # the reader would fail on it, so the error is shown here
+        if settings['name'] == 'regex':
             try:
-                if self.settings_frame.check_box_re.isChecked():
-                    try:
-                        _re = self.settings_frame.line_edit_re.text().encode()
-                        self.line_pattern = re.compile(_re)
-                        self.time_index = self.line_pattern.groupindex.get(
-                            "time")
-                    except re.error as e:
-                        QtWidgets.QMessageBox.warning(
-                            self, "Warning: can't compile regexp", str(e))
-                        return
-                else:
-                    self.line_pattern = None
-
-                path = self.settings_frame.combo_box_port_path.currentText()
-                baudrate = self.settings_frame.combo_box_speed.currentData()
-                in_queue = multiprocessing.Queue()
-                out_queue = multiprocessing.Queue()
-                settings = {
-                    'serial': {
-                        'port': path,
-                        'baudrate': baudrate,
-                        'timeout': self.TIMEOUT},
-                    'parsing_mode': self.settings_frame.group_box_line_parsing.isChecked()}
-                proc = multiprocessing.Process(
-                    target=process_port_serial,
-                    args=(in_queue, out_queue, settings))
-                proc.start()
-
-                res = out_queue.get()
-
-                # finished process
-                if not res:
-                    proc.join()
-                    return
-
-                self.process_port = proc
-                self.in_queue = in_queue
-                self.out_queue = out_queue
-
-                self.timer.start(self.UPDATE_RATE)
-                self.settings_frame.push_button_pause.setText("Pause")
-                self.clear()
-                self.settings_frame.push_button_open.setText("close")
-                self.settings_frame.combo_box_port_path.setEnabled(False)
-                self.settings_frame.combo_box_speed.setEnabled(False)
-                self.console_frame.set_cmd_queue(self.in_queue)
-            except serial.serialutil.SerialException as e:
+                re.compile(settings['pattern'].encode())
+            except re.error as e:
                 QtWidgets.QMessageBox.warning(
-                    self, "Warning", str(e))
-        else:
-            self.in_queue.put(None)
-            self.process_port.join()
-            self.process_port = None
-            self.in_queue = None
-            self.out_queue = None
+                    self, "Warning: can't compile regexp", str(e))
+                return None
+        return settings
+
+    def serial_settings(self):
+        parser_settings = self.parser_settings()
+        if parser_settings is None:
+            return None
+        return {
+            'serial': {
+                'port': self.settings_frame.combo_box_port_path.currentText(),
+                'baudrate': self.settings_frame.combo_box_speed.currentData(),
+                'timeout': self.TIMEOUT},
+            'raw_block': self.RAW_BLOCK,
+            'parsing_mode': self.settings_frame.group_box_line_parsing.isChecked(),
+            'queue_policy': self.settings_frame.combo_box_queue_policy.currentData(),
+            'parser': parser_settings,
+            'rules': self.rule_specs()}
+
+    def udp_settings(self):
+        parser_settings = self.parser_settings()
+        if parser_settings is None:
+            return None
+        return {
+            'udp': {
+                'timeout': self.TIMEOUT,
+                'bind_ip': self.settings_frame.line_edit_udp_bind_ip.text(),
+                'bind_port': int(self.settings_frame.line_edit_udp_bind_port.text()),
+                'dest_ip': self.settings_frame.line_edit_udp_dest_ip.text(),
+                'dest_port': int(self.settings_frame.line_edit_udp_dest_port.text()),
+                'rcvbuf': self.settings_frame.spin_box_udp_rcvbuf.value() << 20},
+            'parsing_mode': self.settings_frame.group_box_line_parsing.isChecked(),
+            'queue_policy': self.settings_frame.combo_box_queue_policy.currentData(),
+            'parser': parser_settings,
+            'rules': self.rule_specs()}
+
+    def rule_specs(self):
+        # a broken rule is shown in the rules dock, the port is opened without rules
+        try:
+            return self.rules_frame.rules(
+                self.console_frame.combo_box_line_ending.currentData())
+        except ValueError as e:
+            self.rules_frame.show_error(str(e))
+            return []
+
+    def on_rules_changed(self):
+        specs = self.rule_specs()
+        if self.port_session is not None:
+            self.in_queue.put(('rules', specs))
+
+    def port_settings(self, kind):
+        try:
+            return self.serial_settings() if kind == 'serial' else self.udp_settings()
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning", str(e))
+            return None
+
+    def start_io_worker(self):
+        # the queue size is fixed for a worker, a new one is started when it changes
+        queue_size = self.settings_frame.spin_box_queue_size.value()
+        if self.io_worker and self.io_worker.out_queue.maxsize == queue_size:
+            return
+        if self.io_worker:
+            self.io_worker.stop()
+        self.io_worker = IoWorker(
+            queue_size, self.settings_frame.combo_box_queue_policy.currentData())
+        self.in_queue = self.io_worker.in_queue
+        self.out_queue = self.io_worker.out_queue
+        self.ingestor.set_queue(self.out_queue)
+        if tracer.enabled:
+            self.in_queue.put(('trace', True))
 
-            self.settings_frame.push_button_open.setText("open")
-            self.settings_frame.combo_box_port_path.setEnabled(True)
-            self.settings_frame.combo_box_speed.setEnabled(True)
-            self.console_frame.set_cmd_queue(None)
+    def on_open_port_serial(self):
+        if self.port_kind is None:
+            self.open_port('serial')
+        elif self.port_kind == 'serial':
+            self.close_port()
 
     def on_open_port_udp(self):
-        if not self.process_port:
+        if self.port_kind is None:
+            self.open_port('udp')
+        elif self.port_kind == 'udp':
+            self.close_port()
+
+    def open_port(self, kind):
+        settings = self.port_settings(kind)
+        if settings is None:
+            return
+        self.start_io_worker()
+        self.port_session = self.io_worker.open(kind, settings)
+        self.port_kind = kind
+
+        self.out_queue.reset_dropped()
+        self.dropped = 0
+        self.label_dropped.setText("")
+        self.label_socket.setText("")
+        self.label_parser.setText("")
+
+        self.timer.start(self.UPDATE_RATE)
+        self.settings_frame.push_button_pause.setText("Pause")
+        self.clear()
+        if kind == 'serial':
+            self.settings_frame.push_button_open.setText("close")
+            self.settings_frame.combo_box_port_path.setEnabled(False)
+            self.settings_frame.push_button_open_udp.setEnabled(False)
+        else:
+            self.settings_frame.push_button_open_udp.setText("close")
+            self.settings_frame.push_button_open.setEnabled(False)
+        self.console_frame.set_cmd_queue(self.in_queue)
+
+    def reconfigure_port(self):
+        # the worker reopens the port with the new settings, the view is kept
+        if self.port_kind is None:
+            return
+        settings = self.port_settings(self.port_kind)
+        if settings is not None:
+            self.port_session = self.io_worker.open(self.port_kind, settings)
+
+    def close_port(self):
+        if self.port_session is not None:
+            self.io_worker.close()
+        self.port_kind = None
+        self.port_session = None
+
+        self.settings_frame.push_button_open.setText("open")
+        self.settings_frame.push_button_open.setEnabled(True)
+        self.settings_frame.combo_box_port_path.setEnabled(True)
+        self.settings_frame.push_button_open_udp.setText("Open UDP")
+        self.settings_frame.push_button_open_udp.setEnabled(True)
+        self.console_frame.set_cmd_queue(None)
+
+    def on_port_closed(self, session, error):
+        # the port failed to open or was lost
+        if session != self.port_session:
+            return
+        self.port_session = None
+        self.close_port()
+        if error:
+            QtWidgets.QMessageBox.warning(self, "Warning", error)
+
+    def restart_capture(self):
+        self.ingestor.set_sink('capture', None)
+        if self.capture:
+            self.capture.remove()
+            self.capture = None
+        if self.settings_frame.check_box_history.isChecked():
+            fd, path = tempfile.mkstemp(prefix='graphs_view_', suffix='.gvcap')
+            os.close(fd)
+            self.capture = CaptureWriter(path)
+            self.ingestor.set_sink('capture', self.capture.write)
+
+    def restart_relay(self):
+        self.ingestor.set_sink('relay', None)
+        if self.relay:
+            self.relay.close()
+            self.relay = None
+        if self.settings_frame.check_box_relay.isChecked():
             try:
-                if self.settings_frame.check_box_re.isChecked():
-                    try:
-                        _re = self.settings_frame.line_edit_re.text().encode()
-                        self.line_pattern = re.compile(_re)
-                        self.time_index = self.line_pattern.groupindex.get(
-                            "time")
-                    except re.error as e:
-                        QtWidgets.QMessageBox.warning(
-                            self, "Warning: can't compile regexp", str(e))
-                        return
-                else:
-                    self.line_pattern = None
-
-                path = self.settings_frame.combo_box_port_path.currentText()
-                baudrate = self.settings_frame.combo_box_speed.currentData()
-                in_queue = multiprocessing.Queue()
-                out_queue = multiprocessing.Queue()
-                settings = {
-                    'udp': {
-                        'timeout': self.TIMEOUT,
-                        'bind_ip': self.settings_frame.line_edit_udp_bind_ip.text(),
-                        'bind_port': int(self.settings_frame.line_edit_udp_bind_port.text()),
-                        'dest_ip': self.settings_frame.line_edit_udp_dest_ip.text(),
-                        'dest_port': int(self.settings_frame.line_edit_udp_dest_port.text())},
-
-                    'parsing_mode': self.settings_frame.group_box_line_parsing.isChecked()}
-                proc = multiprocessing.Process(
-                    target=process_port_udp,
-                    args=(in_queue, out_queue, settings))
-                proc.start()
-
-                res = out_queue.get()
-
-                # finished process
-                if not res:
-                    proc.join()
-                    return
-
-                self.process_port = proc
-                self.in_queue = in_queue
-                self.out_queue = out_queue
-
-                self.timer.start(self.UPDATE_RATE)
-                self.settings_frame.push_button_pause.setText("Pause")
-                self.clear()
-                self.settings_frame.push_button_open_udp.setText("close")
-                self.console_frame.set_cmd_queue(self.in_queue)
-            except serial.serialutil.SerialException as e:
-                QtWidgets.QMessageBox.warning(
-                    self, "Warning", str(e))
+                self.relay = Relay(self.settings_frame.line_edit_relay.text())
+                self.ingestor.set_sink('relay', self.relay.publish)
+            except (OSError, ValueError) as e:
+                QtWidgets.QMessageBox.warning(self, "Warning: relay not started", str(e))
+                self.settings_frame.check_box_relay.setChecked(False)
+
+    def on_trace_changed(self, checked):
+        if checked:
+            tracer.take()
+            tracer.enable(True)
+            if self.io_worker:
+                self.in_queue.put(('trace', True))
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save trace", self.trace_path or "trace.json", "Chrome trace (*.json)")
+        if path:
+            self.save_trace(path)
         else:
-            self.in_queue.put(None)
-            self.process_port.join()
-            self.process_port = None
-            self.in_queue = None
-            self.out_queue = None
+            tracer.enable(False)
+
+    def save_trace(self, path):
+        tracer.enable(False)
+        process_names = {tracer.pid: "graphs_view"}
+        if self.io_worker:
+            # the reader sends its spans through the ingestion thread
+            self.in_queue.put(('trace', False))
+            self.in_queue.put(('trace_dump',))
+            tracer.remote_ready.wait(self.TRACE_TIMEOUT)
+            process_names[self.io_worker.process.pid] = "reader"
+        try:
+            count = tracer.dump(path, process_names)
+            self.statusBar().showMessage(f"Trace: {count} spans saved to {path}")
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: trace not saved", str(e))
+
+    def on_export_view(self):
+        if self.settings_frame.check_box_xy_mode.isChecked():
+            source = BufferSource(
+                [(_id, desc['x'], desc['y']) for _id, desc in self.points.items()],
+                ('x', 'y'))
+        else:
+            source = StoreSource(self.store, self.curves)
+        self.start_export(source)
+
+    def on_export_history(self):
+        if not self.capture:
+            QtWidgets.QMessageBox.warning(
+                self, "Warning",
+                "History is not recorded, enable \"History\" in the settings.")
+            return
+        # the samples still collected into blocks are written out first
+        with self.ingestor.sinks_lock:
+            self.capture.flush()
+        self.start_export(CaptureSource(self.capture.path))
+
+    def on_save_recording(self):
+        if not self.capture:
+            QtWidgets.QMessageBox.warning(
+                self, "Warning",
+                "History is not recorded, enable \"History\" in the settings.")
+            return
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save recording", "", "Recording (*.gvcap)")
+        if not path:
+            return
+        if not path.endswith('.gvcap'):
+            path += '.gvcap'
+        # the ingestion thread keeps writing, so the size and index are taken together
+        with self.ingestor.sinks_lock:
+            self.capture.flush()
+            size = self.capture.position
+            index = self.capture.index.copy()
+        try:
+            with open(self.capture.path, 'rb') as src, open(path, 'wb') as dst:
+                while size > 0:
+                    chunk = src.read(min(size, 1 << 20))
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    size -= len(chunk)
+            index.save(path + INDEX_SUFFIX)
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: recording not saved", str(e))
+            return
+        self.show_recording.setChecked(True)
+        self.recording_frame.open(path)
+
+    def on_keep_session_changed(self, checked):
+        Settings.setValue('keep_session', int(checked))
+
+    @staticmethod
+    def session_path():
+        path = QtCore.QStandardPaths.writableLocation(
+            QtCore.QStandardPaths.StandardLocation.GenericDataLocation)
+        return os.path.join(path, 'graphs_view', 'session.gvsnap')
+
+    def on_save_snapshot(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save snapshot", "", "Snapshot (*.gvsnap)")
+        if path:
+            self.save_snapshot(path if path.endswith('.gvsnap') else path + '.gvsnap')
+
+    def on_open_snapshot(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Open snapshot", "", "Snapshot (*.gvsnap)")
+        if path:
+            self.restore_snapshot(path)
+
+    def save_snapshot(self, path):
+        view = [{
+            'x': plot.getViewBox().viewRange()[0],
+            'y': plot.getViewBox().viewRange()[1],
+            'auto': plot.getViewBox().autoRangeEnabled()}
+            for plot in self.plot_panes.plots]
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            write_snapshot(path, self.store.raw(), {'view': view})
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: snapshot not saved", str(e))
+
+    def restore_snapshot(self, path):
+        try:
+            entries, meta = read_snapshot(path)
+        except (OSError, ValueError, KeyError) as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: snapshot not restored", str(e))
+            return
+        self.clear()
+        self.store.restore(entries)
+        self.draw()
+        for plot, view in zip(self.plot_panes.plots, meta.get('view', [])):
+            auto_x, auto_y = view['auto']
+            if not auto_x:
+                plot.setXRange(*view['x'], padding=0)
+            if not auto_y:
+                plot.setYRange(*view['y'], padding=0)
+
+    def start_export(self, source):
+        if self.exporter:
+            QtWidgets.QMessageBox.warning(
+                self, "Warning", "Export is already in progress.")
+            return
 
-            self.settings_frame.push_button_open_udp.setText("Open UDP")
-            self.console_frame.set_cmd_queue(None)
+        filters = Exporter.file_filters()
+        path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export", Settings.value("export_dir") or "", ";;".join(filters))
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            for ext, text in Exporter.FORMATS.items():
+                if text == selected_filter:
+                    path += ext
+        Settings.setValue("export_dir", os.path.dirname(path))
+
+        self.exporter = Exporter(source, path, self)
+        self.export_progress = QtWidgets.QProgressDialog(
+            f"Exporting to {os.path.basename(path)}...", "Cancel", 0, 100, self)
+        self.export_progress.setWindowModality(QtCore.Qt.NonModal)
+        self.export_progress.canceled.connect(self.exporter.cancel)
+        self.exporter.progress.connect(self.export_progress.setValue)
+        self.exporter.failed.connect(self.on_export_failed)
+        self.exporter.finished.connect(self.on_export_finished)
+        self.exporter.start()
+
+    def on_export_failed(self, error):
+        QtWidgets.QMessageBox.warning(self, "Warning: export failed", error)
+
+    def on_export_finished(self):
+        self.export_progress.reset()
+        self.export_progress = None
+        self.exporter.deleteLater()
+        self.exporter = None
 
     def clear(self, remove_items=True):
-        self.results = {}
         self.points = {}
+        self.store.clear()
+        self.restart_capture()
 
         if remove_items:
-            self.plot_graph.clear()
+            self.plot_panes.clear_items()
             self.curves = {}
+            self.channels_frame.clear_channels()
         else:
             for _id, desc in self.curves.items():
-                desc['time'] = []
-                desc['val'] = []
                 desc['curve'].setData([], [])
                 if self.SHOW_POINTS:
                     desc['scatter'].setData([], [])
@@ -502,114 +855,139 @@ class GraphsView(QtWidgets.QMainWindow):
             self.settings_frame.push_button_pause.setText("Pause")
 
     def xy_mode_changed(self, state):
-        if state:
-            self.plot_graph.setAspectLocked(lock=True)
-            self.clear()
-            self.plot_graph.setLabel("left", "Y")
-            self.plot_graph.setLabel("bottom", "X")
-        else:
-            self.plot_graph.setAspectLocked(lock=False)
-            self.clear()
-            self.plot_graph.setLabel("left", "value")
-            self.plot_graph.setLabel("bottom", "time")
-
-    def get(self):
-        results = {}
+        self.clear()
+        self.plot_panes.set_xy_mode(state)
+
+    def on_reader_event(self, packet):
+        if packet[0] == 'parser_stats':
+            self.update_parser_stats(*packet[1:])
+        elif packet[0] == 'udp_stats':
+            self.update_udp_stats(*packet[1:])
+        elif packet[0] == 'port_closed':
+            self.on_port_closed(*packet[1:])
+        elif packet[0] != 'port_opened':
+            self.READER_EVENT_SIGNAL.emit(packet)
+
+    def on_lines_received(self, lines):
+        # row data
+        if not self.settings_frame.group_box_line_parsing.isChecked():
+            self.NEW_LINE_SIGNAL.emit(
+                [line for _, line in lines], [line_time for line_time, _ in lines], False)
+            return
+        # splitted data
+        if self.settings_frame.check_box_show_only_cmd_response.isChecked():
+            lines = [(line_time, line) for line_time, line in lines if line[:2] in [b'RE', b'ER']]
+        if lines:
+            self.NEW_LINE_SIGNAL.emit(
+                [line + b'\n' for _, line in lines], [line_time for line_time, _ in lines], True)
+
+    def on_console_time_selected(self, line_time):
+        # the plots are centred on the time of a console line, keeping their span
+        if self.settings_frame.check_box_xy_mode.isChecked():
+            return
+        for plot in self.plot_panes.plots:
+            x_min, x_max = plot.viewRange()[0]
+            span = x_max - x_min
+            plot.setXRange(line_time - span / 2, line_time + span / 2, padding=0)
+
+    def update_parser_stats(self, lines, errors, cost):
+        cost = cost / lines * 1e6 if lines else 0.0
+        self.label_parser.setText(f"Parser: {cost:.1f} us/line, errors: {errors}")
+
+    def update_udp_stats(self, datagrams, drops, rcvbuf):
+        # drops are counted by the socket, so they start with this port
+        text = f"Datagrams: {datagrams}"
+        if drops is not None:
+            text += f", kernel drops: {drops}"
+        self.label_socket.setText(text)
+        self.label_socket.setToolTip(
+            "Datagrams received and dropped by the kernel because the socket buffer "
+            f"was full, buffer: {rcvbuf >> 10} KB.")
+
+    def update_dropped(self):
         if self.out_queue:
-            # reading data from queue
-            try:
-                while 1:
-                    packet = self.out_queue.get(False)
-                    if packet is None:
-                        break
-
-                    full_line, packet_time, line = packet
-                    # row data
-                    if not self.settings_frame.group_box_line_parsing.isChecked():
-                        self.NEW_LINE_SIGNAL.emit(line)
-                    # splitted data
-                    else:
-                        if not self.settings_frame.check_box_show_only_cmd_response.isChecked() or\
-                                line[:2] in [b'RE', b'ER']:
-                            self.NEW_LINE_SIGNAL.emit(line + b'\n')
-                        if full_line:
-                            if self.line_pattern:
-                                match = self.line_pattern.match(line)
-                                data = None
-                                if match:
-                                    data = match.groups()
-                                    if self.time_index is not None:
-                                        packet_time = float(
-                                            match.group(self.time_index))
-                            else:
-                                data = line.split()
-
-                            if data:
-                                try:
-                                    data = [float(d) for d in data]
-                                    for index, value in enumerate(data):
-                                        store = results.setdefault(
-                                            index, [[], []])
-                                        store[0].append(packet_time)
-                                        store[1].append(value)
-                                except ValueError as e:
-                                    print(f'error:{e} line:{line}')
-            except queue.Empty:
-                pass
-        return results
+            dropped = self.out_queue.dropped_count()
+            if dropped != self.dropped:
+                self.dropped = dropped
+                self.label_dropped.setText(f"Dropped: {dropped}")
+
+    def channel_colour(self, index):
+        # numeric channels keep their colour, named ones get it by appearance
+        if not isinstance(index, int):
+            channels = list(self.channels_frame.panes)
+            index = channels.index(index) if index in channels else len(channels)
+        return self.COLOURS[index % len(self.COLOURS)]
+
+    def update_memory(self):
+        budget = self.settings_frame.spin_box_memory_budget.value() << 20
+        self.store.configure(
+            self.settings_frame.spin_box_max_points.value(), budget,
+            self.settings_frame.check_box_compact.isChecked())
+        self.label_memory.setText(
+            f"Memory: {self.store.nbytes() / (1 << 20):.1f} / {budget >> 20} MB, "
+            f"{self.store.capacity} points")
 
     def update(self):
-        res = self.get()
+        with tracer.span('update', 'gui'):
+            self.draw()
+
+    def draw(self):
+        import pyqtgraph
+        from .streaming_curve import StreamingCurveItem
+
+        self.update_dropped()
+        self.update_memory()
+        # nothing to draw for a hidden window, the data is still collected
+        if self.isMinimized() or not self.isVisible():
+            return
+        res = self.store.take_dirty()
 
         if not res:
             return
-        max_len = self.settings_frame.spin_box_max_points.value()
 
         # draw graphs
         if not self.settings_frame.check_box_xy_mode.isChecked():
-            for index, data in res.items():
-                _time, val = data
+            for index in res:
+                if not self.channels_frame.has_channel(index):
+                    self.channels_frame.add_channel(index, self.channel_colour(index))
+                # hidden channels are neither copied nor drawn, curves are made when shown
+                if not self.channels_frame.is_visible(index):
+                    continue
                 desc = self.curves.setdefault(index, {})
-                desc.setdefault('time', []).extend(_time)
-                desc.setdefault('val', []).extend(val)
-                desc['time'] = desc['time'][-max_len:]
-                desc['val'] = desc['val'][-max_len:]
 
                 if 'curve' not in desc:
-                    curve = pyqtgraph.PlotCurveItem()
+                    curve = StreamingCurveItem()
                     pen = pyqtgraph.mkPen(
-                        self.COLOURS[index % len(self.COLOURS)],
+                        self.channels_frame.colours[index],
                         width=self.GRAPH_WIDTH)
                     curve.setPen(pen)
-                    self.legend.addItem(
-                        curve,
-                        f"{index}")
-                    self.plot_graph.addItem(curve)
+                    plot = self.plot_panes.plot(self.channels_frame.pane_of(index))
+                    plot.addItem(curve)
+                    self.add_legend(plot, curve, index)
                     desc['curve'] = curve
+                    desc['plot'] = plot
 
                     if self.SHOW_POINTS:
                         scatter = pyqtgraph.ScatterPlotItem()
                         scatter.setPen(pen)
-                        self.legend.addItem(
-                            scatter,
-                            f"{index}")
-                        self.plot_graph.addItem(scatter)
+                        plot.addItem(scatter)
+                        self.add_legend(plot, scatter, index)
                         desc['scatter'] = scatter
 
-                desc['curve'].setData(desc['time'], desc['val'])
-                if self.SHOW_POINTS:
-                    desc['scatter'].setData(desc['time'], desc['val'])
+                self.set_curve_data(index, desc)
         # draw points
         else:
             # use first and second value as x, y coordinates
-            if 0 in res and 1 in res:
+            x_index, y_index = (0, 1) if 0 in res else (list(res) + [None])[:2]
+            if x_index in res and y_index in res:
                 # first points pair
                 index = 0
-                desc = self.points.setdefault(0, {'x': [], 'y': []})
-                desc['x'].extend(res[0][1])
-                desc['y'].extend(res[1][1])
-                desc['x'] = desc['x'][-max_len:]
-                desc['y'] = desc['y'][-max_len:]
+                desc = self.points.setdefault(0, {})
+                x = self.store.data(x_index)[1]
+                y = self.store.data(y_index)[1]
+                count = min(len(x), len(y))
+                desc['x'] = x[len(x) - count:]
+                desc['y'] = y[len(y) - count:]
 
                 # creating of scatter
                 scatter = desc.get("scatter")
@@ -619,11 +997,11 @@ class GraphsView(QtWidgets.QMainWindow):
                         self.COLOURS[index % len(self.COLOURS)],
                         width=self.GRAPH_WIDTH)
                     scatter.setPen(pen)
-                    self.legend.addItem(
+                    plot = self.plot_panes.plot(0)
+                    plot.addItem(scatter)
+                    plot.legend.addItem(
                         scatter,
                         f"{index}")
-
-                    self.plot_graph.addItem(scatter)
                     desc['scatter'] = scatter
                 # update points in scatter
                 scatter.setData(desc['x'], desc['y'])
@@ -631,12 +1009,54 @@ class GraphsView(QtWidgets.QMainWindow):
     def closeEvent(self, event):
         Settings.setValue("window_state", self.saveState())
         Settings.setValue("window_geometry", self.saveGeometry())
+        Settings.sync()
+        if self.action_keep_session.isChecked():
+            self.save_snapshot(self.session_path())
+        if self.exporter:
+            self.exporter.cancel()
+            self.exporter.wait()
+        if self.capture:
+            self.capture.remove()
+            self.capture = None
+        if self.relay:
+            self.relay.close()
+            self.relay = None
+        if self.trace_path and tracer.enabled:
+            self.save_trace(self.trace_path)
+        self.ingestor.stop()
+        if self.io_worker:
+            self.io_worker.stop()
+            self.io_worker = None
         event.accept()
 
 
 def main():
+    parser = argparse.ArgumentParser(prog="graphs_view")
+    parser.add_argument(
+        "--startup-profile", action="store_true",
+        help="print how long each startup phase took")
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help="record pipeline spans and save them as a Chrome trace on exit")
+    args, _ = parser.parse_known_args()
+
     signal.signal(signal.SIGINT, signal.SIG_DFL)
     app = QtWidgets.QApplication([])
+    startup_profile.mark("QApplication")
     graphs_view = GraphsView()
+    startup_profile.mark("main window")
     graphs_view.show()
+    startup_profile.mark("show")
+    if args.trace:
+        graphs_view.trace_path = args.trace
+        graphs_view.action_trace.setChecked(True)
+
+    if args.startup_profile:
+        def on_ports_scanned():
+            graphs_view.settings_frame.ports_scanned.disconnect(on_ports_scanned)
+            startup_profile.mark("port enumeration")
+            startup_profile.report()
+
+        QtCore.QTimer.singleShot(0, lambda: startup_profile.mark("first event loop"))
+        graphs_view.settings_frame.ports_scanned.connect(on_ports_scanned)
     app.exec()
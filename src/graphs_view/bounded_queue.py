@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import queue
+from .profiler import tracer
+
+
+class BoundedQueue:
+    # data packets are bounded by the policy; forced packets (control and events)
+    # go through an unbounded queue of their own, so they are neither held back nor
+    # evicted by data, and the consumer gets them first
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+    DECIMATE = 'decimate'
+    POLICIES = {
+        'Drop oldest': DROP_OLDEST,
+        'Drop newest': DROP_NEWEST,
+        'Decimate': DECIMATE}
+    # s, drop oldest waits this long for the room its eviction made
+    PUT_TIMEOUT = 0.05
+
+    def __init__(self, maxsize, policy=DROP_OLDEST):
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.queue = multiprocessing.Queue(self.maxsize)
+        self.control = multiprocessing.Queue()
+        # shared with the GUI process, counts packets lost on the reader side
+        self.dropped = multiprocessing.Value('Q', 0)
+        self.decimation = 1
+        # per kind of data packet, so lines and batches are thinned independently
+        self.decimation_counters = {}
+        self.puts_since_full = 0
+
+    def get(self, block=True, timeout=None):
+        # a control packet that comes during a blocking wait is taken after it
+        try:
+            return self.control.get_nowait()
+        except queue.Empty:
+            return self.queue.get(block, timeout)
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def dropped_count(self):
+        return self.dropped.value
+
+    def add_dropped(self, count=1):
+        with self.dropped.get_lock():
+            self.dropped.value += count
+
+    def reset_dropped(self):
+        with self.dropped.get_lock():
+            self.dropped.value = 0
+
+    def put(self, item, force=False, kind=None):
+        # control packets (handshake, end of stream) and events are forced and never lost,
+        # kind tells data packets apart for decimation
+        with tracer.span('queue.put', 'queue'):
+            if force:
+                self.control.put(item)
+            elif self.policy == self.DROP_OLDEST:
+                self.put_drop_oldest(item)
+            elif self.policy == self.DROP_NEWEST:
+                try:
+                    self.queue.put_nowait(item)
+                except queue.Full:
+                    self.add_dropped()
+            else:
+                self.put_decimate(item, kind)
+
+    def put_drop_oldest(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        # one eviction per put, the item itself is dropped when other producers
+        # took the room before it. A packet just put may still be on its way to
+        # the pipe, so the eviction waits for it too
+        try:
+            self.queue.get(True, self.PUT_TIMEOUT)
+            self.add_dropped()
+        # consumer took it first
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put(item, True, self.PUT_TIMEOUT)
+        except queue.Full:
+            self.add_dropped()
+
+    def put_decimate(self, item, kind):
+        counter = self.decimation_counters.get(kind, 0) + 1
+        self.decimation_counters[kind] = counter
+        if counter % self.decimation:
+            self.add_dropped()
+            return
+
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.add_dropped()
+            self.decimation *= 2
+            self.puts_since_full = 0
+            return
+
+        # relax decimation when the consumer catches up
+        self.puts_since_full += 1
+        if self.decimation > 1:
+            try:
+                relax = self.queue.qsize() < self.maxsize // 4
+            # qsize is not available on macOS
+            except NotImplementedError:
+                relax = self.puts_since_full >= self.maxsize
+            if relax:
+                self.decimation //= 2
+                self.puts_since_full = 0
@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import numpy
+from .line_store import GrowingArray
+
+
+# block: magic, channel name length, samples count, name, times[count], values[count]
+BLOCK_HEADER = struct.Struct('<4sHI')
+BLOCK_MAGIC = b'GVB1'
+
+
+# capture index entry per block: data offset, samples, first/last time, min/max value
+INDEX_DTYPE = numpy.dtype([
+    ('offset', '<i8'), ('count', '<u4'),
+    ('first', '<f8'), ('last', '<f8'), ('min', '<f8'), ('max', '<f8')])
+INDEX_SUFFIX = '.gvidx'
+
+
+def encode_block(name, times, values):
+    return b''.join((
+        BLOCK_HEADER.pack(BLOCK_MAGIC, len(name), len(times)),
+        name,
+        numpy.asarray(times, dtype='<f8').tobytes(),
+        numpy.asarray(values, dtype='<f8').tobytes()))
+
+
+def encode_blocks(results):
+    return b''.join(
+        encode_block(str(channel).encode(), times, values)
+        for channel, (times, values) in results.items() if len(times))
+
+
+def decode_blocks(data):
+    # yields (channel, times, values) of blocks held in memory
+    offset = 0
+    while offset < len(data):
+        magic, name_len, count = BLOCK_HEADER.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"broken block at {offset}")
+        offset += BLOCK_HEADER.size
+        channel = bytes(data[offset:offset + name_len]).decode()
+        offset += name_len
+        times = numpy.frombuffer(data, dtype='<f8', count=count, offset=offset)
+        values = numpy.frombuffer(data, dtype='<f8', count=count, offset=offset + count * 8)
+        offset += count * 16
+        yield channel, times, values
+
+
+class CaptureWriter:
+    # samples of a channel are collected into blocks of BLOCK_SAMPLES, a slow
+    # channel writes what it has every BLOCK_SPAN seconds of its time
+    BLOCK_SAMPLES = 4096
+    BLOCK_SPAN = 5.0
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.position = 0
+        # channel -> [times parts, values parts, samples]
+        self.pending = {}
+        # built while recording, so a saved capture is searchable at once
+        self.index = CaptureIndex()
+
+    def write(self, results):
+        for channel, (times, values) in results.items():
+            if not len(times):
+                continue
+            pending = self.pending.setdefault(str(channel), [[], [], 0])
+            pending[0].append(times)
+            pending[1].append(values)
+            pending[2] += len(times)
+        self.write_pending(False)
+
+    def write_pending(self, force):
+        # full blocks, and everything of the channels past their span or when forced
+        blocks = []
+        for channel, (times_parts, values_parts, count) in list(self.pending.items()):
+            complete = force or times_parts[-1][-1] - times_parts[0][0] >= self.BLOCK_SPAN
+            if count < self.BLOCK_SAMPLES and not complete:
+                continue
+            times = numpy.concatenate(times_parts).astype('f8', copy=False)
+            values = numpy.concatenate(values_parts).astype('f8', copy=False)
+            end = count if complete else count - count % self.BLOCK_SAMPLES
+            name = channel.encode()
+            for start in range(0, end, self.BLOCK_SAMPLES):
+                stop = min(start + self.BLOCK_SAMPLES, end)
+                block = encode_block(name, times[start:stop], values[start:stop])
+                self.index.add(
+                    channel, self.position + len(block) - (stop - start) * 16,
+                    times[start:stop], values[start:stop])
+                blocks.append(block)
+                self.position += len(block)
+            if end < count:
+                self.pending[channel] = [[times[end:]], [values[end:]], count - end]
+            else:
+                del self.pending[channel]
+        if blocks:
+            self.file.write(b''.join(blocks))
+
+    def flush(self):
+        self.write_pending(True)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class CaptureReader:
+    def __init__(self, path, end=None):
+        self.path = path
+        # a capture that is still being written is read up to this offset
+        self.end = end
+
+    def iter_headers(self, file):
+        # yields (channel, count, data offset) skipping the samples
+        while self.end is None or file.tell() < self.end:
+            header = file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, name_len, count = BLOCK_HEADER.unpack(header)
+            if magic != BLOCK_MAGIC:
+                raise ValueError(f"broken capture block at {file.tell() - BLOCK_HEADER.size}")
+            channel = file.read(name_len).decode()
+            offset = file.tell()
+            yield channel, count, offset
+            file.seek(offset + count * 16)
+
+    def channels(self):
+        # channel -> total samples, in order of appearance
+        counts = {}
+        with open(self.path, 'rb') as file:
+            for channel, count, _ in self.iter_headers(file):
+                counts[channel] = counts.get(channel, 0) + count
+        return counts
+
+    @staticmethod
+    def read_block(file, offset, count):
+        file.seek(offset)
+        times = numpy.fromfile(file, dtype='<f8', count=count)
+        values = numpy.fromfile(file, dtype='<f8', count=count)
+        return times, values
+
+    def iter_blocks(self, channel=None, with_offset=False):
+        with open(self.path, 'rb') as file:
+            for name, count, offset in self.iter_headers(file):
+                if channel is not None and name != channel:
+                    continue
+                times, values = self.read_block(file, offset, count)
+                # a block cut by a crash is not returned
+                if len(values) < count:
+                    return
+                yield (name, times, values, offset) if with_offset else (name, times, values)
+
+
+class CaptureIndex:
+    # sparse index of a capture: one entry per block and channel, blocks of a
+    # channel are in time order, so seeks are bisections over the entries and
+    # threshold searches skip the blocks whose min/max can not match
+    def __init__(self):
+        # channel -> GrowingArray of INDEX_DTYPE
+        self.arrays = {}
+
+    def add(self, channel, offset, times, values):
+        values = numpy.asarray(values, dtype='f8')
+        entry = numpy.empty(1, INDEX_DTYPE)
+        entry[0] = (
+            offset, len(values), times[0], times[-1],
+            numpy.fmin.reduce(values), numpy.fmax.reduce(values))
+        self.extend(channel, entry)
+
+    def extend(self, channel, entries):
+        array = self.arrays.get(channel)
+        if array is None:
+            array = self.arrays[channel] = GrowingArray(INDEX_DTYPE, 16)
+        array.extend(entries)
+
+    def entries(self, channel):
+        array = self.arrays.get(channel)
+        return array.view() if array is not None else numpy.empty(0, INDEX_DTYPE)
+
+    def channels(self):
+        return list(self.arrays)
+
+    def time_range(self):
+        ranges = [
+            (entries['first'][0], entries['last'][-1])
+            for entries in map(self.entries, self.channels()) if len(entries)]
+        if not ranges:
+            return None
+        return min(first for first, _ in ranges), max(last for _, last in ranges)
+
+    def seek(self, channel, time):
+        # first block of the channel that ends at or after time
+        return int(numpy.searchsorted(self.entries(channel)['last'], time, 'left'))
+
+    def blocks(self, channel, start, end):
+        entries = self.entries(channel)
+        first = self.seek(channel, start)
+        last = int(numpy.searchsorted(entries['first'], end, 'right'))
+        return entries[first:last]
+
+    def copy(self):
+        index = CaptureIndex()
+        for channel in self.channels():
+            index.extend(channel, self.entries(channel))
+        return index
+
+    def save(self, path):
+        # channel names may be anything, the members are numbered and the names kept apart
+        channels = self.channels()
+        with open(path, 'wb') as file:
+            numpy.savez(
+                file, channels=numpy.array(channels, dtype=str),
+                **{f'entries_{number}': self.entries(channel)
+                   for number, channel in enumerate(channels)})
+
+    @classmethod
+    def load(cls, path):
+        # KeyError or ValueError for a broken index
+        index = cls()
+        with numpy.load(path) as archive:
+            for number, channel in enumerate(archive['channels'].tolist()):
+                index.extend(channel, archive[f'entries_{number}'])
+        return index
+
+    @classmethod
+    def build(cls, path):
+        # for captures saved without an index
+        index = cls()
+        for channel, times, values, offset in CaptureReader(path).iter_blocks(with_offset=True):
+            index.add(channel, offset, times, values)
+        return index
+
+
+class CaptureSession:
+    # an opened capture with its index
+    def __init__(self, path):
+        self.reader = CaptureReader(path)
+        index_path = path + INDEX_SUFFIX
+        try:
+            self.index = CaptureIndex.load(index_path)
+        # missing or written by an older version
+        except (OSError, KeyError, ValueError):
+            self.index = CaptureIndex.build(path)
+            try:
+                self.index.save(index_path)
+            except OSError:
+                pass
+
+    def window(self, start, end, channels=None):
+        # {channel: (times, values)} in [start, end], only overlapping blocks are read
+        results = {}
+        with open(self.reader.path, 'rb') as file:
+            for channel in channels or self.index.channels():
+                parts = [
+                    self.reader.read_block(file, entry['offset'], entry['count'])
+                    for entry in self.index.blocks(channel, start, end)]
+                if not parts:
+                    continue
+                times = numpy.concatenate([times for times, _ in parts])
+                values = numpy.concatenate([values for _, values in parts])
+                first = numpy.searchsorted(times, start, 'left')
+                last = numpy.searchsorted(times, end, 'right')
+                results[channel] = (times[first:last], values[first:last])
+        return results
+
+    def find(self, channel, threshold, after, above=True):
+        # time of the first crossing after `after`: a sample above/below threshold
+        # whose previous sample is not; blocks without such samples are not read
+        entries = self.index.entries(channel)
+        first = self.index.seek(channel, after)
+        if above:
+            candidates = entries['max'] > threshold
+        else:
+            candidates = entries['min'] < threshold
+
+        def compare(values):
+            return values > threshold if above else values < threshold
+
+        # the block read last and whether its last sample was past the threshold
+        last, last_state = None, False
+        with open(self.reader.path, 'rb') as file:
+            if first and candidates[first - 1]:
+                entry = entries[first - 1]
+                _, values = self.reader.read_block(file, entry['offset'], entry['count'])
+                last, last_state = first - 1, bool(compare(values[-1]))
+            for number in numpy.flatnonzero(candidates[first:]) + first:
+                entry = entries[number]
+                times, values = self.reader.read_block(file, entry['offset'], entry['count'])
+                state = compare(values)
+                before = numpy.empty_like(state)
+                before[0] = last_state if last == number - 1 else False
+                before[1:] = state[:-1]
+                hits = numpy.flatnonzero(state & ~before & (times > after))
+                if len(hits):
+                    return times[hits[0]]
+                last, last_state = number, bool(state[-1])
+        return None
@@ -0,0 +1,281 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import itertools
+import threading
+import numpy
+
+# int32 microseconds cover about 35 minutes either side of the time base
+INT32_MIN = numpy.iinfo('i4').min
+INT32_MAX = numpy.iinfo('i4').max
+# a new one for every buffer refill, so readers notice that their samples moved
+GENERATIONS = itertools.count()
+
+
+class ChannelBuffer:
+    # samples of one channel in preallocated arrays, the oldest are dropped at capacity.
+    # compact: float32 values and timestamps as int32 microseconds from a time base that
+    # moves to the oldest retained sample on every compaction; retained samples that do
+    # not fit fall back to float64 times until a compaction brings them in range again
+    TIME_UNIT = 1e-6
+    # free room after the samples, old samples are moved out once per capacity * SLACK appends
+    SLACK = 0.25
+
+    def __init__(self, capacity, compact=False):
+        self.compact = compact
+        self.capacity = max(1, capacity)
+        self.base = None
+        # the base is origin + shift microseconds, so moving it does not add rounding
+        self.origin = None
+        self.shift = 0
+        self.start = 0
+        self.end = 0
+        # samples ever appended, readers take what was appended after their total
+        self.total = 0
+        self.generation = next(GENERATIONS)
+        self.times_array = numpy.empty(self.allocated(), dtype='i4' if compact else 'f8')
+        self.values_array = numpy.empty(self.allocated(), dtype='f4' if compact else 'f8')
+
+    @classmethod
+    def point_size(cls, compact):
+        # bytes per retained sample, slack included
+        return (8 if compact else 16) * (1 + cls.SLACK)
+
+    def allocated(self):
+        return self.capacity + max(1, int(self.capacity * self.SLACK))
+
+    def __len__(self):
+        return self.end - self.start
+
+    def nbytes(self):
+        return self.times_array.nbytes + self.values_array.nbytes
+
+    def set_base(self, origin, shift=0):
+        self.origin, self.shift = origin, shift
+        self.base = origin + shift * self.TIME_UNIT
+
+    def encode(self, times):
+        if self.times_array.dtype != numpy.int32:
+            return times
+        if self.base is None:
+            self.set_base(float(times[0]))
+        offsets = numpy.rint((times - self.base) / self.TIME_UNIT)
+        if offsets.min() < INT32_MIN or offsets.max() > INT32_MAX:
+            # decoded times are kept as float64 until a compaction rebases them
+            self.times_array = self.decode(self.times_array)
+            return times
+        return offsets.astype('i4')
+
+    def decode(self, times):
+        if times.dtype != numpy.int32 or self.base is None:
+            return numpy.array(times, dtype='f8')
+        return times * self.TIME_UNIT + self.base
+
+    def rebase(self):
+        # compact times of the retained samples are re-encoded from the oldest one
+        if not self.compact or self.start == self.end:
+            return
+        times = self.times_array[self.start:self.end]
+        if times.dtype == numpy.int32:
+            shift = int(times[0])
+            offsets = times - numpy.int64(shift)
+            origin, shift = self.origin, self.shift + shift
+        else:
+            origin, shift = float(times[0]), 0
+            offsets = numpy.rint((times - origin) / self.TIME_UNIT)
+        if offsets.min() < INT32_MIN or offsets.max() > INT32_MAX:
+            return
+        if times.dtype != numpy.int32:
+            self.times_array = numpy.empty(len(self.times_array), dtype='i4')
+        self.times_array[self.start:self.end] = offsets
+        self.set_base(origin, shift)
+
+    def append(self, times, values):
+        times = numpy.asarray(times, dtype='f8')
+        count = len(times)
+        if not count:
+            return
+        self.total += count
+        values = numpy.asarray(values)
+        if count >= self.capacity:
+            self.start, self.end = 0, 0
+            times, values = times[-self.capacity:], values[-self.capacity:]
+            count = self.capacity
+            if self.compact:
+                self.base = None
+                self.times_array = numpy.empty(len(self.times_array), dtype='i4')
+        elif self.end + count > len(self.times_array):
+            # only the samples that stay after this batch are moved
+            start = max(self.start, self.end - (self.capacity - count))
+            size = self.end - start
+            self.times_array[:size] = self.times_array[start:self.end]
+            self.values_array[:size] = self.values_array[start:self.end]
+            self.start, self.end = 0, size
+            self.rebase()
+        times = self.encode(times)
+        self.times_array[self.end:self.end + count] = times
+        self.values_array[self.end:self.end + count] = values
+        self.end += count
+        self.start = max(self.start, self.end - self.capacity)
+
+    def resize(self, capacity, compact=None):
+        times, values = self.data()
+        total = self.total
+        self.__init__(capacity, self.compact if compact is None else compact)
+        self.append(times, values)
+        self.total = total
+
+    def clear(self):
+        self.__init__(self.capacity, self.compact)
+
+    def data(self):
+        # copies, the curves keep them while the buffer moves on
+        return (
+            self.decode(self.times_array[self.start:self.end]),
+            numpy.array(self.values_array[self.start:self.end]))
+
+    def raw(self):
+        # stored arrays and time base, for snapshots
+        return (
+            numpy.array(self.times_array[self.start:self.end]),
+            numpy.array(self.values_array[self.start:self.end]),
+            self.base)
+
+    def restore(self, times, values, base):
+        # arrays of raw() are copied as they are when the storage matches
+        if times.dtype != self.times_array.dtype or values.dtype != self.values_array.dtype:
+            if times.dtype == numpy.int32:
+                times = times * self.TIME_UNIT + base
+            self.append(times, values)
+            return
+        count = min(len(times), self.capacity)
+        if base is not None:
+            self.set_base(base)
+        self.times_array[:count] = times[len(times) - count:]
+        self.values_array[:count] = values[len(values) - count:]
+        self.start, self.end = 0, count
+        self.total += count
+
+    def tail(self, count):
+        return (
+            self.decode(self.times_array[self.end - count:self.end]),
+            numpy.array(self.values_array[self.end - count:self.end]))
+
+
+class ChannelStore:
+    # buffers of all channels, filled by the ingestion thread and read by the display,
+    # the memory budget is split evenly across the channels
+    def __init__(self, max_points, budget, compact=False):
+        self.lock = threading.Lock()
+        self.buffers = {}
+        # channels appended since the display took them
+        self.dirty = set()
+        self.max_points = max_points
+        self.budget = budget
+        self.compact = compact
+        self.capacity = self.fit_capacity(1)
+
+    def fit_capacity(self, channels):
+        return min(
+            self.max_points,
+            int(self.budget / (max(channels, 1) * ChannelBuffer.point_size(self.compact))))
+
+    def refit(self):
+        self.capacity = self.fit_capacity(len(self.buffers))
+        for buffer in self.buffers.values():
+            if buffer.capacity != self.capacity or buffer.compact != self.compact:
+                buffer.resize(self.capacity, self.compact)
+
+    def configure(self, max_points, budget, compact):
+        with self.lock:
+            if (max_points, budget, compact) != (self.max_points, self.budget, self.compact):
+                self.max_points, self.budget, self.compact = max_points, budget, compact
+                self.refit()
+
+    def add(self, results):
+        with self.lock:
+            if results.keys() - self.buffers.keys():
+                for channel in results:
+                    if channel not in self.buffers:
+                        self.buffers[channel] = ChannelBuffer(self.capacity, self.compact)
+                self.refit()
+            for channel, (times, values) in results.items():
+                self.buffers[channel].append(times, values)
+            self.dirty.update(results)
+
+    def take_dirty(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        # in order of appearance
+        return [channel for channel in self.buffers if channel in dirty]
+
+    def mark_dirty(self, channels):
+        # channels shown again are drawn on the next frame
+        with self.lock:
+            self.dirty.update(channel for channel in channels if channel in self.buffers)
+
+    def data(self, channel):
+        with self.lock:
+            return self.buffers[channel].data()
+
+    def since(self, channel, generation, total):
+        # samples appended after the reader's total and the number of the oldest
+        # retained sample (samples are numbered by total); all of them and reset when
+        # the buffer was refilled or the reader fell behind the retained samples,
+        # the reader then replaces what it has
+        with self.lock:
+            buffer = self.buffers[channel]
+            count = buffer.total - total
+            reset = generation != buffer.generation or not 0 <= count <= len(buffer)
+            if reset:
+                times, values = buffer.data()
+            else:
+                times, values = buffer.tail(count)
+            return (
+                buffer.generation, buffer.total, times, values,
+                buffer.total - len(buffer), reset)
+
+    def raw(self):
+        with self.lock:
+            return [(channel, *buffer.raw()) for channel, buffer in self.buffers.items()]
+
+    def ranges(self, channels):
+        # numbers of the oldest retained sample and after the newest, per channel
+        with self.lock:
+            return {
+                channel: (buffer.total - len(buffer), buffer.total)
+                for channel, buffer in self.buffers.items() if channel in channels}
+
+    def raw_range(self, channel, first, end):
+        # stored samples numbered from first to end that are still retained, and the time base
+        with self.lock:
+            buffer = self.buffers.get(channel)
+            if buffer is None:
+                return None
+            oldest = buffer.total - len(buffer)
+            start = buffer.start + max(first - oldest, 0)
+            stop = buffer.start + max(min(end, buffer.total) - oldest, 0)
+            return (
+                numpy.array(buffer.times_array[start:stop]),
+                numpy.array(buffer.values_array[start:stop]),
+                buffer.base)
+
+    def restore(self, entries):
+        with self.lock:
+            self.buffers = {}
+            self.capacity = self.fit_capacity(len(entries))
+            for channel, times, values, base in entries:
+                buffer = ChannelBuffer(self.capacity, self.compact)
+                buffer.restore(times, values, base)
+                self.buffers[channel] = buffer
+            self.dirty = set(self.buffers)
+
+    def nbytes(self):
+        with self.lock:
+            return sum(buffer.nbytes() for buffer in self.buffers.values())
+
+    def clear(self):
+        with self.lock:
+            self.buffers = {}
+            self.dirty = set()
+            self.capacity = self.fit_capacity(1)
@@ -0,0 +1,225 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from PyQt5 import QtWidgets, QtCore, QtGui
+from .settings import Settings
+
+
+class ChannelsFrame(QtWidgets.QFrame):
+    # channel -> pane index
+    assignment_changed = QtCore.pyqtSignal(dict)
+    pane_count_changed = QtCore.pyqtSignal(int)
+    # channel -> shown, only the changed channels
+    visibility_changed = QtCore.pyqtSignal(dict)
+
+    CHANNEL_ROLE = QtCore.Qt.UserRole
+    # channels seen for the first time are shown while fewer than this are shown
+    AUTO_VISIBLE = 16
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # saved by channel name, so it survives restarts and clears
+        panes = Settings.value('channel_panes')
+        self.saved_panes = dict(panes) if panes else {}
+        self.panes = {}
+        self.colours = {}
+        visible = Settings.value('channel_visible')
+        self.saved_visible = dict(visible) if visible else {}
+        self.visible = {}
+
+        self.spin_box_panes = QtWidgets.QSpinBox()
+        self.spin_box_panes.setRange(1, 16)
+        self.spin_box_panes.setToolTip("Number of stacked plots with a shared time axis.")
+        value = Settings.value('pane_count')
+        self.spin_box_panes.setValue(int(value) if value is not None else 1)
+        self.spin_box_panes.valueChanged.connect(self.on_pane_count_changed)
+
+        self.tree_widget = QtWidgets.QTreeWidget()
+        self.tree_widget.setHeaderHidden(True)
+        self.tree_widget.setToolTip(
+            "Drag channels between panes, unchecked channels are not drawn.")
+        self.tree_widget.setDragDropMode(
+            QtWidgets.QAbstractItemView.DragDropMode.InternalMove)
+        self.tree_widget.setSelectionMode(
+            QtWidgets.QAbstractItemView.ExtendedSelection)
+        root = self.tree_widget.invisibleRootItem()
+        root.setFlags(root.flags() & ~QtCore.Qt.ItemFlag.ItemIsDropEnabled)
+        self.tree_widget.model().rowsInserted.connect(self.on_rows_inserted)
+        self.tree_widget.itemChanged.connect(self.on_item_changed)
+        self.sync_pending = False
+
+        self.line_edit_filter = QtWidgets.QLineEdit()
+        self.line_edit_filter.setPlaceholderText("Filter")
+        self.line_edit_filter.setClearButtonEnabled(True)
+        self.line_edit_filter.setToolTip("Show only the channels whose name contains the text.")
+        self.line_edit_filter.textChanged.connect(self.apply_filter)
+        self.push_button_show = QtWidgets.QPushButton("Show")
+        self.push_button_show.setToolTip("Show the listed channels on the graphs.")
+        self.push_button_show.clicked.connect(lambda: self.set_listed_visible(True))
+        self.push_button_hide = QtWidgets.QPushButton("Hide")
+        self.push_button_hide.setToolTip(
+            "Hide the listed channels, their data is still collected.")
+        self.push_button_hide.clicked.connect(lambda: self.set_listed_visible(False))
+        self.label_count = QtWidgets.QLabel()
+
+        h_box_layout = QtWidgets.QHBoxLayout()
+        h_box_layout.addWidget(QtWidgets.QLabel("Panes:"))
+        h_box_layout.addWidget(self.spin_box_panes)
+        h_box_layout.addWidget(self.label_count)
+        h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.addWidget(self.line_edit_filter)
+        filter_layout.addWidget(self.push_button_show)
+        filter_layout.addWidget(self.push_button_hide)
+
+        v_box_layout = QtWidgets.QVBoxLayout(self)
+        v_box_layout.addLayout(h_box_layout)
+        v_box_layout.addLayout(filter_layout)
+        v_box_layout.addWidget(self.tree_widget)
+        self.rebuild()
+
+    def pane_count(self):
+        return self.spin_box_panes.value()
+
+    def pane_of(self, channel):
+        pane = self.panes.get(channel)
+        if pane is None:
+            pane = int(self.saved_panes.get(str(channel), 0))
+        return min(pane, self.pane_count() - 1)
+
+    def has_channel(self, channel):
+        return channel in self.panes
+
+    def is_visible(self, channel):
+        return self.visible.get(channel, False)
+
+    def add_channel(self, channel, colour):
+        self.colours[channel] = colour
+        self.panes[channel] = self.pane_of(channel)
+        visible = self.saved_visible.get(str(channel))
+        if visible is None:
+            visible = sum(self.visible.values()) < self.AUTO_VISIBLE
+        self.visible[channel] = bool(int(visible))
+        item = self.channel_item(channel)
+        self.pane_item(self.panes[channel]).addChild(item)
+        item.setHidden(not self.matches_filter(channel))
+        self.update_count()
+
+    def clear_channels(self):
+        self.panes = {}
+        self.colours = {}
+        self.visible = {}
+        self.rebuild()
+        self.update_count()
+
+    def update_count(self):
+        self.label_count.setText(
+            f"{sum(self.visible.values())}/{len(self.visible)} shown" if self.visible else "")
+
+    def matches_filter(self, channel):
+        return self.line_edit_filter.text().lower() in str(channel).lower()
+
+    def channel_items(self):
+        for pane in range(self.tree_widget.topLevelItemCount()):
+            pane_item = self.pane_item(pane)
+            for row in range(pane_item.childCount()):
+                yield pane_item.child(row)
+
+    def apply_filter(self):
+        for item in self.channel_items():
+            item.setHidden(not self.matches_filter(item.data(0, self.CHANNEL_ROLE)))
+
+    def set_listed_visible(self, visible):
+        # the channels left by the filter
+        changes = {}
+        prev_block = self.tree_widget.blockSignals(True)
+        for item in self.channel_items():
+            channel = item.data(0, self.CHANNEL_ROLE)
+            if not item.isHidden() and self.visible[channel] != visible:
+                item.setCheckState(0, QtCore.Qt.Checked if visible else QtCore.Qt.Unchecked)
+                changes[channel] = visible
+        self.tree_widget.blockSignals(prev_block)
+        self.set_visible(changes)
+
+    def set_visible(self, changes):
+        if not changes:
+            return
+        for channel, visible in changes.items():
+            self.visible[channel] = visible
+            self.saved_visible[str(channel)] = int(visible)
+        Settings.setValue('channel_visible', dict(self.saved_visible))
+        self.update_count()
+        self.visibility_changed.emit(changes)
+
+    def on_item_changed(self, item, column):
+        channel = item.data(0, self.CHANNEL_ROLE)
+        if channel is None or channel not in self.visible:
+            return
+        visible = item.checkState(0) == QtCore.Qt.Checked
+        # a dropped item is a copy with the same state
+        if visible != self.visible[channel]:
+            self.set_visible({channel: visible})
+
+    def pane_item(self, pane):
+        return self.tree_widget.topLevelItem(pane)
+
+    def channel_item(self, channel):
+        item = QtWidgets.QTreeWidgetItem([str(channel)])
+        item.setData(0, self.CHANNEL_ROLE, channel)
+        item.setFlags(
+            QtCore.Qt.ItemFlag.ItemIsSelectable |
+            QtCore.Qt.ItemFlag.ItemIsEnabled |
+            QtCore.Qt.ItemFlag.ItemIsUserCheckable |
+            QtCore.Qt.ItemFlag.ItemIsDragEnabled)
+        item.setCheckState(
+            0, QtCore.Qt.Checked if self.visible.get(channel) else QtCore.Qt.Unchecked)
+        pixmap = QtGui.QPixmap(12, 12)
+        pixmap.fill(self.colours[channel])
+        item.setIcon(0, QtGui.QIcon(pixmap))
+        return item
+
+    def rebuild(self):
+        prev_block = self.tree_widget.model().blockSignals(True)
+        self.tree_widget.clear()
+        for pane in range(self.pane_count()):
+            item = QtWidgets.QTreeWidgetItem([f"Pane {pane + 1}"])
+            item.setFlags(
+                QtCore.Qt.ItemFlag.ItemIsEnabled |
+                QtCore.Qt.ItemFlag.ItemIsDropEnabled)
+            self.tree_widget.addTopLevelItem(item)
+        for channel in self.panes:
+            self.panes[channel] = min(self.panes[channel], self.pane_count() - 1)
+            item = self.channel_item(channel)
+            self.pane_item(self.panes[channel]).addChild(item)
+            item.setHidden(not self.matches_filter(channel))
+        self.tree_widget.expandAll()
+        self.tree_widget.model().blockSignals(prev_block)
+        # the model signals were blocked, so the view has to be reset
+        self.tree_widget.reset()
+        self.tree_widget.expandAll()
+
+    def on_pane_count_changed(self, value):
+        Settings.setValue('pane_count', value)
+        self.rebuild()
+        self.pane_count_changed.emit(value)
+        self.assignment_changed.emit(dict(self.panes))
+
+    def on_rows_inserted(self, parent, first, last):
+        # the moved item is removed from its old place after insertion
+        if not self.sync_pending:
+            self.sync_pending = True
+            QtCore.QTimer.singleShot(0, self.sync_from_tree)
+
+    def sync_from_tree(self):
+        self.sync_pending = False
+        for pane in range(self.tree_widget.topLevelItemCount()):
+            pane_item = self.pane_item(pane)
+            for row in range(pane_item.childCount()):
+                channel = pane_item.child(row).data(0, self.CHANNEL_ROLE)
+                self.panes[channel] = pane
+                self.saved_panes[str(channel)] = pane
+        self.tree_widget.expandAll()
+        Settings.setValue('channel_panes', dict(self.saved_panes))
+        self.assignment_changed.emit(dict(self.panes))
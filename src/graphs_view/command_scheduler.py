@@ -0,0 +1,53 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+from PyQt5 import QtCore
+
+
+class CommandScheduler(QtCore.QObject):
+    # sends at most `rate` commands per second, a newer command with the same
+    # key replaces the pending one, the last submitted value is always sent
+    DEFAULT_RATE = 20  # commands per second
+
+    command_ready = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # key -> line, oldest key first
+        self.pending = {}
+        self.interval = 1.0 / self.DEFAULT_RATE
+        self.last_send = None
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def set_rate(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+
+    def submit(self, key, line):
+        self.pending.pop(key, None)
+        self.pending[key] = line
+        self.schedule()
+
+    def clear(self):
+        self.pending = {}
+        self.timer.stop()
+
+    def schedule(self):
+        if self.timer.isActive():
+            return
+        delay = 0.0
+        if self.last_send is not None:
+            delay = max(0.0, self.last_send + self.interval - time.monotonic())
+        self.timer.start(int(delay * 1000))
+
+    def flush(self):
+        if not self.pending:
+            return
+        key = next(iter(self.pending))
+        line = self.pending.pop(key)
+        self.last_send = time.monotonic()
+        self.command_ready.emit(line)
+        if self.pending:
+            self.schedule()
@@ -1,14 +1,69 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import datetime
+import math
+import os
+import time
+import numpy
 from PyQt5 import QtCore
 from PyQt5 import QtWidgets, QtCore, QtGui
 from .settings import Settings
+from .command_scheduler import CommandScheduler
+from .sequence import parse_sequence
+from .hex_view import HexView
+from .profiler import tracer
+from .line_store import LineStore
+
+
+class LineListModel(QtCore.QAbstractListModel):
+    # rows are line numbers of the store, texts are read only for the visible rows
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.lines = numpy.empty(0, dtype='i8')
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        line = int(self.lines[index.row()])
+        if line < self.store.first:
+            return ""
+        text = self.store.line(line).decode(errors='replace')
+        line_time = self.store.time(line)
+        if math.isnan(line_time):
+            return text
+        return datetime.datetime.fromtimestamp(line_time).strftime('%H:%M:%S.%f')[:-3] + "  " + text
+
+    def set_lines(self, lines):
+        self.beginResetModel()
+        self.lines = numpy.asarray(lines, dtype='i8')
+        self.endResetModel()
+
+    def add_lines(self, lines):
+        if not len(lines):
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.lines), len(self.lines) + len(lines) - 1)
+        self.lines = numpy.concatenate((self.lines, lines))
+        self.endInsertRows()
 
 
 class ConsoleFrame(QtWidgets.QFrame):
+    # the text view keeps the tail, the whole scrollback is in the line store
+    MAX_BLOCKS = 10000
+    # ms, new lines are searched at this rate while a search is shown
+    SEARCH_RATE = 300
+    # lines indexed for search per idle call, a few milliseconds of work
+    INDEX_CHUNK = 2000
+
+    time_selected = QtCore.pyqtSignal(float)
+
     def __init__(self):
         super().__init__()
+        self.line_store = LineStore()
         self.combo_box_cmd = QtWidgets.QComboBox()
         self.combo_box_cmd.setEditable(True)
         self.combo_box_cmd.setToolTip(
@@ -28,6 +83,8 @@ class ConsoleFrame(QtWidgets.QFrame):
         self.push_button_send = QtWidgets.QPushButton("Send")
         self.push_button_send.setToolTip("Send command to port.")
         self.cmd_queue = None
+        self.command_scheduler = CommandScheduler(self)
+        self.command_scheduler.command_ready.connect(self.send_line)
         self.combo_box_cmd.setSizePolicy(
             QtWidgets.QSizePolicy.Expanding,
             QtWidgets.QSizePolicy.Fixed)
@@ -40,14 +97,81 @@ class ConsoleFrame(QtWidgets.QFrame):
         h_box_layout = QtWidgets.QHBoxLayout()
         v_box_layout.addLayout(h_box_layout)
 
+        self.push_button_sequence = QtWidgets.QPushButton("Sequence...")
+        self.push_button_sequence.setToolTip(
+            "Run a file of commands in the reader process, one command per line.\n"
+            "Directives: '@wait on|off' - wait for the RE/ER reply of each command,\n"
+            "'@timeout <s>' - reply timeout, '@delay <s>' - pause, '#' - comment.")
+        self.push_button_sequence.clicked.connect(self.on_sequence_clicked)
+        self.label_sequence = QtWidgets.QLabel()
+        self.sequence_running = False
+        self.sequence_failures = 0
+
         h_box_layout.addWidget(self.combo_box_cmd)
         h_box_layout.addWidget(self.combo_box_line_ending)
+        h_box_layout.addWidget(self.push_button_sequence)
+        h_box_layout.addWidget(self.label_sequence)
 
         self.plain_text_editor = QtWidgets.QPlainTextEdit()
         self.plain_text_editor.setToolTip(
             "Displays incoming stream from the COM port.")
         self.plain_text_editor.setReadOnly(True)
-        v_box_layout.addWidget(self.plain_text_editor)
+        self.plain_text_editor.setMaximumBlockCount(self.MAX_BLOCKS)
+
+        self.hex_view = HexView()
+
+        self.line_edit_search = QtWidgets.QLineEdit()
+        self.line_edit_search.setPlaceholderText("Search")
+        self.line_edit_search.setClearButtonEnabled(True)
+        self.line_edit_search.setToolTip(
+            "Show only the lines of the whole scrollback that contain the text,\n"
+            "double click a line to show its time on the graphs.")
+        self.line_edit_search.textChanged.connect(self.on_search_changed)
+        self.check_box_regex = QtWidgets.QCheckBox("Regex")
+        self.check_box_regex.setToolTip("Search with a regular expression (Python's re.search).")
+        self.check_box_regex.toggled.connect(self.on_search_changed)
+        self.check_box_case = QtWidgets.QCheckBox("Case")
+        self.check_box_case.setToolTip("Case sensitive search.")
+        self.check_box_case.toggled.connect(self.on_search_changed)
+        self.label_matches = QtWidgets.QLabel()
+        search_layout = QtWidgets.QHBoxLayout()
+        search_layout.addWidget(self.line_edit_search)
+        search_layout.addWidget(self.check_box_regex)
+        search_layout.addWidget(self.check_box_case)
+        search_layout.addWidget(self.label_matches)
+        v_box_layout.addLayout(search_layout)
+
+        self.search_model = LineListModel(self.line_store, self)
+        self.list_view_matches = QtWidgets.QListView()
+        self.list_view_matches.setModel(self.search_model)
+        self.list_view_matches.setUniformItemSizes(True)
+        self.list_view_matches.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.list_view_matches.activated.connect(self.on_match_activated)
+        # the first line that is not searched yet
+        self.searched = 0
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.timeout.connect(self.search_new_lines)
+        self.search_delay_timer = QtCore.QTimer(self)
+        self.search_delay_timer.setSingleShot(True)
+        self.search_delay_timer.timeout.connect(self.search)
+        # indexes the new lines whenever the event loop is idle
+        self.index_timer = QtCore.QTimer(self)
+        self.index_timer.timeout.connect(self.index_lines)
+
+        self.stacked_widget = QtWidgets.QStackedWidget()
+        self.stacked_widget.addWidget(self.plain_text_editor)
+        self.stacked_widget.addWidget(self.hex_view)
+        self.stacked_widget.addWidget(self.list_view_matches)
+        v_box_layout.addWidget(self.stacked_widget)
+
+        self.check_box_hex = QtWidgets.QCheckBox("Hex")
+        self.check_box_hex.setToolTip(
+            "Show the incoming stream as a paged hex/ASCII dump.")
+        self.check_box_hex.toggled.connect(self.on_hex_changed)
+        value = Settings.value('hex_view')
+        self.check_box_hex.setChecked(int(value) if value is not None else 0)
+        h_box_layout.addWidget(self.check_box_hex)
         self.set_cmd_queue(None)
 
         self.clear_action = QtWidgets.QAction("Clear")
@@ -71,6 +195,9 @@ class ConsoleFrame(QtWidgets.QFrame):
         history = Settings.value("history")
         if history:
             self.plain_text_editor.setPlainText(history)
+            # times of the lines of an earlier run are not known
+            self.line_store.feed(history.encode(), math.nan)
+            self.schedule_index()
 
         self.remove_action = QtWidgets.QAction("Remove")
         self.combo_box_cmd.addAction(self.remove_action)
@@ -98,12 +225,91 @@ class ConsoleFrame(QtWidgets.QFrame):
         self.combo_box_cmd.removeItem(
             self.combo_box_cmd.currentIndex())
 
+    def on_hex_changed(self, value):
+        Settings.setValue('hex_view', int(value))
+        self.show_view()
+
+    def show_view(self):
+        if self.line_edit_search.text():
+            self.stacked_widget.setCurrentWidget(self.list_view_matches)
+        elif self.check_box_hex.isChecked():
+            self.stacked_widget.setCurrentWidget(self.hex_view)
+        else:
+            self.stacked_widget.setCurrentWidget(self.plain_text_editor)
+
     def on_clear_history(self):
         self.plain_text_editor.clear()
+        self.hex_view.clear()
+        self.line_store.clear()
+        self.search()
         Settings.setValue("history", "")
 
+    def on_search_changed(self):
+        # typing restarts the delay, so a long scrollback is searched once
+        self.search_delay_timer.start(self.SEARCH_RATE)
+
+    def search(self):
+        text = self.line_edit_search.text()
+        self.searched = self.line_store.complete()
+        if not text:
+            self.search_timer.stop()
+            self.search_model.set_lines([])
+            self.label_matches.setText("")
+            self.show_view()
+            return
+        try:
+            lines = self.line_store.search(
+                text, self.check_box_regex.isChecked(), self.check_box_case.isChecked())
+        except ValueError as e:
+            self.search_model.set_lines([])
+            self.label_matches.setText(f"<font color='red'>{e}</font>")
+            return
+        self.search_model.set_lines(lines[lines < self.searched])
+        self.update_matches_label()
+        self.search_timer.start(self.SEARCH_RATE)
+        self.show_view()
+
+    def search_new_lines(self):
+        store = self.line_store
+        end = store.complete()
+        if end <= self.searched:
+            return
+        # rows of the lines dropped from the store are removed
+        lines = self.search_model.lines
+        if len(lines) and lines[0] < store.first:
+            self.search_model.set_lines(lines[lines >= store.first])
+        lines = store.search(
+            self.line_edit_search.text(), self.check_box_regex.isChecked(),
+            self.check_box_case.isChecked(), self.searched)
+        self.search_model.add_lines(lines[lines < end])
+        self.searched = end
+        self.update_matches_label()
+
+    def schedule_index(self):
+        if not self.index_timer.isActive():
+            self.index_timer.start()
+
+    def index_lines(self):
+        self.line_store.index(self.INDEX_CHUNK)
+        if not self.line_store.unindexed():
+            self.index_timer.stop()
+
+    def update_matches_label(self):
+        self.label_matches.setText(
+            f"{len(self.search_model.lines)} of {len(self.line_store) - self.line_store.first} lines")
+
+    def on_match_activated(self, index):
+        line = int(self.search_model.lines[index.row()])
+        if line < self.line_store.first:
+            return
+        line_time = self.line_store.time(line)
+        if not math.isnan(line_time):
+            self.time_selected.emit(line_time)
+
     def set_cmd_queue(self, cmd_queue):
         self.cmd_queue = cmd_queue
+        self.command_scheduler.clear()
+        self.set_sequence_running(False)
         self.setEnabled(bool(self.cmd_queue))
 
     def on_line_changed(self):
@@ -115,16 +321,17 @@ class ConsoleFrame(QtWidgets.QFrame):
             line_ending = self.combo_box_line_ending.itemData(
                 self.combo_box_line_ending.currentIndex())
 
-            cursor = QtGui.QTextCursor(self.plain_text_editor.document())
-            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-            cursor.insertText(line + ("" if not line_ending else '\n'))
-            self.plain_text_editor.moveCursor(
-                QtGui.QTextCursor.MoveOperation.End)
+            self.insert_text(line + ("" if not line_ending else '\n'))
 
-            Settings.setValue("history", self.plain_text_editor.toPlainText())
+            Settings.setDeferredValue("history", self.plain_text_editor.toPlainText)
             data = line.encode() + line_ending
             self.cmd_queue.put(data)
 
+    def send_line_coalesced(self, key, line):
+        # only the newest pending line for the key is sent, at the scheduler rate
+        if self.cmd_queue:
+            self.command_scheduler.submit(key, line)
+
     def on_currentIndexChanged(self, index):
         Settings.setValue(
             "commands",
@@ -132,8 +339,81 @@ class ConsoleFrame(QtWidgets.QFrame):
         Settings.setValue("last_commands_index",
                           self.combo_box_cmd.currentIndex())
 
-    def on_new_line(self, line):
+    def on_sequence_clicked(self):
+        if self.sequence_running:
+            self.cmd_queue.put(('sequence_stop',))
+            return
+
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Run sequence", Settings.value("sequence_dir") or "",
+            "Sequence (*.txt *.seq);;All files (*)")
+        if not path:
+            return
+        Settings.setValue("sequence_dir", os.path.dirname(path))
+        try:
+            with open(path) as file:
+                steps = parse_sequence(
+                    file.read(),
+                    self.combo_box_line_ending.itemData(
+                        self.combo_box_line_ending.currentIndex()))
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(
+                self, "Warning: can't load sequence", str(e))
+            return
+
+        if self.cmd_queue:
+            self.sequence_failures = 0
+            self.cmd_queue.put(('sequence', steps))
+            self.set_sequence_running(True)
+            self.label_sequence.setText(f"0/{len(steps)}")
+
+    def set_sequence_running(self, running):
+        self.sequence_running = running
+        self.push_button_sequence.setText("Stop" if running else "Sequence...")
+
+    def on_reader_event(self, event):
+        if event[0] == 'sequence':
+            _, index, total, command, reply, status = event
+            self.label_sequence.setText(f"{index + 1}/{total}")
+            if status in ('error', 'timeout'):
+                self.sequence_failures += 1
+                reply = reply.decode(errors='replace') if reply else 'no reply'
+                self.insert_text(
+                    f"sequence step {index + 1}: "
+                    f"{command.decode(errors='replace').rstrip()} -> {reply} ({status})\n")
+        elif event[0] == 'rule':
+            _, index, source, _, value, command, reaction = event
+            self.insert_text(
+                f"rule {index + 1}: {source} [{value:.6g}] -> "
+                f"{command.decode(errors='replace').rstrip()} ({reaction * 1000:.2f} ms)\n")
+        elif event[0] == 'sequence_done':
+            _, executed, total, stopped = event
+            self.set_sequence_running(False)
+            self.label_sequence.setText(
+                f"{'stopped' if stopped else 'done'} {executed}/{total}, "
+                f"failed: {self.sequence_failures}")
+
+    def insert_text(self, text, line_time=None):
+        self.line_store.feed(text.encode(), time.time() if line_time is None else line_time)
+        self.schedule_index()
+        self.show_text(text)
+
+    def show_text(self, text):
         cursor = QtGui.QTextCursor(self.plain_text_editor.document())
         cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
-        cursor.insertText(line.decode())
+        cursor.insertText(text)
         self.plain_text_editor.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+
+    def on_new_lines(self, lines, times, framed):
+        with tracer.span('console.insert', 'gui'):
+            if framed:
+                self.line_store.feed_lines(lines, times)
+            else:
+                for line, line_time in zip(lines, times):
+                    self.line_store.feed(line, line_time)
+            self.schedule_index()
+            if self.check_box_hex.isChecked():
+                for line in lines:
+                    self.hex_view.append(line)
+            else:
+                self.show_text(b''.join(lines).decode(errors='replace'))
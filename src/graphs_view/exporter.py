@@ -0,0 +1,215 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import csv
+import importlib.util
+import itertools
+import os
+import tempfile
+import zipfile
+import numpy
+from PyQt5 import QtCore
+from .capture import CaptureReader
+from .channel_buffer import ChannelBuffer
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+class BufferSource:
+    CHUNK = 65536
+
+    def __init__(self, entries, columns=('time', 'value')):
+        # entries: (channel, xs, ys), lengths are frozen here so the GUI can keep appending
+        self.columns = columns
+        self.entries = [
+            (str(channel), xs, ys, min(len(xs), len(ys)))
+            for channel, xs, ys in entries]
+
+    def counts(self):
+        counts = {}
+        for channel, _, _, count in self.entries:
+            counts[channel] = counts.get(channel, 0) + count
+        return counts
+
+    def iter_chunks(self, channel=None):
+        for name, xs, ys, count in self.entries:
+            if channel is not None and name != channel:
+                continue
+            for start in range(0, count, self.CHUNK):
+                end = min(start + self.CHUNK, count)
+                yield (
+                    name,
+                    numpy.asarray(xs[start:end], dtype='<f8'),
+                    numpy.asarray(ys[start:end], dtype='<f8'))
+
+
+class StoreSource:
+    # channels of the channel store: the retained samples are counted when the export
+    # starts and copied chunk by chunk as stored, so the export thread decodes them
+    # and the store is never copied whole; samples dropped meanwhile are not exported
+    CHUNK = BufferSource.CHUNK
+
+    def __init__(self, store, channels):
+        self.columns = ('time', 'value')
+        self.store = store
+        self.channels = set(channels)
+        self.ranges = {}
+
+    def counts(self):
+        self.ranges = self.store.ranges(self.channels)
+        return {str(channel): end - first for channel, (first, end) in self.ranges.items()}
+
+    def iter_chunks(self, channel=None):
+        for name, (first, end) in self.ranges.items():
+            if channel is not None and str(name) != channel:
+                continue
+            for start in range(first, end, self.CHUNK):
+                chunk = self.store.raw_range(name, start, min(start + self.CHUNK, end))
+                if chunk is None:
+                    break
+                times, values, base = chunk
+                if not len(times):
+                    continue
+                if times.dtype == numpy.int32:
+                    times = times * ChannelBuffer.TIME_UNIT + base
+                yield (
+                    str(name),
+                    numpy.asarray(times, dtype='<f8'),
+                    numpy.asarray(values, dtype='<f8'))
+
+
+class CaptureSource:
+    def __init__(self, path):
+        self.columns = ('time', 'value')
+        self.reader = CaptureReader(path, os.path.getsize(path))
+
+    def counts(self):
+        return self.reader.channels()
+
+    def iter_chunks(self, channel=None):
+        return self.reader.iter_blocks(channel)
+
+
+class Exporter(QtCore.QThread):
+    FORMATS = {
+        '.csv': 'CSV (*.csv)',
+        '.npz': 'NumPy (*.npz)',
+        '.parquet': 'Parquet (*.parquet)'}
+    # rows per parquet row group
+    ROW_GROUP = 1 << 20
+
+    progress = QtCore.pyqtSignal(int)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, source, path, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.path = path
+        self.cancelled = False
+        self.done = 0
+        self.total = 0
+
+    @classmethod
+    def file_filters(cls):
+        return [
+            text for ext, text in cls.FORMATS.items()
+            if ext != '.parquet' or parquet_available()]
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            counts = self.source.counts()
+            self.total = sum(counts.values())
+            ext = os.path.splitext(self.path)[1].lower()
+            if ext == '.npz':
+                self.write_npz(counts)
+            elif ext == '.parquet':
+                self.write_parquet()
+            else:
+                self.write_csv()
+            if self.cancelled:
+                os.remove(self.path)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def advance(self, count):
+        self.done += count
+        if self.total:
+            self.progress.emit(int(self.done * 100 / self.total))
+        return not self.cancelled
+
+    def write_csv(self):
+        x_name, y_name = self.source.columns
+        with open(self.path, 'w', newline='') as file:
+            # channel names are quoted by the writer when they need it
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(('channel', x_name, y_name))
+            for channel, xs, ys in self.source.iter_chunks():
+                # floats are written with repr, which reads back to the same value
+                writer.writerows(zip(itertools.repeat(channel), xs.tolist(), ys.tolist()))
+                if not self.advance(len(xs)):
+                    return
+
+    def write_npz(self, counts):
+        # one pass over the source: the columns are spooled to temporary files, then
+        # every channel is written as .npy members of the samples actually read
+        segments = {channel: [] for channel in counts}
+        with tempfile.TemporaryFile() as x_spool, tempfile.TemporaryFile() as y_spool:
+            for channel, xs, ys in self.source.iter_chunks():
+                segments.setdefault(channel, []).append((x_spool.tell(), len(xs)))
+                x_spool.write(xs.tobytes())
+                y_spool.write(ys.tobytes())
+                if not self.advance(len(xs)):
+                    return
+            with zipfile.ZipFile(self.path, 'w', allowZip64=True) as archive:
+                for channel, parts in segments.items():
+                    count = sum(length for _, length in parts)
+                    for column, spool in zip(self.source.columns, (x_spool, y_spool)):
+                        with archive.open(f'{column}_{channel}.npy', 'w', force_zip64=True) as member:
+                            numpy.lib.format.write_array_header_1_0(member, {
+                                'descr': '<f8', 'fortran_order': False, 'shape': (count,)})
+                            for offset, length in parts:
+                                spool.seek(offset)
+                                member.write(spool.read(length * 8))
+                            if self.cancelled:
+                                return
+
+    def write_parquet(self):
+        import pyarrow
+        import pyarrow.parquet
+
+        x_name, y_name = self.source.columns
+        schema = pyarrow.schema([
+            ('channel', pyarrow.string()),
+            (x_name, pyarrow.float64()),
+            (y_name, pyarrow.float64())])
+        pending = []
+        pending_len = 0
+
+        def flush():
+            channels = pyarrow.array(
+                numpy.concatenate([numpy.full(len(xs), name, dtype=object) for name, xs, _ in pending]),
+                type=pyarrow.string())
+            table = pyarrow.Table.from_arrays([
+                channels,
+                pyarrow.array(numpy.concatenate([xs for _, xs, _ in pending])),
+                pyarrow.array(numpy.concatenate([ys for _, _, ys in pending]))],
+                schema=schema)
+            writer.write_table(table)
+            pending.clear()
+
+        with pyarrow.parquet.ParquetWriter(self.path, schema) as writer:
+            for chunk in self.source.iter_chunks():
+                pending.append(chunk)
+                pending_len += len(chunk[1])
+                if pending_len >= self.ROW_GROUP:
+                    flush()
+                    pending_len = 0
+                if not self.advance(len(chunk[1])):
+                    return
+            if pending:
+                flush()
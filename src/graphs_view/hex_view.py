@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from PyQt5 import QtWidgets, QtCore, QtGui
+
+
+class HexView(QtWidgets.QFrame):
+    BYTES_PER_ROW = 16
+    PAGE_SIZE = 4096
+    MAX_BYTES = 16 * 1024 * 1024
+    UPDATE_RATE = 200  # ms
+    PRINTABLE = bytes(
+        byte if 32 <= byte < 127 else ord('.') for byte in range(256))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data = bytearray()
+        # absolute stream offset of self.data[0], older bytes are dropped
+        self.base = 0
+        self.dirty = False
+        self.shown_page = None
+
+        self.spin_box_page = QtWidgets.QSpinBox()
+        self.spin_box_page.setToolTip("Page of the binary stream to display.")
+        self.spin_box_page.valueChanged.connect(self.on_page_changed)
+        self.check_box_follow = QtWidgets.QCheckBox("Follow")
+        self.check_box_follow.setToolTip("Always show the last page.")
+        self.check_box_follow.setChecked(True)
+        self.check_box_follow.toggled.connect(self.on_follow_changed)
+        self.label_size = QtWidgets.QLabel()
+
+        self.plain_text_editor = QtWidgets.QPlainTextEdit()
+        self.plain_text_editor.setReadOnly(True)
+        self.plain_text_editor.setLineWrapMode(
+            QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        self.plain_text_editor.setFont(
+            QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+
+        h_box_layout = QtWidgets.QHBoxLayout()
+        h_box_layout.addWidget(QtWidgets.QLabel("Page:"))
+        h_box_layout.addWidget(self.spin_box_page)
+        h_box_layout.addWidget(self.check_box_follow)
+        h_box_layout.addWidget(self.label_size)
+        h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+
+        v_box_layout = QtWidgets.QVBoxLayout(self)
+        v_box_layout.setContentsMargins(0, 0, 0, 0)
+        v_box_layout.addLayout(h_box_layout)
+        v_box_layout.addWidget(self.plain_text_editor)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.UPDATE_RATE)
+
+    def append(self, data):
+        self.data += data
+        extra = len(self.data) - self.MAX_BYTES
+        if extra > 0:
+            # drop whole pages, so page boundaries stay on the same offsets
+            extra = -(-extra // self.PAGE_SIZE) * self.PAGE_SIZE
+            del self.data[:extra]
+            self.base += extra
+        self.dirty = True
+
+    def clear(self):
+        self.data = bytearray()
+        self.base = 0
+        self.shown_page = None
+        self.dirty = True
+
+    def first_page(self):
+        return self.base // self.PAGE_SIZE
+
+    def last_page(self):
+        return max(self.base + len(self.data) - 1, 0) // self.PAGE_SIZE
+
+    def on_follow_changed(self, value):
+        self.dirty = True
+
+    def on_page_changed(self, page):
+        if page != self.last_page():
+            prev_block = self.check_box_follow.blockSignals(True)
+            self.check_box_follow.setChecked(False)
+            self.check_box_follow.blockSignals(prev_block)
+        self.dirty = True
+
+    def refresh(self):
+        if not self.dirty or not self.isVisible():
+            return
+        self.dirty = False
+
+        prev_block = self.spin_box_page.blockSignals(True)
+        self.spin_box_page.setRange(self.first_page(), self.last_page())
+        if self.check_box_follow.isChecked():
+            self.spin_box_page.setValue(self.last_page())
+        self.spin_box_page.blockSignals(prev_block)
+        self.label_size.setText(f"{self.base + len(self.data)} bytes")
+
+        page = self.spin_box_page.value()
+        start = page * self.PAGE_SIZE - self.base
+        end = start + self.PAGE_SIZE
+        # a full page that is already on screen does not change anymore
+        if page == self.shown_page and end <= len(self.data) and \
+                self.plain_text_editor.document().lineCount() >= self.PAGE_SIZE // self.BYTES_PER_ROW:
+            return
+        self.shown_page = page
+        self.plain_text_editor.setPlainText(self.format(start, min(end, len(self.data))))
+
+    def format(self, start, end):
+        rows = []
+        for offset in range(start, end, self.BYTES_PER_ROW):
+            row = bytes(self.data[offset:min(offset + self.BYTES_PER_ROW, end)])
+            rows.append(
+                f"{self.base + offset:08x}  "
+                f"{row.hex(' '):<{self.BYTES_PER_ROW * 3 - 1}}  "
+                f"{row.translate(self.PRINTABLE).decode('ascii')}")
+        return "\n".join(rows)
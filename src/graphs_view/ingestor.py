@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import queue
+import threading
+import numpy
+from PyQt5 import QtCore
+from .profiler import tracer
+
+
+class Ingestor(QtCore.QThread):
+    # drains the reader queue into the channel store whatever the display does,
+    # lines (as (time, line)) and reader events are passed to the GUI thread in batches
+    POLL_TIMEOUT = 0.1
+    # packets handled before the lines are passed on
+    MAX_DRAIN = 10000
+
+    lines_received = QtCore.pyqtSignal(list)
+    event_received = QtCore.pyqtSignal(object)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.out_queue = None
+        self.stopped = False
+        # capture and relay get every batch, swapped under the lock
+        self.sinks = {}
+        self.sinks_lock = threading.Lock()
+
+    def set_queue(self, out_queue):
+        self.out_queue = out_queue
+
+    def set_sink(self, name, write):
+        with self.sinks_lock:
+            if write is None:
+                self.sinks.pop(name, None)
+            else:
+                self.sinks[name] = write
+
+    def stop(self):
+        self.stopped = True
+        self.wait()
+
+    def run(self):
+        while not self.stopped:
+            out_queue = self.out_queue
+            if out_queue is None:
+                self.msleep(int(self.POLL_TIMEOUT * 1000))
+                continue
+            try:
+                packet = out_queue.get(True, self.POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+            results = {}
+            lines = []
+            with tracer.span('drain', 'ingest'):
+                self.drain(out_queue, packet, results, lines)
+            if results:
+                results = {
+                    index: (numpy.concatenate(_time), numpy.concatenate(val))
+                    for index, (_time, val) in results.items()}
+                with tracer.span('store', 'ingest'):
+                    self.store.add(results)
+                    with self.sinks_lock:
+                        for write in self.sinks.values():
+                            write(results)
+            if lines:
+                self.lines_received.emit(lines)
+
+    def drain(self, out_queue, packet, results, lines):
+        # the packet and up to MAX_DRAIN - 1 more that are already queued
+        self.handle(packet, results, lines)
+        for _ in range(self.MAX_DRAIN - 1):
+            try:
+                with tracer.span('queue.get', 'queue'):
+                    packet = out_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.handle(packet, results, lines)
+
+    def handle(self, packet, results, lines):
+        if packet is None:
+            return
+        # reader events are tagged by name
+        if isinstance(packet[0], str):
+            if packet[0] == 'batch':
+                for index, (_time, val) in packet[1].items():
+                    # batches are joined once per drain
+                    store = results.setdefault(index, ([], []))
+                    store[0].append(_time)
+                    store[1].append(val)
+            elif packet[0] == 'lines':
+                lines.extend(zip(packet[1], packet[2]))
+            elif packet[0] == 'trace_events':
+                tracer.add_remote(packet[1])
+            else:
+                self.event_received.emit(packet)
+            return
+        lines.append((packet[1], packet[2]))
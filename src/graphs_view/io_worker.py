@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import queue
+import socket
+import threading
+from .bounded_queue import BoundedQueue
+from .sender import Sender
+from .pipeline import ReaderPipeline
+from .parsers import create_parser
+from .profiler import tracer
+from .udp_receiver import UdpReceiver
+
+# SERIAL PORT READER
+
+
+def process_port_serial(in_queue, out_queue, settings):
+    import serial
+
+    with serial.Serial(**settings['serial']) as ser:
+        is_string_parsing = settings['parsing_mode']
+        ser.reset_input_buffer()
+        ser.reset_output_buffer()
+        sender = Sender(ser.write, in_queue, out_queue)
+        sender.rules.configure(settings['rules'])
+        pipeline = ReaderPipeline(
+            out_queue, sender,
+            create_parser(settings['parser']['name'], settings['parser']))
+        out_queue.put(('port_opened', settings['session']), force=True)
+        send_thread = threading.Thread(target=sender.run)
+        send_thread.start()
+
+        # row mode
+        if not is_string_parsing:
+            while not sender.stopped:
+                with tracer.span('read', 'reader'):
+                    packet = ser.read(max(ser.in_waiting, settings['raw_block']))
+                if packet:
+                    pipeline.feed_raw(packet, pipeline.now())
+        # string parsing
+        else:
+            byte_time = pipeline.clock.serial_byte_time(settings['serial']['baudrate'])
+            while not sender.stopped:
+                with tracer.span('read', 'reader'):
+                    chunk = ser.read(max(ser.in_waiting, 1))
+                if chunk:
+                    pipeline.feed_lines(chunk, pipeline.now(), byte_time)
+        send_thread.join()
+
+# PROCESS PORT UDP
+
+
+def process_port_udp(in_queue, out_queue, settings):
+    # Setup UDP socket
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
+        udp_socket.bind((
+            settings['udp']['bind_ip'],
+            settings['udp']['bind_port']))
+        receiver = UdpReceiver(udp_socket, settings['udp']['rcvbuf'])
+        timeout = settings['udp']['timeout']
+
+        # If sending data, set up destination IP and port
+        dest_ip = settings['udp']['dest_ip']
+        dest_port = settings['udp']['dest_port']
+
+        is_string_parsing = settings['parsing_mode']
+        sender = Sender(
+            lambda data: udp_socket.sendto(data, (dest_ip, dest_port)),
+            in_queue, out_queue)
+        sender.rules.configure(settings['rules'])
+        pipeline = ReaderPipeline(
+            out_queue, sender,
+            create_parser(settings['parser']['name'], settings['parser']))
+        out_queue.put(('port_opened', settings['session']), force=True)
+        send_thread = threading.Thread(target=sender.run)
+        send_thread.start()
+
+        while not sender.stopped:
+            # row mode, a datagram is a packet
+            if not is_string_parsing:
+                with tracer.span('read', 'reader'):
+                    packets = receiver.receive(timeout)
+                read_time = pipeline.now()
+                for packet in packets:
+                    pipeline.feed_raw(packet, read_time)
+            # string parsing, datagrams of a wakeup are one chunk of the stream
+            else:
+                with tracer.span('read', 'reader'):
+                    chunk = receiver.receive_stream(timeout)
+                if chunk:
+                    read_time = pipeline.now()
+                    pipeline.feed_lines(
+                        chunk, read_time,
+                        pipeline.clock.datagram_byte_time(read_time, len(chunk)))
+            stats = receiver.stats()
+            if stats:
+                out_queue.put(stats, force=True)
+        send_thread.join()
+
+
+PORT_READERS = {
+    'serial': process_port_serial,
+    'udp': process_port_udp}
+
+
+class PortSession(threading.Thread):
+    # one opened port inside the worker, commands reach its Sender through a local queue
+    def __init__(self, kind, out_queue, settings):
+        super().__init__(daemon=True)
+        self.kind = kind
+        self.out_queue = out_queue
+        self.settings = settings
+        self.commands = queue.Queue()
+
+    def run(self):
+        error = None
+        try:
+            PORT_READERS[self.kind](self.commands, self.out_queue, self.settings)
+        except Exception as e:
+            error = str(e)
+        finally:
+            self.out_queue.put(('port_closed', self.settings['session'], error), force=True)
+
+    def close(self):
+        self.commands.put(None)
+        self.join()
+
+
+def run_worker(in_queue, out_queue):
+    # in_queue: ('open', kind, settings), ('close',), ('trace', state), ('trace_dump',),
+    # None - exit, everything else goes to the Sender of the opened port
+    session = None
+    try:
+        while 1:
+            message = in_queue.get()
+            if not message:
+                break
+            if isinstance(message, tuple) and message[0] in ('open', 'close'):
+                if session:
+                    session.close()
+                    session = None
+                if message[0] == 'open':
+                    _, kind, settings = message
+                    out_queue.policy = settings['queue_policy']
+                    session = PortSession(kind, out_queue, settings)
+                    session.start()
+            elif isinstance(message, tuple) and message[0] == 'trace':
+                tracer.enable(message[1])
+            elif isinstance(message, tuple) and message[0] == 'trace_dump':
+                out_queue.put(('trace_events', tracer.take()), force=True)
+            elif session:
+                session.commands.put(message)
+    finally:
+        if session:
+            session.close()
+
+
+class IoWorker:
+    # long lived reader process started in background, ports are opened,
+    # closed and reconfigured by messages instead of new processes
+    STOP_TIMEOUT = 2
+
+    def __init__(self, queue_size, policy):
+        self.in_queue = multiprocessing.Queue()
+        self.out_queue = BoundedQueue(queue_size, policy)
+        self.session = 0
+        self.process = multiprocessing.Process(
+            target=run_worker, args=(self.in_queue, self.out_queue), daemon=True)
+        self.process.start()
+
+    def open(self, kind, settings):
+        # an opened port is closed first, so this is also the reconfiguration
+        self.session += 1
+        self.in_queue.put(('open', kind, dict(settings, session=self.session)))
+        return self.session
+
+    def close(self):
+        self.in_queue.put(('close',))
+
+    def stop(self):
+        self.in_queue.put(None)
+        self.process.join(self.STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
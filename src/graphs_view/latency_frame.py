@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import bisect
+import csv
+import math
+import os
+import re
+from PyQt5 import QtWidgets, QtCore
+from .settings import Settings
+
+
+# log spaced bins from 10 us to 100 s, 20 per decade
+LATENCY_EDGES = [1e-5 * 10 ** (i / 20) for i in range(20 * 7 + 1)]
+
+
+class LatencyStats:
+    EDGES = LATENCY_EDGES
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, latency):
+        self.counts[bisect.bisect_right(self.EDGES, latency)] += 1
+        self.count += 1
+        self.max = max(self.max, latency)
+
+    def percentile(self, q):
+        # upper edge of the bin holding the q-th sample, clamped to the max seen
+        rank = math.ceil(q * self.count)
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                if index < len(self.EDGES):
+                    return min(self.EDGES[index], self.max)
+                return self.max
+        return self.max
+
+
+class LatencyFrame(QtWidgets.QFrame):
+    PERCENTILES = (0.5, 0.95, 0.99)
+    UPDATE_RATE = 500  # ms
+    # trailing value of a command: 'set,/pid/p,1.5' -> 'set,/pid/p'
+    VALUE_SUFFIX = re.compile(r'[\s,=:]+[-+]?[\d.]+(?:[eE][-+]?\d+)?$')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import pyqtgraph
+
+        self.stats = {}
+        self.dirty = False
+
+        self.table_widget = QtWidgets.QTableWidget(0, 6, self)
+        self.table_widget.setHorizontalHeaderLabels(
+            ['command', 'count', 'p50, ms', 'p95, ms', 'p99, ms', 'max, ms'])
+        self.table_widget.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table_widget.setSelectionBehavior(
+            QtWidgets.QAbstractItemView.SelectRows)
+        self.table_widget.setSelectionMode(
+            QtWidgets.QAbstractItemView.SingleSelection)
+        self.table_widget.itemSelectionChanged.connect(self.update_histogram)
+
+        self.plot_histogram = pyqtgraph.PlotWidget(self)
+        self.plot_histogram.setLogMode(x=True)
+        self.plot_histogram.setLabel("bottom", "latency, ms")
+        self.plot_histogram.setLabel("left", "count")
+        self.curve_histogram = pyqtgraph.PlotCurveItem(
+            [1, 10], [0], stepMode='center', fillLevel=0, brush=(0, 128, 255, 120))
+        self.plot_histogram.addItem(self.curve_histogram)
+
+        self.push_button_reset = QtWidgets.QPushButton("Reset")
+        self.push_button_reset.setToolTip("Clear the collected latencies.")
+        self.push_button_reset.clicked.connect(self.on_reset)
+        self.push_button_export = QtWidgets.QPushButton("Export...")
+        self.push_button_export.setToolTip("Save the latency table as CSV.")
+        self.push_button_export.clicked.connect(self.on_export)
+
+        h_box_layout = QtWidgets.QHBoxLayout()
+        h_box_layout.addWidget(self.push_button_reset)
+        h_box_layout.addWidget(self.push_button_export)
+        h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+
+        splitter = QtWidgets.QSplitter(QtCore.Qt.Orientation.Horizontal)
+        splitter.addWidget(self.table_widget)
+        splitter.addWidget(self.plot_histogram)
+
+        v_box_layout = QtWidgets.QVBoxLayout(self)
+        v_box_layout.addLayout(h_box_layout)
+        v_box_layout.addWidget(splitter)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.update_table)
+        self.timer.start(self.UPDATE_RATE)
+
+    @classmethod
+    def command_prefix(cls, command):
+        command = command.decode(errors='replace').strip()
+        return cls.VALUE_SUFFIX.sub('', command) or command
+
+    def on_reader_event(self, event):
+        if event[0] == 'latency':
+            _, command, latency = event
+            self.stats.setdefault(
+                self.command_prefix(command), LatencyStats()).add(latency)
+            self.dirty = True
+
+    def on_reset(self):
+        self.stats = {}
+        self.table_widget.setRowCount(0)
+        self.curve_histogram.setData([1, 10], [0])
+
+    def rows(self):
+        for prefix, stats in sorted(self.stats.items()):
+            yield [prefix, stats.count] + [
+                stats.percentile(q) * 1000 for q in self.PERCENTILES] + [stats.max * 1000]
+
+    def update_table(self):
+        if not self.dirty or not self.isVisible():
+            return
+        self.dirty = False
+        rows = list(self.rows())
+        self.table_widget.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                text = f"{value:.3f}" if isinstance(value, float) else str(value)
+                item = self.table_widget.item(row, column)
+                if item is None:
+                    self.table_widget.setItem(row, column, QtWidgets.QTableWidgetItem(text))
+                else:
+                    item.setText(text)
+        self.update_histogram()
+
+    def update_histogram(self):
+        selected = self.table_widget.selectedItems()
+        if not selected:
+            return
+        stats = self.stats.get(self.table_widget.item(selected[0].row(), 0).text())
+        if stats is None:
+            return
+        # log mode axis shows log10 of edges, first and overflow bins are not drawn
+        edges = [edge * 1000 for edge in LatencyStats.EDGES]
+        self.curve_histogram.setData(edges, stats.counts[1:-1])
+
+    def on_export(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export latency", Settings.value("export_dir") or "", "CSV (*.csv)")
+        if not path:
+            return
+        if not os.path.splitext(path)[1]:
+            path += '.csv'
+        Settings.setValue("export_dir", os.path.dirname(path))
+        try:
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file, lineterminator='\n')
+                writer.writerow(("command", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"))
+                writer.writerows(
+                    [f"{value:.6f}" if isinstance(value, float) else value for value in values]
+                    for values in self.rows())
+        except OSError as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: export failed", str(e))
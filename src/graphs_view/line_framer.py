@@ -0,0 +1,35 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import re
+
+
+class LineFramer:
+    SPLITTER = re.compile(rb'[\r\n]+')
+
+    def __init__(self):
+        # 0 - first (possibly truncated) line, 1 - splitter, 2 - full line
+        self.state = 0
+        self.data = b''
+
+    def feed(self, chunk):
+        # returns (state, offset of the splitter in chunk, line) for every finished line
+        lines = []
+        pos = 0
+        for match in self.SPLITTER.finditer(chunk):
+            self.collect(chunk[pos:match.start()])
+            if self.state != 1:
+                data = self.data.strip()
+                if data:
+                    lines.append((self.state, match.start(), data))
+                self.data = b''
+            self.state = 1
+            pos = match.end()
+        self.collect(chunk[pos:])
+        return lines
+
+    def collect(self, data):
+        if data:
+            if self.state == 1:
+                self.state = 2
+            self.data += data
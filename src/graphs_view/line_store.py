@@ -0,0 +1,222 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import array
+import bisect
+import re
+import numpy
+
+# indexed tokens start with a letter, numbers would make the vocabulary as big as the log
+TOKEN = re.compile(rb'[A-Za-z_]\w+')
+WORD_CHAR = re.compile(rb'\w')
+
+
+class GrowingArray:
+    # numpy array with amortized appends
+    def __init__(self, dtype, size=1024):
+        self.array = numpy.empty(size, dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def view(self):
+        return self.array[:self.size]
+
+    def extend(self, values):
+        count = len(values)
+        if self.size + count > len(self.array):
+            array = numpy.empty(max(2 * len(self.array), self.size + count), dtype=self.array.dtype)
+            array[:self.size] = self.view()
+            self.array = array
+        self.array[self.size:self.size + count] = values
+        self.size += count
+
+    def drop(self, count):
+        self.array[:self.size - count] = self.array[count:self.size]
+        self.size -= count
+
+
+class LineStore:
+    # console scrollback: the text in one buffer, line start offsets and times in
+    # arrays and an inverted index of the words of complete lines. Line numbers are
+    # absolute, when the buffer is full the oldest half is dropped and `first` moves on
+    MAX_BYTES = 256 * 1024 * 1024
+    # above this share of candidate lines the buffer is scanned instead
+    SCAN_RATIO = 0.1
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.data = bytearray()
+        # absolute offset of data[0]
+        self.base = 0
+        self.starts = GrowingArray('i8')
+        self.times = GrowingArray('f8')
+        self.first = 0
+        # the last line got its newline
+        self.closed = True
+        self.indexed = 0
+        self.postings = {}
+
+    def __len__(self):
+        return self.first + len(self.starts)
+
+    def unindexed(self):
+        return self.complete() > self.indexed
+
+    def complete(self):
+        # absolute number after the last complete line
+        return len(self) - (0 if self.closed else 1)
+
+    def feed(self, chunk, time):
+        # a chunk may hold several lines or a part of one, a line gets the time of its first chunk
+        if not chunk:
+            return
+        offset = self.base + len(self.data)
+        self.data += chunk
+        newlines = numpy.flatnonzero(numpy.frombuffer(chunk, dtype=numpy.uint8) == 10)
+        starts = newlines + 1
+        if starts.size and starts[-1] == len(chunk):
+            starts = starts[:-1]
+        if self.closed:
+            starts = numpy.concatenate(((0,), starts))
+        self.starts.extend(starts + offset)
+        self.times.extend(numpy.full(len(starts), time))
+        self.closed = chunk.endswith(b'\n')
+        if len(self.data) > self.MAX_BYTES:
+            self.trim(len(self) - len(self.starts) // 2)
+
+    def feed_lines(self, lines, times):
+        # complete lines, each ends with its only newline
+        if lines and not self.closed:
+            self.feed(lines[0], times[0])
+            lines, times = lines[1:], times[1:]
+        if not lines:
+            return
+        offset = self.base + len(self.data)
+        self.data += b''.join(lines)
+        lengths = numpy.fromiter(map(len, lines), dtype='i8', count=len(lines))
+        starts = numpy.cumsum(lengths) - lengths
+        self.starts.extend(starts + offset)
+        self.times.extend(times)
+        self.closed = True
+        if len(self.data) > self.MAX_BYTES:
+            self.trim(len(self) - len(self.starts) // 2)
+
+    def index(self, limit):
+        # words of at most `limit` lines completed since the last call, the GUI
+        # calls it when idle; lines not indexed yet are scanned by search()
+        end = min(self.complete(), self.indexed + limit)
+        if end <= self.indexed:
+            return
+        starts = self.starts.view()
+        first = self.indexed - self.first
+        segment = bytes(self.data[starts[first] - self.base:self.end_offset(end - 1) - self.base]).lower()
+        matches = [(match.start(), match.group()) for match in TOKEN.finditer(segment)]
+        if matches:
+            positions = numpy.fromiter(
+                (position for position, _ in matches), dtype='i8', count=len(matches))
+            lines = numpy.searchsorted(
+                starts[first:end - self.first], positions + starts[first], 'right') + self.indexed - 1
+            postings = self.postings
+            for line, (_, token) in zip(lines.tolist(), matches):
+                posting = postings.get(token)
+                if posting is None:
+                    postings[token] = array.array('q', (line,))
+                elif posting[-1] != line:
+                    posting.append(line)
+        self.indexed = end
+
+    def trim(self, first):
+        # lines before `first` are dropped
+        count = first - self.first
+        if count <= 0:
+            return
+        cut = self.starts.view()[count] - self.base
+        del self.data[:cut]
+        self.base += cut
+        self.starts.drop(count)
+        self.times.drop(count)
+        self.first = first
+        self.indexed = max(self.indexed, first)
+        for token in list(self.postings):
+            posting = self.postings[token]
+            keep = bisect.bisect_left(posting, first)
+            if keep == len(posting):
+                del self.postings[token]
+            elif keep:
+                del posting[:keep]
+
+    def end_offset(self, line):
+        # absolute offset of the newline (or the end) of a line
+        index = line - self.first + 1
+        if index < len(self.starts):
+            return self.starts.view()[index] - 1
+        return self.base + len(self.data) - (1 if self.closed else 0)
+
+    def line(self, line):
+        start = self.starts.view()[line - self.first] - self.base
+        return bytes(self.data[start:self.end_offset(line) - self.base])
+
+    def time(self, line):
+        return float(self.times.view()[line - self.first])
+
+    def line_of(self, offsets):
+        return numpy.searchsorted(self.starts.view(), offsets, 'right') - 1 + self.first
+
+    def search(self, text, regex=False, case=False, start=0):
+        # numbers of the lines from `start` that contain text, ValueError for a bad regex
+        start = max(start, self.first)
+        if start >= len(self):
+            return numpy.empty(0, dtype='i8')
+        query = text.encode()
+        if not regex:
+            candidates = self.candidates(query.lower(), start)
+            if candidates is not None and len(candidates) < self.SCAN_RATIO * (len(self) - start):
+                if not case:
+                    query = query.lower()
+                return numpy.array([
+                    line for line in candidates
+                    if query in (self.line(line) if case else self.line(line).lower())],
+                    dtype='i8')
+            query = re.escape(query)
+        try:
+            pattern = re.compile(query, (0 if case else re.IGNORECASE) | re.MULTILINE)
+        except re.error as e:
+            raise ValueError(str(e)) from None
+        return self.scan(pattern, start)
+
+    def scan(self, pattern, start):
+        # a match belongs to the line it starts in
+        starts = self.starts.view()
+        positions = numpy.fromiter(
+            (match.start() for match in pattern.finditer(
+                self.data, starts[start - self.first] - self.base)), dtype='i8')
+        return numpy.unique(self.line_of(positions + self.base))
+
+    def candidates(self, query, start):
+        # indexed lines that may contain query, None when its words are not indexed;
+        # the line after the last indexed one is always a candidate
+        best = None
+        for match in TOKEN.finditer(query):
+            word = match.group()
+            # a word at the edge of the query may be a part of a longer token
+            left = match.start() == 0 or WORD_CHAR.match(query, match.start() - 1)
+            right = match.end() == len(query)
+            if not left and not right:
+                lines = self.postings.get(word, ())
+            else:
+                postings = [
+                    posting for token, posting in self.postings.items()
+                    if (word in token if left and right else
+                        token.endswith(word) if left else token.startswith(word))]
+                lines = numpy.unique(numpy.concatenate(postings)) if postings else ()
+            if best is None or len(lines) < len(best):
+                best = lines
+        if best is None:
+            return None
+        best = numpy.asarray(best, dtype='i8')
+        best = best[numpy.searchsorted(best, start):]
+        return numpy.concatenate((best, numpy.arange(max(start, self.indexed), len(self))))
@@ -8,9 +8,12 @@ from .settings import Settings
 
 class ParametersFrame(QtWidgets.QFrame):
     parameter_changed = QtCore.pyqtSignal(str)
+    # template, command
+    parameter_value_changed = QtCore.pyqtSignal(str, str)
+    max_rate_changed = QtCore.pyqtSignal(int)
 
     class ParameterFrame(QtWidgets.QFrame):
-        value_changed = QtCore.pyqtSignal(str)
+        value_changed = QtCore.pyqtSignal(str, str)
         state_changed = QtCore.pyqtSignal()
 
         def __init__(self, *args, **kwargs):
@@ -100,7 +103,7 @@ class ParametersFrame(QtWidgets.QFrame):
             if self.check_box_enable.isChecked() and self.line_edit_template.text():
                 text = self.line_edit_template.text()
                 param = text.format(value)
-                self.value_changed.emit(param)
+                self.value_changed.emit(text, param)
 
         def on_value_changed(self, value):
             prev_block = self.slider.blockSignals(True)
@@ -194,9 +197,21 @@ class ParametersFrame(QtWidgets.QFrame):
             int(value) if value is not None else 0)
         self.on_check_box_key_map_changed(self.check_box_key_map.isChecked())
 
+        self.spin_box_max_rate = QtWidgets.QSpinBox()
+        self.spin_box_max_rate.setRange(1, 1000)
+        self.spin_box_max_rate.setSuffix(" cmd/s")
+        self.spin_box_max_rate.setToolTip(
+            "Maximum rate of parameter commands, while a slider is dragged\n"
+            "only the newest value of each parameter is sent.")
+        value = Settings.value('max_command_rate')
+        self.spin_box_max_rate.setValue(int(value) if value is not None else 20)
+        self.spin_box_max_rate.valueChanged.connect(self.on_max_rate_changed)
+
         self.h_box_layout.addWidget(self.button_add_parameter)
         self.h_box_layout.addWidget(self.button_remove_parameter)
         self.h_box_layout.addWidget(self.check_box_key_map)
+        self.h_box_layout.addWidget(QtWidgets.QLabel("Max rate:"))
+        self.h_box_layout.addWidget(self.spin_box_max_rate)
 
         self.h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
             0, 0, QtWidgets.QSizePolicy.Expanding))
@@ -259,20 +274,25 @@ class ParametersFrame(QtWidgets.QFrame):
         self.on_key_parameter_changed()
 
     def on_key_parameter_changed(self):
-        rows_desc = []
         self.key_row = {}
+        for row in range(self.table_widget.rowCount()):
+            key_item = self.table_widget.cellWidget(row, 1)
+            if self.table_widget.item(row, 0) and key_item and self.table_widget.item(row, 2):
+                self.key_row[key_item.currentData()] = row
+        Settings.setDeferredValue("key_parameters", self.get_key_parameters)
+
+    def get_key_parameters(self):
+        rows_desc = []
         for row in range(self.table_widget.rowCount()):
             cmd_item = self.table_widget.item(row, 0)
             key_item = self.table_widget.cellWidget(row, 1)
             enable_item = self.table_widget.item(row, 2)
             if cmd_item and key_item and enable_item:
-                desc = {
+                rows_desc.append({
                     'cmd': cmd_item.text(),
                     'key': key_item.currentData(),
-                    'enable': enable_item.checkState()}
-                self.key_row[key_item.currentData()] = row
-                rows_desc.append(desc)
-        Settings.setValue("key_parameters", rows_desc)
+                    'enable': enable_item.checkState()})
+        return rows_desc
 
     def on_check_box_key_map_changed(self, value):
         Settings.setValue("key_map_visible", int(value))
@@ -302,10 +322,17 @@ class ParametersFrame(QtWidgets.QFrame):
             del param_frame
         self.on_parameter_state_changed()
 
-    def on_parameter_value_changed(self, value):
-        self.parameter_changed.emit(value)
+    def on_parameter_value_changed(self, template, value):
+        self.parameter_value_changed.emit(template, value)
+
+    def on_max_rate_changed(self, value):
+        Settings.setValue('max_command_rate', value)
+        self.max_rate_changed.emit(value)
 
     def on_parameter_state_changed(self):
+        Settings.setDeferredValue("parameters", self.get_parameters_state)
+
+    def get_parameters_state(self):
         state = []
         for i in range(self.v_box_layout.count()):
             param = self.v_box_layout.itemAt(i)
@@ -313,4 +340,4 @@ class ParametersFrame(QtWidgets.QFrame):
                 param = param.widget()
                 if isinstance(param, self.ParameterFrame):
                     state.append(param.get_state())
-        Settings.setValue("parameters", state)
+        return state
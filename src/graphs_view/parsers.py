@@ -0,0 +1,327 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import importlib.metadata
+import io
+import json
+import re
+import time
+import warnings
+import numpy
+from .timestamps import DriftModel
+
+# third-party parsers register a Parser subclass under this entry point group
+ENTRY_POINT_GROUP = 'graphs_view.parsers'
+
+
+class Parser:
+    # parsers run in the reader process and get whole batches of full lines
+    # (or raw frames when binary is True), they return {channel: (times, values)}
+    binary = False
+
+    def __init__(self, options):
+        self.options = options
+        self.lines = 0
+        self.errors = 0
+        # seconds spent in parse()
+        self.cost = 0.0
+
+    def parse(self, times, lines):
+        raise NotImplementedError
+
+    def parse_batch(self, times, lines):
+        start = time.perf_counter()
+        try:
+            return self.parse(times, lines)
+        finally:
+            self.cost += time.perf_counter() - start
+            self.lines += len(lines)
+
+    @staticmethod
+    def add(results, channel, packet_time, value):
+        store = results.setdefault(channel, ([], []))
+        store[0].append(packet_time)
+        store[1].append(value)
+
+
+class WhitespaceParser(Parser):
+    # a batch is joined into one buffer and read as a 2D array by numpy,
+    # channels are its column slices; ragged batches are grouped by column count
+    # and a group with a bad field falls back to converting line by line.
+    # Small batches are cheaper to split and convert in python
+    SMALL_BATCH = 8
+
+    def parse(self, times, lines):
+        if len(lines) < self.SMALL_BATCH:
+            return self.parse_lines(times, lines)
+        times = numpy.asarray(times, dtype='f8')
+        table = self.load(lines)
+        # blank lines are skipped by numpy, so the rows would not match the times
+        if table is not None and len(table) == len(lines):
+            # all channels share the times, the values are column views of the table
+            return {index: (times, table[:, index]) for index in range(table.shape[1])}
+
+        counts = numpy.fromiter(
+            (len(line.split()) for line in lines), dtype=numpy.intp, count=len(lines))
+        parts = []
+        for count in numpy.unique(counts):
+            if not count:
+                continue
+            rows = numpy.flatnonzero(counts == count)
+            table = self.load([lines[row] for row in rows])
+            if table is None or table.shape != (len(rows), count):
+                rows, table = self.parse_rows(rows, lines, count)
+            parts.append((rows, table))
+        return self.columns(times, parts)
+
+    def parse_lines(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            try:
+                data = [float(d) for d in line.split()]
+            except ValueError:
+                self.errors += 1
+                continue
+            for index, value in enumerate(data):
+                self.add(results, index, packet_time, value)
+        return results
+
+    @staticmethod
+    def load(lines):
+        with warnings.catch_warnings():
+            # "input contained no data"
+            warnings.simplefilter('ignore')
+            try:
+                return numpy.loadtxt(
+                    io.BytesIO(b'\n'.join(lines)), dtype='f8', comments=None, ndmin=2)
+            except ValueError:
+                return None
+
+    def parse_rows(self, rows, lines, count):
+        good_rows = []
+        table = []
+        for row in rows:
+            try:
+                table.append([float(d) for d in lines[row].split()])
+            except ValueError:
+                self.errors += 1
+                continue
+            good_rows.append(row)
+        return (
+            numpy.array(good_rows, dtype=numpy.intp),
+            numpy.array(table, dtype='f8').reshape(len(good_rows), count))
+
+    @staticmethod
+    def columns(times, parts):
+        results = {}
+        for index in range(max(table.shape[1] for _, table in parts) if parts else 0):
+            chunks = [(rows, table[:, index]) for rows, table in parts if table.shape[1] > index]
+            rows = numpy.concatenate([rows for rows, _ in chunks])
+            values = numpy.concatenate([values for _, values in chunks])
+            if len(chunks) > 1:
+                # ragged batches keep the line order within a channel
+                order = numpy.argsort(rows, kind='stable')
+                rows, values = rows[order], values[order]
+            if len(rows):
+                results[index] = (times[rows], values)
+        return results
+
+
+class RegexParser(Parser):
+    # groups are channels by index, a "time" group also replaces the line time
+    def __init__(self, options):
+        super().__init__(options)
+        self.pattern = re.compile(options['pattern'].encode())
+        self.time_index = self.pattern.groupindex.get("time")
+        self.drift_model = DriftModel() if options.get('time_sync') else None
+
+    def parse(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            match = self.pattern.match(line)
+            if not match:
+                continue
+            try:
+                data = [float(d) for d in match.groups()]
+                if self.time_index is not None:
+                    device_time = float(match.group(self.time_index))
+                    packet_time = self.drift_model.map(
+                        device_time, packet_time) if self.drift_model else device_time
+            except (TypeError, ValueError):
+                self.errors += 1
+                continue
+            for index, value in enumerate(data):
+                self.add(results, index, packet_time, value)
+        return results
+
+
+class JsonParser(Parser):
+    # numeric fields of JSON objects, nested keys are joined with '.'
+    def parse(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                self.errors += 1
+                continue
+            if not isinstance(obj, dict):
+                self.errors += 1
+                continue
+            self.add_object(results, packet_time, obj, '')
+        return results
+
+    def add_object(self, results, packet_time, obj, prefix):
+        for key, value in obj.items():
+            if isinstance(value, dict):
+                self.add_object(results, packet_time, value, f'{prefix}{key}.')
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.add(results, f'{prefix}{key}', packet_time, float(value))
+
+
+class KeyValueParser(Parser):
+    # 'x=1 y=2.5' or 'x:1, y:2.5'
+    PAIR = re.compile(
+        rb'([A-Za-z_][\w./-]*)\s*[=:]\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+    def parse(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            pairs = self.PAIR.findall(line)
+            if not pairs:
+                self.errors += 1
+                continue
+            for key, value in pairs:
+                self.add(results, key.decode(), packet_time, float(value))
+        return results
+
+
+class CsvParser(Parser):
+    # the first line that is not numeric is the header; once data came, a line that is
+    # not numeric replaces it only with the same number of fields, other text
+    # (replies, log lines) is an error
+    SEPARATOR = re.compile(rb'\s*[,;\t]\s*')
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.header = None
+        self.data_seen = False
+
+    def parse(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            fields = self.SEPARATOR.split(line)
+            try:
+                values = [float(field) for field in fields]
+            except ValueError:
+                if self.data_seen and len(fields) != len(self.header):
+                    self.errors += 1
+                else:
+                    self.header = [field.decode(errors='replace') for field in fields]
+                continue
+            if self.header is None or len(values) != len(self.header):
+                self.errors += 1
+                continue
+            self.data_seen = True
+            for name, value in zip(self.header, values):
+                self.add(results, name, packet_time, value)
+        return results
+
+
+class NmeaParser(Parser):
+    # position, speed and quality fields of GGA/RMC/VTG, other sentences by field index
+    FIELDS = {
+        'GGA': {2: 'lat', 4: 'lon', 6: 'quality', 7: 'satellites', 8: 'hdop', 9: 'altitude'},
+        'RMC': {3: 'lat', 5: 'lon', 7: 'speed_knots', 8: 'course'},
+        'VTG': {1: 'course', 7: 'speed_kmh'}}
+
+    def parse(self, times, lines):
+        results = {}
+        for packet_time, line in zip(times, lines):
+            sentence = self.check(line)
+            if sentence is None:
+                self.errors += 1
+                continue
+            fields = sentence.split(',')
+            kind = fields[0][-3:]
+            names = self.FIELDS.get(kind)
+            for index, field in enumerate(fields[1:], 1):
+                if not field:
+                    continue
+                name = names.get(index) if names is not None else str(index)
+                if name is None:
+                    continue
+                try:
+                    if name in ('lat', 'lon'):
+                        value = self.degrees(field, fields[index + 1])
+                    else:
+                        value = float(field)
+                except (ValueError, IndexError):
+                    continue
+                self.add(results, f'{kind}.{name}', packet_time, value)
+        return results
+
+    @staticmethod
+    def check(line):
+        # '$GPGGA,...*47' -> 'GPGGA,...' if the checksum matches
+        try:
+            line = line.decode('ascii')
+        except UnicodeDecodeError:
+            return None
+        if not line.startswith(('$', '!')):
+            return None
+        body, _, checksum = line[1:].partition('*')
+        if checksum:
+            crc = 0
+            for char in body.encode():
+                crc ^= char
+            try:
+                if crc != int(checksum[:2], 16):
+                    return None
+            except ValueError:
+                return None
+        return body
+
+    @staticmethod
+    def degrees(value, hemisphere):
+        # ddmm.mmmm -> degrees, south and west are negative
+        point = value.index('.') if '.' in value else len(value)
+        degrees = float(value[:point - 2]) + float(value[point - 2:]) / 60
+        return -degrees if hemisphere in ('S', 'W') else degrees
+
+
+BUILTIN_PARSERS = {
+    'whitespace': WhitespaceParser,
+    'regex': RegexParser,
+    'json': JsonParser,
+    'key=value': KeyValueParser,
+    'csv': CsvParser,
+    'nmea': NmeaParser}
+
+
+def entry_points():
+    try:
+        return list(importlib.metadata.entry_points(group=ENTRY_POINT_GROUP))
+    # python < 3.10
+    except TypeError:
+        return list(importlib.metadata.entry_points().get(ENTRY_POINT_GROUP, []))
+
+
+def parser_names():
+    names = list(BUILTIN_PARSERS)
+    for entry_point in entry_points():
+        if entry_point.name not in names:
+            names.append(entry_point.name)
+    return names
+
+
+def create_parser(name, options):
+    parser_class = BUILTIN_PARSERS.get(name)
+    if parser_class is None:
+        for entry_point in entry_points():
+            if entry_point.name == name:
+                parser_class = entry_point.load()
+                break
+        else:
+            raise ValueError(f"unknown parser {name!r}")
+    return parser_class(options)
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+from .line_framer import LineFramer
+from .timestamps import LineClock
+from .profiler import tracer
+
+
+class ReaderPipeline:
+    # reader side of the transport: frames and timestamps reads, feeds the
+    # command tracker and the parser, and puts lines and batches to out_queue,
+    # one packet of each per read
+    STATS_INTERVAL = 1.0  # s
+
+    def __init__(self, out_queue, sender, parser):
+        self.out_queue = out_queue
+        self.sender = sender
+        self.parser = parser
+        self.clock = LineClock()
+        self.framer = LineFramer()
+        self.raw_state = 0
+        self.stats_time = time.monotonic()
+
+    def now(self):
+        return self.clock.now()
+
+    def feed_lines(self, chunk, read_time, byte_time):
+        with tracer.span('frame', 'reader'):
+            lines = self.framer.feed(chunk)
+            if not lines:
+                return
+            times = self.clock.spread(
+                read_time, len(chunk), [offset for _, offset, _ in lines], byte_time)
+        full_times = []
+        full_lines = []
+        for (r_state, _, line), packet_time in zip(lines, times):
+            self.sender.on_line(line)
+            # the first line may be cut, it is shown but not parsed
+            if r_state:
+                full_times.append(packet_time)
+                full_lines.append(line)
+        # the lines of a read go to the console in one packet
+        self.out_queue.put(('lines', times, [line for _, _, line in lines]), kind='line')
+        if full_lines:
+            with tracer.span('parse', 'reader', {'lines': len(full_lines)}):
+                batch = self.parser.parse_batch(full_times, full_lines)
+            self.publish(batch, read_time)
+
+    def feed_raw(self, chunk, read_time):
+        self.out_queue.put((self.raw_state, read_time, chunk), kind='line')
+        self.raw_state = 1
+        if self.parser.binary:
+            self.publish(self.parser.parse_batch([read_time], [chunk]), read_time)
+
+    def publish(self, batch, read_time):
+        # read_time is when the host got the read, line times may come from the device
+        if batch:
+            # rules react before the batch is queued for the display
+            with tracer.span('rules', 'reader'):
+                self.sender.rules.evaluate(batch, read_time, self.now)
+            self.out_queue.put(('batch', batch), kind='batch')
+        now = time.monotonic()
+        if now - self.stats_time >= self.STATS_INTERVAL:
+            self.stats_time = now
+            self.out_queue.put((
+                'parser_stats', self.parser.lines, self.parser.errors, self.parser.cost),
+                force=True)
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import pyqtgraph
+
+
+class PlotPanes(pyqtgraph.GraphicsLayoutWidget):
+    # vertically stacked plots sharing the X axis of the first one
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.plots = []
+        self.count = 1
+        self.xy_mode = False
+        self.relayout()
+
+    def create_plot(self):
+        plot = pyqtgraph.PlotItem()
+        plot.showGrid(x=True, y=True)
+        plot.setLabel("left", "value")
+        plot.addLegend()
+        if self.plots:
+            plot.setXLink(self.plots[0])
+        self.plots.append(plot)
+        return plot
+
+    def visible_count(self):
+        return 1 if self.xy_mode else self.count
+
+    def plot(self, pane):
+        return self.plots[min(pane, self.visible_count() - 1)]
+
+    def set_count(self, count):
+        self.count = max(1, count)
+        self.relayout()
+
+    def set_xy_mode(self, state):
+        self.xy_mode = state
+        plot = self.plots[0]
+        plot.setAspectLocked(lock=state)
+        plot.setLabel("left", "Y" if state else "value")
+        self.relayout()
+
+    def relayout(self):
+        while len(self.plots) < self.count:
+            self.create_plot()
+        self.clear()
+        count = self.visible_count()
+        for row, plot in enumerate(self.plots[:count]):
+            self.addItem(plot, row=row, col=0)
+            # only the bottom pane shows the shared X axis
+            if row == count - 1:
+                plot.showAxis("bottom")
+                plot.setLabel("bottom", "X" if self.xy_mode else "time")
+            else:
+                plot.hideAxis("bottom")
+        self.plots[0].setTitle("test curve")
+
+    def clear_items(self):
+        for plot in self.plots:
+            plot.clear()
@@ -0,0 +1,86 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+NULL_SPAN = contextlib.nullcontext()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer.events.append((
+            self.name, self.category, self.start // 1000, (end - self.start) // 1000,
+            self.tracer.pid, threading.get_native_id(), self.args))
+
+
+class Tracer:
+    # spans of one process in a bounded ring, dumped as Chrome trace events.
+    # perf_counter is the system monotonic clock, so processes share the time base
+    MAX_EVENTS = 1 << 20
+
+    def __init__(self):
+        self.enabled = False
+        self.pid = os.getpid()
+        self.events = collections.deque(maxlen=self.MAX_EVENTS)
+        # spans sent by the reader process
+        self.remote_events = []
+        self.remote_ready = threading.Event()
+
+    def enable(self, state):
+        # the pid changes in a forked reader
+        self.pid = os.getpid()
+        self.enabled = state
+
+    def span(self, name, category='', args=None):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def take(self):
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def add_remote(self, events):
+        self.remote_events.extend(events)
+        self.remote_ready.set()
+
+    def dump(self, path, process_names):
+        events = self.take() + self.remote_events
+        self.remote_events = []
+        self.remote_ready.clear()
+        trace = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}}
+            for pid, name in process_names.items()]
+        for name, category, start, duration, pid, tid, args in events:
+            event = {
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': start, 'dur': duration, 'pid': pid, 'tid': tid}
+            if args:
+                event['args'] = args
+            trace.append(event)
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, file)
+        return len(events)
+
+
+# one per process, enabled by --trace or Data/Record trace
+tracer = Tracer()
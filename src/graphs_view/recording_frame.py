@@ -0,0 +1,200 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import datetime
+import numpy
+from PyQt5 import QtWidgets, QtCore
+from .settings import Settings
+from .capture import CaptureSession
+
+
+class RecordingFrame(QtWidgets.QFrame):
+    # navigation over a saved capture: seek by time, search by threshold,
+    # only the blocks in view are read from the file
+    # above this many blocks in view the min/max envelope of the index is drawn
+    MAX_BLOCKS = 2000
+    RELOAD_DELAY = 100  # ms
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import pyqtgraph
+
+        self.session = None
+        self.curves = {}
+        # time the next threshold search starts after
+        self.cursor = None
+
+        self.push_button_open = QtWidgets.QPushButton("Open...")
+        self.push_button_open.setToolTip("Open a recording saved with Data/Save recording.")
+        self.push_button_open.clicked.connect(self.on_open)
+        self.label_file = QtWidgets.QLabel()
+
+        self.line_edit_seek = QtWidgets.QLineEdit()
+        self.line_edit_seek.setPlaceholderText("hh:mm:ss or seconds")
+        self.line_edit_seek.setToolTip(
+            "Time of day of the recording or seconds from its start.")
+        self.line_edit_seek.returnPressed.connect(self.on_seek)
+        self.push_button_seek = QtWidgets.QPushButton("Go")
+        self.push_button_seek.clicked.connect(self.on_seek)
+
+        self.spin_box_window = QtWidgets.QDoubleSpinBox()
+        self.spin_box_window.setRange(0.001, 1e6)
+        self.spin_box_window.setSuffix(" s")
+        value = Settings.value('recording_window')
+        self.spin_box_window.setValue(float(value) if value is not None else 10.0)
+        self.spin_box_window.setToolTip("Time span shown around the seek position.")
+        self.spin_box_window.valueChanged.connect(self.on_window_changed)
+
+        self.combo_box_channel = QtWidgets.QComboBox()
+        self.combo_box_condition = QtWidgets.QComboBox()
+        self.combo_box_condition.addItems([">", "<"])
+        self.line_edit_threshold = QtWidgets.QLineEdit("0")
+        self.push_button_next = QtWidgets.QPushButton("Next")
+        self.push_button_next.setToolTip(
+            "Jump to the next sample of the channel that crosses the threshold.")
+        self.push_button_next.clicked.connect(self.on_next)
+
+        self.plot_widget = pyqtgraph.PlotWidget(
+            self, axisItems={'bottom': pyqtgraph.DateAxisItem()})
+        self.plot_widget.showGrid(x=True, y=True)
+        self.plot_widget.addLegend()
+        self.marker = pyqtgraph.InfiniteLine(angle=90, pen='y')
+        self.marker.hide()
+        self.plot_widget.addItem(self.marker, ignoreBounds=True)
+        self.plot_widget.sigXRangeChanged.connect(self.on_range_changed)
+
+        self.reload_timer = QtCore.QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.timeout.connect(self.reload)
+
+        h_box_layout = QtWidgets.QHBoxLayout()
+        h_box_layout.addWidget(self.push_button_open)
+        h_box_layout.addWidget(self.label_file)
+        h_box_layout.addWidget(QtWidgets.QLabel("Seek:"))
+        h_box_layout.addWidget(self.line_edit_seek)
+        h_box_layout.addWidget(self.push_button_seek)
+        h_box_layout.addWidget(QtWidgets.QLabel("Window:"))
+        h_box_layout.addWidget(self.spin_box_window)
+        h_box_layout.addWidget(QtWidgets.QLabel("Find:"))
+        h_box_layout.addWidget(self.combo_box_channel)
+        h_box_layout.addWidget(self.combo_box_condition)
+        h_box_layout.addWidget(self.line_edit_threshold)
+        h_box_layout.addWidget(self.push_button_next)
+        h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+
+        v_box_layout = QtWidgets.QVBoxLayout(self)
+        v_box_layout.addLayout(h_box_layout)
+        v_box_layout.addWidget(self.plot_widget)
+
+    def on_window_changed(self, value):
+        Settings.setValue('recording_window', value)
+
+    def on_open(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Open recording", "", "Recording (*.gvcap)")
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        import pyqtgraph
+
+        try:
+            session = CaptureSession(path)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(self, "Warning: can't open recording", str(e))
+            return
+        time_range = session.index.time_range()
+        if time_range is None:
+            QtWidgets.QMessageBox.warning(self, "Warning", "The recording is empty.")
+            return
+        self.session = session
+        self.label_file.setText(path)
+        self.label_file.setToolTip(
+            f"{datetime.datetime.fromtimestamp(time_range[0])} - "
+            f"{datetime.datetime.fromtimestamp(time_range[1])}")
+        self.plot_widget.clear()
+        self.plot_widget.addItem(self.marker, ignoreBounds=True)
+        self.marker.hide()
+        self.curves = {}
+        self.combo_box_channel.clear()
+        for index, channel in enumerate(session.index.channels()):
+            curve = pyqtgraph.PlotCurveItem(pen=pyqtgraph.intColor(index))
+            self.plot_widget.addItem(curve)
+            self.plot_widget.getPlotItem().legend.addItem(curve, channel)
+            self.curves[channel] = curve
+            self.combo_box_channel.addItem(channel)
+        self.cursor = time_range[0]
+        self.show_at(time_range[0])
+
+    def show_at(self, start):
+        self.plot_widget.setXRange(start, start + self.spin_box_window.value(), padding=0)
+        self.reload()
+
+    def on_range_changed(self):
+        if self.session:
+            self.reload_timer.start(self.RELOAD_DELAY)
+
+    def reload(self):
+        if not self.session:
+            return
+        start, end = self.plot_widget.getViewBox().viewRange()[0]
+        index = self.session.index
+        for channel, curve in self.curves.items():
+            blocks = index.blocks(channel, start, end)
+            if len(blocks) > self.MAX_BLOCKS:
+                # zoomed out: first/last times with min/max of every block
+                curve.setData(
+                    numpy.column_stack((blocks['first'], blocks['last'])).ravel(),
+                    numpy.column_stack((blocks['min'], blocks['max'])).ravel())
+            else:
+                times, values = self.session.window(start, end, [channel]).get(
+                    channel, ((), ()))
+                curve.setData(numpy.asarray(times), numpy.asarray(values))
+
+    def parse_time(self, text):
+        # 'hh:mm:ss[.f]' of the day the recording started, or seconds from its start
+        start = self.session.index.time_range()[0]
+        if ':' not in text:
+            return start + float(text)
+        seconds = 0.0
+        for part in text.split(':'):
+            seconds = seconds * 60 + float(part)
+        day = datetime.datetime.fromtimestamp(start).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        time = day.timestamp() + seconds
+        # recordings that run past midnight
+        return time + 86400 if time < start else time
+
+    def on_seek(self):
+        if not self.session:
+            return
+        try:
+            time = self.parse_time(self.line_edit_seek.text().strip())
+        except ValueError:
+            QtWidgets.QMessageBox.warning(
+                self, "Warning", "Use hh:mm:ss or seconds from the start.")
+            return
+        self.cursor = time
+        self.marker.setValue(time)
+        self.marker.show()
+        self.show_at(time - self.spin_box_window.value() / 2)
+
+    def on_next(self):
+        if not self.session or not self.combo_box_channel.count():
+            return
+        try:
+            threshold = float(self.line_edit_threshold.text())
+        except ValueError:
+            QtWidgets.QMessageBox.warning(self, "Warning", "The threshold is not a number.")
+            return
+        time = self.session.find(
+            self.combo_box_channel.currentText(), threshold, self.cursor,
+            above=self.combo_box_condition.currentText() == ">")
+        if time is None:
+            QtWidgets.QMessageBox.information(self, "Find", "No more matches.")
+            return
+        self.cursor = time
+        self.marker.setValue(time)
+        self.marker.show()
+        self.show_at(time - self.spin_box_window.value() / 2)
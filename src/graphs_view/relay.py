@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import queue
+import socket
+import struct
+import threading
+from .capture import encode_blocks, decode_blocks
+
+# frame: payload length, payload is a sequence of capture blocks
+FRAME_HEADER = struct.Struct('<I')
+DEFAULT_ADDRESS = '127.0.0.1:5200'
+
+
+def parse_address(address):
+    # 'host:port' is TCP, 'unix:/path' is a unix socket
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+class Subscriber(threading.Thread):
+    # every subscriber has its own backlog, a slow one loses its oldest frames
+    BACKLOG = 256
+
+    def __init__(self, connection):
+        super().__init__(daemon=True)
+        self.connection = connection
+        self.frames = queue.Queue(self.BACKLOG)
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, frame):
+        while 1:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def run(self):
+        try:
+            while 1:
+                frame = self.frames.get()
+                if frame is None:
+                    break
+                self.connection.sendall(frame)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            self.connection.close()
+
+
+class Relay(threading.Thread):
+    # republishes parsed batches to local subscribers
+    def __init__(self, address):
+        super().__init__(daemon=True)
+        self.family, self.address = parse_address(address)
+        self.server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_UNIX:
+            # left by a relay that was not closed
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        else:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.address)
+        self.server.listen()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.start()
+
+    def run(self):
+        try:
+            while 1:
+                connection, _ = self.server.accept()
+                subscriber = Subscriber(connection)
+                subscriber.start()
+                with self.lock:
+                    self.subscribers.append(subscriber)
+        # server socket closed
+        except OSError:
+            pass
+
+    def publish(self, results):
+        with self.lock:
+            self.subscribers = [s for s in self.subscribers if not s.closed]
+            subscribers = list(self.subscribers)
+        if not subscribers:
+            return
+        payload = encode_blocks(results)
+        frame = FRAME_HEADER.pack(len(payload)) + payload
+        for subscriber in subscribers:
+            subscriber.push(frame)
+
+    def clients(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def close(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.remove(self.address)
+            except OSError:
+                pass
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.push(None)
+            self.subscribers = []
+
+
+def subscribe(address=DEFAULT_ADDRESS):
+    # for scripts: yields {channel: (times, values)} per published batch
+    family, address = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as connection:
+        connection.connect(address)
+        stream = connection.makefile('rb')
+        while 1:
+            header = stream.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            payload = stream.read(FRAME_HEADER.unpack(header)[0])
+            yield {channel: (times, values) for channel, times, values in decode_blocks(payload)}
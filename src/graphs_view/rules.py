@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import operator
+import re
+import numpy
+
+
+# rules file:
+#   # comment
+#   @holdoff 0.5   - minimal seconds between two firings of each following rule (default 0)
+#   <expression> <op> <threshold> -> <command template>
+# expression: channel | mean(channel, seconds) | rate(channel) | rate(channel, seconds)
+# op: > < >= <=, a rule fires when its condition becomes true,
+# template fields: {value} - the expression, {channel}, {time}
+RULE = re.compile(
+    r'^(?:(?P<kind>mean|rate)\(\s*(?P<fn_channel>[^\s,()]+)\s*(?:,\s*(?P<window>[^\s)]+)\s*)?\)'
+    r'|(?P<channel>[^\s<>=()]+))'
+    r'\s*(?P<op>>=|<=|>|<)\s*(?P<threshold>\S+)\s*->\s*(?P<template>.+)$')
+OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le}
+
+
+def parse_rules(text, line_ending=b'\n'):
+    rules = []
+    holdoff = 0.0
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            if line.startswith('@'):
+                name, _, arg = line[1:].partition(' ')
+                if name != 'holdoff':
+                    raise ValueError(f"unknown directive @{name}")
+                holdoff = float(arg)
+                continue
+            match = RULE.match(line)
+            if not match:
+                raise ValueError("expected '<expression> <op> <threshold> -> <command>'")
+            kind = match.group('kind') or 'value'
+            channel = match.group('fn_channel') or match.group('channel')
+            window = match.group('window')
+            if kind == 'mean' and window is None:
+                raise ValueError("mean needs a window: mean(channel, seconds)")
+            window = float(window) if window is not None else None
+            if window is not None and window <= 0:
+                raise ValueError("the window must be positive")
+            template = match.group('template').strip()
+            try:
+                template.format(value=0.0, channel=channel, time=0.0)
+            except KeyError as e:
+                raise ValueError(f"unknown field {e} in the command") from None
+            rules.append({
+                'source': line,
+                'kind': kind,
+                # parsers name columns by index
+                'channel': int(channel) if channel.isdigit() else channel,
+                'window': window,
+                'op': match.group('op'),
+                'threshold': float(match.group('threshold')),
+                'holdoff': holdoff,
+                'template': template,
+                'line_ending': line_ending})
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"line {number}: {e}") from None
+    return rules
+
+
+class Rule:
+    # a condition over one channel, evaluated for a whole batch at once; windows
+    # keep the tail of the previous batches that is still inside them
+    def __init__(self, index, spec):
+        self.index = index
+        self.spec = spec
+        self.kind = spec['kind']
+        self.channel = spec['channel']
+        self.window = spec['window']
+        self.compare = OPERATORS[spec['op']]
+        self.threshold = spec['threshold']
+        self.holdoff = spec['holdoff']
+        self.times = numpy.empty(0)
+        self.values = numpy.empty(0)
+        self.active = False
+        self.last_fire = -numpy.inf
+
+    def series(self, times, values):
+        # the expression at every sample of the batch
+        if self.kind == 'value':
+            return values
+        history = len(self.times)
+        times = numpy.concatenate((self.times, times))
+        values = numpy.concatenate((self.values, values))
+        ends = numpy.arange(history, len(times))
+        if self.window is not None:
+            starts = numpy.searchsorted(times, times[history:] - self.window, 'left')
+            keep = numpy.searchsorted(times, times[-1] - self.window, 'left')
+        else:
+            starts = numpy.maximum(ends - 1, 0)
+            keep = len(times) - 1
+        if self.kind == 'mean':
+            sums = numpy.concatenate(((0.0,), numpy.cumsum(values)))
+            result = (sums[ends + 1] - sums[starts]) / (ends + 1 - starts)
+        else:
+            elapsed = times[ends] - times[starts]
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                result = numpy.where(
+                    elapsed > 0, (values[ends] - values[starts]) / elapsed, numpy.nan)
+        self.times = times[keep:]
+        self.values = values[keep:]
+        return result
+
+    def update(self, times, values):
+        # [(time, value)] of the firings in this batch
+        times = numpy.asarray(times, dtype='f8')
+        values = numpy.asarray(values, dtype='f8')
+        if not len(times):
+            return []
+        result = self.series(times, values)
+        condition = self.compare(result, self.threshold)
+        # rising edges, the state carries over from the previous batch
+        edges = condition.copy()
+        edges[1:] &= ~condition[:-1]
+        edges[0] &= not self.active
+        self.active = bool(condition[-1])
+        firings = []
+        for index in numpy.flatnonzero(edges):
+            if times[index] - self.last_fire < self.holdoff:
+                continue
+            self.last_fire = times[index]
+            firings.append((float(times[index]), float(result[index])))
+        return firings
+
+    def command(self, time, value):
+        return self.spec['template'].format(
+            value=value, channel=self.channel, time=time).encode() + self.spec['line_ending']
+
+
+class RuleEngine:
+    # runs in the reader thread right after parsing, commands go straight to the
+    # port; events: ('rule', index, source, time, value, command, reaction), the
+    # reaction is host time from the read to the command, time may be device time
+    def __init__(self, sender):
+        self.sender = sender
+        self.rules = []
+
+    def configure(self, specs):
+        # replaced as a whole, the reader thread sees the old or the new list
+        self.rules = [Rule(index, spec) for index, spec in enumerate(specs)]
+
+    def evaluate(self, batch, received, now):
+        rules = self.rules
+        if not rules:
+            return
+        events = []
+        for rule in rules:
+            data = batch.get(rule.channel)
+            if data is None:
+                continue
+            for time, value in rule.update(*data):
+                command = rule.command(time, value)
+                self.sender.send(command)
+                events.append((
+                    'rule', rule.index, rule.spec['source'], time, value, command, now() - received))
+        # logged after every command is out
+        for event in events:
+            self.sender.out_queue.put(event, force=True)
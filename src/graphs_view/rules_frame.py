@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from PyQt5 import QtWidgets, QtCore
+from .settings import Settings
+from .rules import parse_rules
+
+
+class RulesFrame(QtWidgets.QFrame):
+    # rules are edited here and evaluated by the reader, see rules.py
+    EXAMPLE = (
+        "# <expression> <op> <threshold> -> <command>\n"
+        "# expression: channel, mean(channel, seconds), rate(channel[, seconds])\n"
+        "@holdoff 0.5\n"
+        "0 > 100 -> set,/motor/enable,0\n"
+        "mean(1, 2.0) < 10 -> set,/heater/power,{value:.2f}\n")
+
+    rules_changed = QtCore.pyqtSignal()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fired = 0
+
+        self.check_box_enable = QtWidgets.QCheckBox("Enable")
+        self.check_box_enable.setToolTip(
+            "Evaluate the rules in the reader process on every parsed batch.")
+        value = Settings.value('rules_enabled')
+        self.check_box_enable.setChecked(int(value) if value is not None else 0)
+        self.check_box_enable.toggled.connect(self.on_enable_changed)
+
+        self.push_button_apply = QtWidgets.QPushButton("Apply")
+        self.push_button_apply.setToolTip("Send the edited rules to the reader.")
+        self.push_button_apply.clicked.connect(self.on_apply)
+        self.label_status = QtWidgets.QLabel()
+
+        self.plain_text_editor = QtWidgets.QPlainTextEdit()
+        self.plain_text_editor.setToolTip(
+            "One rule per line, a rule sends its command when the condition becomes true.\n"
+            "'@holdoff <s>' - minimal time between firings of the following rules.\n"
+            "Command fields: {value} - the expression, {channel}, {time}.")
+        rules = Settings.value('rules')
+        self.plain_text_editor.setPlainText(rules if rules is not None else self.EXAMPLE)
+
+        h_box_layout = QtWidgets.QHBoxLayout()
+        h_box_layout.addWidget(self.check_box_enable)
+        h_box_layout.addWidget(self.push_button_apply)
+        h_box_layout.addWidget(self.label_status)
+        h_box_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+
+        v_box_layout = QtWidgets.QVBoxLayout(self)
+        v_box_layout.addLayout(h_box_layout)
+        v_box_layout.addWidget(self.plain_text_editor)
+
+    def rules(self, line_ending):
+        # raises ValueError for a broken rule
+        if not self.check_box_enable.isChecked():
+            return []
+        rules = parse_rules(self.plain_text_editor.toPlainText(), line_ending)
+        self.label_status.setText(f"{len(rules)} rules")
+        return rules
+
+    def show_error(self, text):
+        self.label_status.setText(f"<font color='red'>{text}</font>")
+
+    def on_enable_changed(self, value):
+        Settings.setValue('rules_enabled', int(value))
+        self.rules_changed.emit()
+
+    def on_apply(self):
+        Settings.setValue('rules', self.plain_text_editor.toPlainText())
+        self.fired = 0
+        self.rules_changed.emit()
+
+    def on_reader_event(self, event):
+        if event[0] == 'rule':
+            _, index, source, _, _, _, reaction = event
+            self.fired += 1
+            self.label_status.setText(
+                f"fired: {self.fired}, last: {source} ({reaction * 1000:.2f} ms)")
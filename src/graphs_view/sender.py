@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+import time
+from .sequence import SequenceRunner
+from .rules import RuleEngine
+
+
+class PendingCommand:
+    __slots__ = ('data', 'sent_time', 'reply', 'reply_time')
+
+    def __init__(self, data, sent_time):
+        self.data = data
+        self.sent_time = sent_time
+        self.reply = None
+        self.reply_time = None
+
+
+class CommandTracker:
+    # replies are matched to commands in order, commands without a reply expire
+    RESPONSE_PREFIXES = (b'RE', b'ER')
+    EXPIRE = 5.0  # s
+    # a device that never replies does not grow the queue past this
+    MAX_PENDING = 1024
+
+    def __init__(self):
+        self.pending = collections.deque(maxlen=self.MAX_PENDING)
+        self.condition = threading.Condition()
+
+    def expire(self, now):
+        while self.pending and now - self.pending[0].sent_time > self.EXPIRE:
+            self.pending.popleft()
+
+    def sent(self, data):
+        command = PendingCommand(data, time.monotonic())
+        with self.condition:
+            self.expire(command.sent_time)
+            self.pending.append(command)
+        return command
+
+    def reply(self, line):
+        if line[:2] not in self.RESPONSE_PREFIXES:
+            return None
+        now = time.monotonic()
+        with self.condition:
+            self.expire(now)
+            if not self.pending:
+                return None
+            command = self.pending.popleft()
+            command.reply = line
+            command.reply_time = now
+            self.condition.notify_all()
+        return command
+
+    def wait_reply(self, command, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: command.reply is not None, timeout)
+            if command.reply is None:
+                try:
+                    self.pending.remove(command)
+                except ValueError:
+                    pass
+            return command.reply
+
+
+class Sender:
+    # executes messages from in_queue in the reader process:
+    # bytes - write to port, ('sequence', steps), ('sequence_stop',),
+    # ('rules', specs), None - exit
+    def __init__(self, write, in_queue, out_queue):
+        self.write = write
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.write_lock = threading.Lock()
+        self.tracker = CommandTracker()
+        self.runner = None
+        self.rules = RuleEngine(self)
+        self.stopped = False
+
+    def send(self, data):
+        with self.write_lock:
+            command = self.tracker.sent(data)
+            self.write(data)
+        return command
+
+    def on_line(self, line):
+        command = self.tracker.reply(line)
+        if command:
+            self.out_queue.put((
+                'latency', command.data, command.reply_time - command.sent_time), force=True)
+        return command
+
+    def stop_sequence(self):
+        if self.runner:
+            self.runner.stop()
+            self.runner.join()
+            self.runner = None
+
+    def run(self):
+        try:
+            while 1:
+                data = self.in_queue.get()
+                # exit
+                if not data:
+                    break
+                if isinstance(data, tuple):
+                    if data[0] == 'sequence':
+                        self.stop_sequence()
+                        self.runner = SequenceRunner(self, data[1])
+                        self.runner.start()
+                    elif data[0] == 'sequence_stop':
+                        self.stop_sequence()
+                    elif data[0] == 'rules':
+                        self.rules.configure(data[1])
+                else:
+                    self.send(data)
+        finally:
+            self.stop_sequence()
+            self.stopped = True
@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+# sequence file:
+#   # comment
+#   @wait on|off   - wait for the RE/ER reply of each following command (default on)
+#   @timeout 1.0   - reply timeout in seconds for following commands
+#   @delay 0.5     - pause in seconds
+#   any other line is a command
+def parse_sequence(text, line_ending=b'\n'):
+    steps = []
+    wait = True
+    timeout = 1.0
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('@'):
+            name, _, arg = line[1:].partition(' ')
+            arg = arg.strip()
+            try:
+                if name == 'wait':
+                    if arg not in ('on', 'off'):
+                        raise ValueError(f"expected on/off, got {arg!r}")
+                    wait = arg == 'on'
+                elif name == 'timeout':
+                    timeout = float(arg)
+                elif name == 'delay':
+                    steps.append(('delay', float(arg)))
+                else:
+                    raise ValueError(f"unknown directive @{name}")
+            except ValueError as e:
+                raise ValueError(f"line {number}: {e}") from None
+        else:
+            steps.append(('send', line.encode() + line_ending, wait, timeout))
+    return steps
+
+
+class SequenceRunner(threading.Thread):
+    # events: ('sequence', index, total, command, reply, status),
+    #         ('sequence_done', executed, total, stopped)
+    def __init__(self, sender, steps):
+        super().__init__(daemon=True)
+        self.sender = sender
+        self.steps = steps
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        total = len(self.steps)
+        executed = 0
+        for index, step in enumerate(self.steps):
+            if self.stop_event.is_set():
+                break
+            if step[0] == 'delay':
+                self.stop_event.wait(step[1])
+            else:
+                _, data, wait, timeout = step
+                command = self.sender.send(data)
+                reply = None
+                status = 'sent'
+                if wait:
+                    reply = self.sender.tracker.wait_reply(command, timeout)
+                    if reply is None:
+                        status = 'timeout'
+                    else:
+                        status = 'ok' if reply[:2] == b'RE' else 'error'
+                self.sender.out_queue.put(
+                    ('sequence', index, total, data, reply, status), force=True)
+            executed += 1
+        self.sender.out_queue.put(
+            ('sequence_done', executed, total, self.stop_event.is_set()), force=True)
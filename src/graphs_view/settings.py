@@ -3,4 +3,65 @@
 
 from PyQt5 import QtCore
 
-Settings = QtCore.QSettings('alexlexx', 'graph_view')
+
+class WriteBehindSettings:
+    # QSettings compatible store: values are cached in memory and
+    # written to disk at most once per FLUSH_DELAY and on sync()
+    FLUSH_DELAY = 1000  # ms
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.cache = {}
+        self.pending = set()
+        # key -> getter, evaluated only when the value is written or read back
+        self.deferred = {}
+        self.timer = None
+
+    def value(self, key, default=None):
+        if key in self.deferred:
+            return self.deferred[key]()
+        if key not in self.cache:
+            self.cache[key] = self.settings.value(key)
+        value = self.cache[key]
+        return default if value is None else value
+
+    def setValue(self, key, value):
+        self.deferred.pop(key, None)
+        self.cache[key] = value
+        self.pending.add(key)
+        self.schedule_flush()
+
+    def setDeferredValue(self, key, getter):
+        self.deferred[key] = getter
+        self.pending.add(key)
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        # the timer needs a running application, so it is created on first write
+        if self.timer is None:
+            self.timer = QtCore.QTimer()
+            self.timer.setSingleShot(True)
+            self.timer.timeout.connect(self.flush)
+        if not self.timer.isActive():
+            self.timer.start(self.FLUSH_DELAY)
+
+    def flush(self):
+        pending, self.pending = self.pending, set()
+        for key in pending:
+            getter = self.deferred.pop(key, None)
+            if getter is not None:
+                try:
+                    self.cache[key] = getter()
+                # widget that provided the value is already destroyed
+                except RuntimeError:
+                    continue
+            self.settings.setValue(key, self.cache[key])
+
+    def sync(self):
+        if self.timer is not None:
+            self.timer.stop()
+        self.flush()
+        self.settings.sync()
+
+
+Settings = WriteBehindSettings(QtCore.QSettings('alexlexx', 'graph_view'))
@@ -1,36 +1,63 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
-from PyQt5 import QtWidgets
-import serial
-from serial.tools import list_ports
+import threading
+from PyQt5 import QtWidgets, QtCore
 from .settings import Settings
+from .bounded_queue import BoundedQueue
+from .relay import DEFAULT_ADDRESS
+from .parsers import parser_names
+
+
+class PortComboBox(QtWidgets.QComboBox):
+    # ports are scanned again when the list is opened
+    popup_requested = QtCore.pyqtSignal()
+
+    def showPopup(self):
+        self.popup_requested.emit()
+        super().showPopup()
 
 
 class SettingFrame(QtWidgets.QFrame):
+    # serial.Serial.BAUDRATES, kept here so pyserial is not imported at startup
+    BAUDRATES = (
+        50, 75, 110, 134, 150, 200, 300, 600, 1200, 1800, 2400, 4800,
+        9600, 19200, 38400, 57600, 115200, 230400, 460800, 500000,
+        576000, 921600, 1000000, 1152000, 1500000, 2000000, 2500000,
+        3000000, 3500000, 4000000)
+    PORT_SCAN_INTERVAL = 2000  # ms
+
+    ports_scanned = QtCore.pyqtSignal(list)
+
     def __init__(self):
         super().__init__()
 
         # SERIAL PORT UI ELEMENTS -------------------------------------------------------------------
-        self.combo_box_port_path = QtWidgets.QComboBox()
+        self.combo_box_port_path = PortComboBox()
         self.combo_box_port_path.setToolTip("Path to the COM port file")
-        for desc in list_ports.comports():
-            self.combo_box_port_path.addItem(desc.device)
+        self.combo_box_port_path.setEditable(True)
+        # ports are enumerated in background, show the last used one until then
+        self.ports = None
+        self.port_scan_thread = None
         port_path = Settings.value("port_path")
-        dev_id = self.combo_box_port_path.findText(
+        self.combo_box_port_path.setEditText(
             port_path if port_path is not None else "/dev/ttyACM0")
-
-        self.combo_box_port_path.setCurrentIndex(0 if dev_id == -1 else dev_id)
-        self.combo_box_port_path.setEditable(True)
         self.combo_box_port_path.currentTextChanged.connect(
             self.on_port_changed)
+        self.ports_scanned.connect(self.on_ports_scanned)
+        self.combo_box_port_path.popup_requested.connect(self.start_port_scan)
+        # rescans run only while the frame is shown, see showEvent
+        self.port_scan_timer = QtCore.QTimer(self)
+        self.port_scan_timer.setInterval(self.PORT_SCAN_INTERVAL)
+        self.port_scan_timer.timeout.connect(self.start_port_scan)
+        QtCore.QTimer.singleShot(0, self.start_port_scan)
 
         self.push_button_open = QtWidgets.QPushButton("Open")
         self.push_button_open.setToolTip(
             "Open/Close the COM port for reading/writing.")
         self.combo_box_speed = QtWidgets.QComboBox()
         self.combo_box_speed.setToolTip("List of standard COM port speeds")
-        for speed in serial.Serial.BAUDRATES:
+        for speed in self.BAUDRATES:
             self.combo_box_speed.addItem(str(speed), speed)
 
         speed = Settings.value("port_speed")
@@ -50,6 +77,50 @@ class SettingFrame(QtWidgets.QFrame):
         self.line_edit_udp_dest_port.setToolTip("UDP Destination Port")
         self.push_button_open_udp = QtWidgets.QPushButton("Open")
         self.push_button_open_udp.setToolTip("Open/Close the UDP connection.")
+        self.spin_box_udp_rcvbuf = QtWidgets.QSpinBox()
+        self.spin_box_udp_rcvbuf.setRange(1, 1 << 12)
+        self.spin_box_udp_rcvbuf.setSuffix(" MB")
+        value = Settings.value('udp_rcvbuf')
+        self.spin_box_udp_rcvbuf.setValue(int(value) if value is not None else 8)
+        self.spin_box_udp_rcvbuf.setToolTip(
+            "Socket receive buffer (SO_RCVBUF), holds datagram bursts while the reader is busy.\n"
+            "On Linux it is limited by net.core.rmem_max unless the app may use SO_RCVBUFFORCE.")
+        self.spin_box_udp_rcvbuf.valueChanged.connect(self.on_udp_rcvbuf_changed)
+
+        # READER QUEUE UI ELEMENTS --------------------------------------------------------------------
+        self.spin_box_queue_size = QtWidgets.QSpinBox()
+        self.spin_box_queue_size.setRange(1, 10000000)
+        queue_size = Settings.value('queue_size')
+        self.spin_box_queue_size.setValue(
+            int(queue_size) if queue_size is not None else 10000)
+        self.spin_box_queue_size.setToolTip(
+            "Maximum number of packets waiting between the reader and the display.")
+        self.spin_box_queue_size.valueChanged.connect(
+            self.on_queue_size_changed)
+
+        self.combo_box_queue_policy = QtWidgets.QComboBox()
+        self.combo_box_queue_policy.setToolTip(
+            "What the reader does with new packets when the queue is full.")
+        for text, policy in BoundedQueue.POLICIES.items():
+            self.combo_box_queue_policy.addItem(text, policy)
+        policy = Settings.value('queue_policy')
+        index = self.combo_box_queue_policy.findData(policy)
+        self.combo_box_queue_policy.setCurrentIndex(index if index != -1 else 0)
+        self.combo_box_queue_policy.currentIndexChanged.connect(
+            self.on_queue_policy_changed)
+
+        # RELAY UI ELEMENTS ---------------------------------------------------------------------------
+        self.check_box_relay = QtWidgets.QCheckBox("Relay")
+        self.check_box_relay.setToolTip(
+            "Republish parsed samples to local subscribers, see graphs_view.relay.subscribe.")
+        value = Settings.value('relay')
+        self.check_box_relay.setChecked(int(value) if value is not None else 0)
+        self.check_box_relay.toggled.connect(self.on_relay_changed)
+        address = Settings.value('relay_address')
+        self.line_edit_relay = QtWidgets.QLineEdit(
+            address if address is not None else DEFAULT_ADDRESS)
+        self.line_edit_relay.setToolTip("host:port for TCP or unix:/path for a unix socket.")
+        self.line_edit_relay.textChanged.connect(self.on_relay_address_changed)
 
         # LINE PARSING UI ELEMMENTS -------------------------------------------------------------------
         self.group_box_line_parsing = QtWidgets.QGroupBox(self)
@@ -91,10 +162,24 @@ class SettingFrame(QtWidgets.QFrame):
         udp_layout.addWidget(self.line_edit_udp_dest_ip)
         udp_layout.addWidget(QtWidgets.QLabel("Dest Port:"))
         udp_layout.addWidget(self.line_edit_udp_dest_port)
+        udp_layout.addWidget(QtWidgets.QLabel("Buffer:"))
+        udp_layout.addWidget(self.spin_box_udp_rcvbuf)
         udp_layout.addWidget(self.push_button_open_udp)
 
         v_box_layout.addLayout(udp_layout)
 
+        # LAYOUT FOR READER QUEUE ---------------------------------------------------------------------
+        queue_layout = QtWidgets.QHBoxLayout()
+        queue_layout.addWidget(QtWidgets.QLabel("Queue size:"))
+        queue_layout.addWidget(self.spin_box_queue_size)
+        queue_layout.addWidget(QtWidgets.QLabel("On overload:"))
+        queue_layout.addWidget(self.combo_box_queue_policy)
+        queue_layout.addWidget(self.check_box_relay)
+        queue_layout.addWidget(self.line_edit_relay)
+        queue_layout.addSpacerItem(QtWidgets.QSpacerItem(
+            0, 0, QtWidgets.QSizePolicy.Expanding))
+        v_box_layout.addLayout(queue_layout)
+
         self.push_button_clear = QtWidgets.QPushButton("Clear")
         self.push_button_clear.setToolTip(
             "Delete all data displayed on the graphs.")
@@ -104,12 +189,42 @@ class SettingFrame(QtWidgets.QFrame):
             "Suspend updating data on the graphs "
             "(data is not lost, it accumulates in the background).")
 
+        self.spin_box_memory_budget = QtWidgets.QSpinBox()
+        self.spin_box_memory_budget.setRange(1, 1 << 20)
+        self.spin_box_memory_budget.setSuffix(" MB")
+        value = Settings.value('memory_budget')
+        self.spin_box_memory_budget.setValue(
+            int(value) if value is not None else 512)
+        self.spin_box_memory_budget.setToolTip(
+            "Memory for the samples of all channels, \"Max points\" is "
+            "lowered when the channels do not fit.")
+        self.spin_box_memory_budget.valueChanged.connect(
+            self.on_memory_budget_changed)
+
+        self.check_box_compact = QtWidgets.QCheckBox("Compact")
+        self.check_box_compact.setToolTip(
+            "Keep values as float32 and times as microseconds from the first sample, "
+            "half the memory per point.")
+        value = Settings.value('compact_samples')
+        self.check_box_compact.setChecked(
+            int(value) if value is not None else 0)
+        self.check_box_compact.toggled.connect(self.on_compact_changed)
+
         self.check_box_xy_mode = QtWidgets.QCheckBox("XY plot")
         self.check_box_xy_mode.setToolTip(
             "XY mode replaces the time-based display with a "
             "dot display (data for the dots: "
             "x - the first element of the row, y - the second element).")
 
+        self.check_box_history = QtWidgets.QCheckBox("History")
+        self.check_box_history.setToolTip(
+            "Record the full capture history to a temporary file, "
+            "so it can be exported beyond \"Max points\".")
+        value = Settings.value('record_history')
+        self.check_box_history.setChecked(
+            int(value) if value is not None else 0)
+        self.check_box_history.toggled.connect(self.on_history_changed)
+
         self.check_box_show_only_cmd_response = QtWidgets.QCheckBox(
             "Only response")
         self.check_box_show_only_cmd_response.setToolTip(
@@ -132,17 +247,32 @@ class SettingFrame(QtWidgets.QFrame):
 
         h_box_layout_graphs.addWidget(QtWidgets.QLabel("Max points:"))
         h_box_layout_graphs.addWidget(self.spin_box_max_points)
+        h_box_layout_graphs.addWidget(QtWidgets.QLabel("Memory:"))
+        h_box_layout_graphs.addWidget(self.spin_box_memory_budget)
+        h_box_layout_graphs.addWidget(self.check_box_compact)
         h_box_layout_graphs.addWidget(self.push_button_clear)
         h_box_layout_graphs.addWidget(self.push_button_pause)
         h_box_layout_graphs.addWidget(self.check_box_xy_mode)
+        h_box_layout_graphs.addWidget(self.check_box_history)
         h_box_layout_graphs.addWidget(self.check_box_show_only_cmd_response)
         h_box_layout_graphs.addSpacerItem(QtWidgets.QSpacerItem(
             0, 0, QtWidgets.QSizePolicy.Expanding))
 
         h_box_layout_graphs_2 = QtWidgets.QHBoxLayout()
         group_box_v_box_layout.addLayout(h_box_layout_graphs_2)
-        self.check_box_re = QtWidgets.QCheckBox("RE")
-        self.check_box_re.setToolTip(
+        self.combo_box_parser = QtWidgets.QComboBox()
+        self.combo_box_parser.setToolTip(
+            "How lines are turned into graphs:\n"
+            "whitespace - floats separated by spaces/tabs,\n"
+            "regex - groups of the regular expression,\n"
+            "json - numeric fields of JSON objects,\n"
+            "key=value - 'x=1 y=2' or 'x:1 y:2' pairs,\n"
+            "csv - comma separated values with a header line,\n"
+            "nmea - GPS sentences.\n"
+            "Other parsers can be installed as 'graphs_view.parsers' entry points.")
+        self.combo_box_parser.addItems(parser_names())
+        self.line_edit_re = QtWidgets.QLineEdit(self)
+        self.line_edit_re.setToolTip(
             "Allows the use of regular expressions (Python's re.match) "
             "for extracting graph data from a line.\n"
             "For example, to extract data from the line 'x:232 q:123.3',\n"
@@ -150,15 +280,31 @@ class SettingFrame(QtWidgets.QFrame):
             "Also allows specifying a \"time\" parameter for displaying data on the horizontal axis:\n"
             "For example, to extract the time parameter and data from the given line: 'x:456 y:789 z:234 time:123',\n"
             "you need to use this expression: 'x:(\d+)\s+y:(\d+)\s+z:(\d+)\s+time:(?P<time>\d+)'.")
-        self.line_edit_re = QtWidgets.QLineEdit(self)
         self.line_edit_re.setEnabled(False)
-        h_box_layout_graphs_2.addWidget(self.check_box_re)
+        self.check_box_time_sync = QtWidgets.QCheckBox("Host clock")
+        self.check_box_time_sync.setToolTip(
+            "Map the \"time\" group onto the host clock with a fitted drift model,\n"
+            "so device time keeps its regularity but is shown in host seconds.")
+        self.check_box_time_sync.setEnabled(False)
+        time_sync = Settings.value('time_sync')
+        self.check_box_time_sync.setChecked(
+            int(time_sync) if time_sync is not None else 0)
+        self.check_box_time_sync.toggled.connect(self.on_time_sync_changed)
+        h_box_layout_graphs_2.addWidget(QtWidgets.QLabel("Parser:"))
+        h_box_layout_graphs_2.addWidget(self.combo_box_parser)
         h_box_layout_graphs_2.addWidget(self.line_edit_re)
-        self.check_box_re.toggled.connect(self.on_check_box_re_changed)
+        h_box_layout_graphs_2.addWidget(self.check_box_time_sync)
+        self.combo_box_parser.currentTextChanged.connect(self.on_parser_changed)
         self.line_edit_re.textChanged.connect(self.on_line_edit_re_changed)
 
-        use_re = Settings.value('use_re')
-        self.check_box_re.setChecked(int(use_re) if use_re is not None else 0)
+        parser = Settings.value('parser')
+        # older settings only had the RE check box
+        if parser is None:
+            use_re = Settings.value('use_re')
+            parser = 'regex' if use_re is not None and int(use_re) else 'whitespace'
+        index = self.combo_box_parser.findText(parser)
+        self.combo_box_parser.setCurrentIndex(index if index != -1 else 0)
+        self.on_parser_changed(self.combo_box_parser.currentText())
 
         _re = Settings.value('re')
         self.line_edit_re.setText(
@@ -177,16 +323,63 @@ class SettingFrame(QtWidgets.QFrame):
         h_box_layout.addWidget(self.push_button_open)
         h_box_layout.addWidget(self.combo_box_speed)
 
-    def on_check_box_re_changed(self, value):
-        Settings.setValue('use_re', int(value))
-        self.line_edit_re.setEnabled(value)
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.port_scan_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.port_scan_timer.stop()
+
+    def start_port_scan(self):
+        if self.port_scan_thread is None or not self.port_scan_thread.is_alive():
+            self.port_scan_thread = threading.Thread(
+                target=self.scan_ports, daemon=True)
+            self.port_scan_thread.start()
+
+    def scan_ports(self):
+        from serial.tools import list_ports
+
+        self.ports_scanned.emit(
+            sorted(desc.device for desc in list_ports.comports()))
+
+    def on_ports_scanned(self, ports):
+        if ports == self.ports:
+            return
+        first_scan = self.ports is None
+        self.ports = ports
+        text = self.combo_box_port_path.currentText()
+        prev_block = self.combo_box_port_path.blockSignals(True)
+        self.combo_box_port_path.clear()
+        self.combo_box_port_path.addItems(ports)
+        # keep the typed or saved port even if it is unplugged now
+        if text and (text in ports or not first_scan or Settings.value("port_path") is not None):
+            self.combo_box_port_path.setCurrentText(text)
+        self.combo_box_port_path.blockSignals(prev_block)
+
+    def on_parser_changed(self, parser):
+        Settings.setValue('parser', parser)
+        self.line_edit_re.setEnabled(parser == 'regex')
+        self.check_box_time_sync.setEnabled(parser == 'regex')
 
     def on_line_edit_re_changed(self, text):
         Settings.setValue('re', text)
 
+    def on_time_sync_changed(self, value):
+        Settings.setValue('time_sync', int(value))
+
     def on_max_points_changes(self, value):
         Settings.setValue('max_points', value)
 
+    def on_memory_budget_changed(self, value):
+        Settings.setValue('memory_budget', value)
+
+    def on_compact_changed(self, value):
+        Settings.setValue('compact_samples', int(value))
+
+    def on_history_changed(self, value):
+        Settings.setValue('record_history', int(value))
+
     def on_show_only_cmd_response_changes(self, value):
         Settings.setValue('only_cmd_response', int(value))
 
@@ -197,5 +390,20 @@ class SettingFrame(QtWidgets.QFrame):
         speed = self.combo_box_speed.itemData(index)
         Settings.setValue("port_speed", speed)
 
+    def on_queue_size_changed(self, value):
+        Settings.setValue('queue_size', value)
+
+    def on_queue_policy_changed(self, index):
+        Settings.setValue('queue_policy', self.combo_box_queue_policy.itemData(index))
+
+    def on_udp_rcvbuf_changed(self, value):
+        Settings.setValue('udp_rcvbuf', value)
+
+    def on_relay_changed(self, value):
+        Settings.setValue('relay', int(value))
+
+    def on_relay_address_changed(self, text):
+        Settings.setValue('relay_address', text)
+
     def on_string_parsing_changed(self, value):
         Settings.setValue("string_parsing", int(value))
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import struct
+import numpy
+
+# magic, json header length; arrays follow the header, aligned for memory mapping
+SNAPSHOT_HEADER = struct.Struct('<4sI')
+SNAPSHOT_MAGIC = b'GVS1'
+ALIGN = 64
+
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(path, entries, meta):
+    # entries: (channel, times, values, base) as stored by ChannelBuffer.raw()
+    channels = []
+    offset = 0
+    for channel, times, values, base in entries:
+        description = {
+            'name': str(channel), 'int': isinstance(channel, int), 'count': len(times),
+            'base': base, 'times_dtype': times.dtype.str, 'values_dtype': values.dtype.str}
+        description['times_offset'] = offset
+        offset = aligned(offset + times.nbytes)
+        description['values_offset'] = offset
+        offset = aligned(offset + values.nbytes)
+        channels.append(description)
+    header = json.dumps({'meta': meta, 'channels': channels}).encode()
+    data_offset = aligned(SNAPSHOT_HEADER.size + len(header))
+
+    # written aside and renamed, a crash keeps the previous snapshot
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(header)))
+        file.write(header)
+        for (_, times, values, _), description in zip(entries, channels):
+            for array, key in ((times, 'times_offset'), (values, 'values_offset')):
+                file.seek(data_offset + description[key])
+                file.write(numpy.ascontiguousarray(array).tobytes())
+        file.truncate(data_offset + offset)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    # arrays are views of the memory mapped file, nothing is parsed or copied
+    data = numpy.memmap(path, dtype=numpy.uint8, mode='r')
+    magic, header_len = SNAPSHOT_HEADER.unpack(bytes(data[:SNAPSHOT_HEADER.size]))
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a snapshot")
+    header = json.loads(bytes(data[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + header_len]))
+    data_offset = aligned(SNAPSHOT_HEADER.size + header_len)
+    entries = []
+    for description in header['channels']:
+        count = description['count']
+        arrays = []
+        for kind in ('times', 'values'):
+            dtype = numpy.dtype(description[f'{kind}_dtype'])
+            start = data_offset + description[f'{kind}_offset']
+            arrays.append(data[start:start + count * dtype.itemsize].view(dtype))
+        channel = int(description['name']) if description['int'] else description['name']
+        entries.append((channel, arrays[0], arrays[1], description['base']))
+    return entries, header['meta']
@@ -0,0 +1,26 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+
+
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def report(self, file=sys.stderr):
+        print("startup profile:", file=file)
+        prev = self.start
+        for name, mark_time in self.marks:
+            print(f"  {name:<24}{(mark_time - prev) * 1000:9.1f} ms"
+                  f"{(mark_time - self.start) * 1000:9.1f} ms", file=file)
+            prev = mark_time
+
+
+# created on package import, so the first mark includes Qt import time
+startup_profile = StartupProfile()
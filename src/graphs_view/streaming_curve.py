@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import numpy
+import pyqtgraph
+from PyQt5 import QtCore
+
+
+class Segment:
+    __slots__ = ('path', 'x_min', 'x_max', 'y_min', 'y_max')
+
+    def __init__(self, x, y):
+        self.path = pyqtgraph.arrayToQPath(x, y)
+        # time may go backwards, so the ends are not the bounds
+        self.x_min = x.min()
+        self.x_max = x.max()
+        finite = y[numpy.isfinite(y)]
+        self.y_min = finite.min() if len(finite) else numpy.nan
+        self.y_max = finite.max() if len(finite) else numpy.nan
+
+
+class StreamingCurveItem(pyqtgraph.GraphicsObject):
+    # append-only curve: finished segments keep their paths, a frame only builds
+    # the path of the open tail segment. Samples are numbered as in the channel
+    # buffer, segments whose samples left the buffer are dropped by number, so
+    # times that go backwards do not keep them
+    SEGMENT = 1024
+
+    def __init__(self, pen=None):
+        super().__init__()
+        # read by the legend sample
+        self.opts = {'pen': pyqtgraph.mkPen(pen), 'antialias': False}
+        self.segments = []
+        # number of the first sample of the first segment
+        self.first = 0
+        self.tail_x = numpy.empty(0)
+        self.tail_y = numpy.empty(0)
+        self.tail = None
+        self.bounds = None
+
+    def setPen(self, pen):
+        self.opts['pen'] = pyqtgraph.mkPen(pen)
+        self.update()
+
+    def setData(self, x, y, first=0):
+        self.segments = []
+        self.first = first
+        self.tail_x = numpy.empty(0)
+        self.tail_y = numpy.empty(0)
+        self.tail = None
+        self.append(x, y)
+
+    def append(self, x, y):
+        if len(x):
+            self.tail_x = numpy.concatenate((self.tail_x, numpy.asarray(x, dtype='f8')))
+            self.tail_y = numpy.concatenate((self.tail_y, numpy.asarray(y, dtype='f8')))
+            # neighbour segments share a point, so the line is not broken
+            while len(self.tail_x) > self.SEGMENT:
+                self.segments.append(Segment(
+                    self.tail_x[:self.SEGMENT + 1], self.tail_y[:self.SEGMENT + 1]))
+                self.tail_x = self.tail_x[self.SEGMENT:]
+                self.tail_y = self.tail_y[self.SEGMENT:]
+        self.tail = Segment(self.tail_x, self.tail_y) if len(self.tail_x) > 1 else None
+        self.changed()
+
+    def drop_before(self, number):
+        # segments whose last sample is older than the sample `number`
+        count = 0
+        while count < len(self.segments) and self.first + (count + 1) * self.SEGMENT < number:
+            count += 1
+        if count:
+            del self.segments[:count]
+            self.first += count * self.SEGMENT
+            self.changed()
+
+    def all_segments(self):
+        return self.segments + [self.tail] if self.tail else self.segments
+
+    def changed(self):
+        self.prepareGeometryChange()
+        self.bounds = None
+        self.informViewBoundsChanged()
+        self.update()
+
+    def dataBounds(self, ax, frac=1.0, orthoRange=None):
+        segments = self.all_segments()
+        if ax == 0:
+            if not segments:
+                return None, None
+            return (
+                min(segment.x_min for segment in segments),
+                max(segment.x_max for segment in segments))
+        # y bounds of the segments that overlap the visible x range
+        if orthoRange is not None:
+            segments = [
+                segment for segment in segments
+                if segment.x_max >= orthoRange[0] and segment.x_min <= orthoRange[1]]
+        y_min = [segment.y_min for segment in segments if not numpy.isnan(segment.y_min)]
+        y_max = [segment.y_max for segment in segments if not numpy.isnan(segment.y_max)]
+        if not y_min:
+            return None, None
+        return min(y_min), max(y_max)
+
+    def boundingRect(self):
+        if self.bounds is None:
+            x_min, x_max = self.dataBounds(0)
+            y_min, y_max = self.dataBounds(1)
+            if x_min is None or y_min is None:
+                self.bounds = QtCore.QRectF()
+            else:
+                self.bounds = QtCore.QRectF(x_min, y_min, x_max - x_min, y_max - y_min)
+        return self.bounds
+
+    def paint(self, painter, *args):
+        painter.setPen(self.opts['pen'])
+        view = self.viewRect()
+        for segment in self.all_segments():
+            # segments outside the visible x range are skipped
+            if view is not None and (segment.x_max < view.left() or segment.x_min > view.right()):
+                continue
+            painter.drawPath(segment.path)
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import time
+
+
+class LineClock:
+    # bits on the wire per byte for 8N1
+    BITS_PER_BYTE = 10
+    # how fast the expected datagram interval follows the real one
+    DATAGRAM_SMOOTHING = 0.1
+
+    def __init__(self):
+        # wall clock only gives the origin, intervals come from the monotonic clock
+        self.wall_anchor = time.time()
+        self.mono_anchor = time.monotonic_ns()
+        self.last_time = 0.0
+        self.last_datagram_time = None
+        self.datagram_interval = None
+
+    def now(self):
+        return self.wall_anchor + (time.monotonic_ns() - self.mono_anchor) * 1e-9
+
+    def serial_byte_time(self, baudrate):
+        return self.BITS_PER_BYTE / baudrate
+
+    def datagram_byte_time(self, read_time, size):
+        # spread a datagram over the usual interval between datagrams,
+        # but never back past the previous one
+        if self.last_datagram_time is None:
+            gap = 0.0
+        else:
+            gap = max(0.0, read_time - self.last_datagram_time)
+            if self.datagram_interval is None:
+                self.datagram_interval = gap
+            else:
+                self.datagram_interval += self.DATAGRAM_SMOOTHING * (
+                    gap - self.datagram_interval)
+            gap = min(gap, self.datagram_interval)
+        self.last_datagram_time = read_time
+        return gap / size if size else 0.0
+
+    def spread(self, read_time, size, offsets, byte_time):
+        # the last byte of the read arrived at read_time, earlier bytes
+        # arrived one byte_time apart
+        times = []
+        for offset in offsets:
+            packet_time = read_time - (size - offset - 1) * byte_time
+            if packet_time < self.last_time:
+                packet_time = self.last_time
+            self.last_time = packet_time
+            times.append(packet_time)
+        return times
+
+
+class DriftModel:
+    # weight of old samples, about 1000 lines of memory
+    FORGETTING = 0.999
+    # host s, a line this far off the fit is a device clock jump
+    JUMP = 1.0
+    # lines before the fit is trusted for the jump check
+    MIN_LINES = 10
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.origin = None
+        self.last_device_time = None
+        self.sw = self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def map(self, device_time, host_time):
+        # fits host = a * device + b over recent lines and returns the fitted
+        # host time, so device clock regularity is kept in host clock units.
+        # A device clock that goes back (restart, wrap) or jumps starts a new fit
+        if self.origin is not None:
+            fitted = self.fit(device_time)
+            if device_time < self.last_device_time or (
+                    self.sw >= self.MIN_LINES and fitted is not None and
+                    abs(fitted - host_time) > self.JUMP):
+                self.reset()
+        if self.origin is None:
+            self.origin = (device_time, host_time)
+        self.last_device_time = device_time
+        x = device_time - self.origin[0]
+        y = host_time - self.origin[1]
+
+        k = self.FORGETTING
+        self.sw = self.sw * k + 1.0
+        self.sx = self.sx * k + x
+        self.sy = self.sy * k + y
+        self.sxx = self.sxx * k + x * x
+        self.sxy = self.sxy * k + x * y
+
+        fitted = self.fit(device_time)
+        return host_time if fitted is None else fitted
+
+    def fit(self, device_time):
+        # host time of the fitted line, None until the device time has varied
+        mean_x = self.sx / self.sw
+        mean_y = self.sy / self.sw
+        var_x = self.sxx / self.sw - mean_x * mean_x
+        if var_x <= 0.0:
+            return None
+        a = (self.sxy / self.sw - mean_x * mean_y) / var_x
+        return self.origin[1] + mean_y + a * (device_time - self.origin[0] - mean_x)
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import select
+import socket
+import sys
+import time
+
+# largest UDP payload, smaller reads silently truncate datagrams
+MAX_DATAGRAM = 65535
+
+
+class UdpReceiver:
+    # drains every pending datagram of a non-blocking socket per wakeup into one
+    # preallocated arena with recv_into, so a burst costs one select and no
+    # allocation per datagram
+    ARENA = 1 << 20
+    STATS_INTERVAL = 1.0  # s
+
+    def __init__(self, udp_socket, rcvbuf):
+        self.socket = udp_socket
+        self.set_rcvbuf(rcvbuf)
+        self.socket.setblocking(False)
+        # one datagram of room is always left, so none is cut at the end
+        self.arena = bytearray(self.ARENA + MAX_DATAGRAM)
+        self.view = memoryview(self.arena)
+        self.sizes = []
+        self.datagrams = 0
+        self.stats_time = time.monotonic()
+        # the socket is found by its inode in /proc/net/udp
+        self.inode = os.fstat(udp_socket.fileno()).st_ino if sys.platform.startswith('linux') else None
+
+    def set_rcvbuf(self, size):
+        # SO_RCVBUFFORCE goes over net.core.rmem_max, but needs CAP_NET_ADMIN
+        for option in (getattr(socket, 'SO_RCVBUFFORCE', None), socket.SO_RCVBUF):
+            if option is None:
+                continue
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, option, size)
+                break
+            except OSError:
+                pass
+        # linux reports twice the requested size, the half is for bookkeeping
+        self.rcvbuf = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.socket], [], [], timeout)
+        return bool(readable)
+
+    def drain(self):
+        # datagrams are packed one after another, their sizes are in self.sizes
+        self.sizes.clear()
+        position = 0
+        while position < self.ARENA:
+            try:
+                size = self.socket.recv_into(self.view[position:], MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                break
+            # windows reports an ICMP port unreachable of an earlier sendto here
+            except ConnectionResetError:
+                continue
+            if size:
+                self.sizes.append(size)
+                position += size
+        self.datagrams += len(self.sizes)
+        return position
+
+    def receive(self, timeout):
+        # pending datagrams as bytes, empty when nothing came in timeout
+        if not self.wait(timeout):
+            return []
+        self.drain()
+        packets = []
+        position = 0
+        for size in self.sizes:
+            packets.append(bytes(self.view[position:position + size]))
+            position += size
+        return packets
+
+    def receive_stream(self, timeout):
+        # pending datagrams joined as one chunk of the line stream
+        if not self.wait(timeout):
+            return b''
+        return bytes(self.view[:self.drain()])
+
+    def kernel_drops(self):
+        # datagrams the kernel dropped on a full receive buffer, None where unknown
+        if self.inode is None:
+            return None
+        for path in ('/proc/net/udp', '/proc/net/udp6'):
+            try:
+                with open(path) as file:
+                    next(file)
+                    for line in file:
+                        fields = line.split()
+                        if len(fields) >= 13 and int(fields[9]) == self.inode:
+                            return int(fields[12])
+            except (OSError, ValueError, StopIteration):
+                continue
+        return None
+
+    def stats(self):
+        # ('udp_stats', datagrams, kernel drops, receive buffer) once per STATS_INTERVAL
+        now = time.monotonic()
+        if now - self.stats_time < self.STATS_INTERVAL:
+            return None
+        self.stats_time = now
+        return ('udp_stats', self.datagrams, self.kernel_drops(), self.rcvbuf)
@@ -0,0 +1,74 @@
+import queue
+from graphs_view.bounded_queue import BoundedQueue
+
+
+def take_all(bounded_queue):
+    items = []
+    while 1:
+        try:
+            items.append(bounded_queue.get(True, 0.2))
+        except queue.Empty:
+            # a forced packet may still be on its way to the control pipe
+            try:
+                items.append(bounded_queue.control.get(True, 0.2))
+            except queue.Empty:
+                return items
+
+
+def test_drop_oldest():
+    bounded_queue = BoundedQueue(4, BoundedQueue.DROP_OLDEST)
+    for index in range(10):
+        bounded_queue.put((1, index, b''))
+    assert [item[1] for item in take_all(bounded_queue)] == [6, 7, 8, 9]
+    assert bounded_queue.dropped_count() == 6
+
+
+def test_drop_newest():
+    bounded_queue = BoundedQueue(4, BoundedQueue.DROP_NEWEST)
+    for index in range(10):
+        bounded_queue.put((1, index, b''))
+    assert [item[1] for item in take_all(bounded_queue)] == [0, 1, 2, 3]
+    assert bounded_queue.dropped_count() == 6
+
+
+def test_decimate_per_kind():
+    bounded_queue = BoundedQueue(4, BoundedQueue.DECIMATE)
+    for index in range(40):
+        bounded_queue.put((1, index, b''), kind='line')
+        bounded_queue.put(('batch', index), kind='batch')
+    items = take_all(bounded_queue)
+    assert bounded_queue.decimation > 1
+    assert len(items) + bounded_queue.dropped_count() == 80
+    # lines and batches are thinned independently, so both get through
+    assert any(item[0] == 'batch' for item in items)
+    assert any(item[0] == 1 for item in items)
+
+
+def test_decimation_relaxes():
+    bounded_queue = BoundedQueue(8, BoundedQueue.DECIMATE)
+    for index in range(20):
+        bounded_queue.put((1, index, b''), kind='line')
+    assert bounded_queue.decimation > 1
+    take_all(bounded_queue)
+    # the consumer keeps up now
+    for index in range(64):
+        bounded_queue.put((1, index, b''), kind='line')
+        while bounded_queue.queue.qsize():
+            bounded_queue.get(True, 1)
+    assert bounded_queue.decimation == 1
+
+
+def test_forced_packets_are_never_lost():
+    for policy in BoundedQueue.POLICIES.values():
+        bounded_queue = BoundedQueue(4, policy)
+        bounded_queue.put(('port_opened', 1), force=True)
+        for index in range(50):
+            bounded_queue.put((1, index, b''), kind='line')
+            if index % 10 == 0:
+                bounded_queue.put(('parser_stats', index, 0, 0.0), force=True)
+        bounded_queue.put(('port_closed', 1, None), force=True)
+        events = [item for item in take_all(bounded_queue) if isinstance(item[0], str)]
+        assert events == (
+            [('port_opened', 1)] +
+            [('parser_stats', index, 0, 0.0) for index in range(0, 50, 10)] +
+            [('port_closed', 1, None)]), policy
@@ -0,0 +1,40 @@
+import numpy
+from graphs_view.capture import CaptureWriter, CaptureSession
+
+
+def write_capture(path, times, values):
+    writer = CaptureWriter(str(path))
+    writer.BLOCK_SAMPLES = 10
+    for start in range(0, len(times), 7):
+        writer.write({0: (times[start:start + 7], values[start:start + 7])})
+    writer.flush()
+    writer.close()
+    return CaptureSession(str(path))
+
+
+def test_find_crossings(tmp_path):
+    times = numpy.arange(100.0)
+    # above 0.5 in [10, 40) and [70, 75)
+    values = numpy.zeros(100)
+    values[10:40] = 1
+    values[70:75] = 1
+    session = write_capture(tmp_path / 'a.gvcap', times, values)
+    assert session.find('0', 0.5, -1) == 10
+    # inside a region past the threshold the next crossing is the next region
+    assert session.find('0', 0.5, 10) == 70
+    assert session.find('0', 0.5, 20) == 70
+    assert session.find('0', 0.5, 70) is None
+    assert session.find('0', 0.5, 10, above=False) == 40
+    assert session.find('0', 0.5, 40, above=False) == 75
+
+
+def test_find_crossing_at_block_edge(tmp_path):
+    times = numpy.arange(30.0)
+    values = numpy.zeros(30)
+    # the first block ends above the threshold, the second starts above it
+    values[9:12] = 1
+    values[20] = 1
+    session = write_capture(tmp_path / 'b.gvcap', times, values)
+    assert session.find('0', 0.5, -1) == 9
+    assert session.find('0', 0.5, 9) == 20
+    assert session.find('0', 0.5, 9.5) == 20
@@ -0,0 +1,62 @@
+import numpy
+from graphs_view.channel_buffer import ChannelBuffer, ChannelStore
+
+
+def test_append_to_full_buffer():
+    buffer = ChannelBuffer(100, compact=True)
+    buffer.append(numpy.arange(100) * 0.01, numpy.arange(100))
+    buffer.append(numpy.arange(100, 150) * 0.01, numpy.arange(100, 150))
+    times, values = buffer.data()
+    assert len(buffer) == 100
+    assert numpy.array_equal(values, numpy.arange(50, 150))
+    assert numpy.allclose(times, numpy.arange(50, 150) * 0.01)
+
+
+def test_since_reader_behind_retained_samples():
+    store = ChannelStore(100, 1 << 20)
+    store.add({0: (numpy.arange(10.0), numpy.arange(10.0))})
+    generation, total, _, _, _, reset = store.since(0, None, 0)
+    assert reset
+    generation, total, times, _, _, reset = store.since(0, generation, total)
+    assert not reset and not len(times)
+    # more than the capacity between two reads, the buffer is not refilled
+    for start in range(10, 250, 40):
+        store.add({0: (numpy.arange(start, start + 40.0), numpy.arange(start, start + 40.0))})
+    generation, total, times, _, _, reset = store.since(0, generation, total)
+    assert reset
+    assert numpy.array_equal(times, numpy.arange(150.0, 250.0))
+
+
+def test_compact_long_stream():
+    # two hours at 100 Hz, four times the int32 microseconds range
+    buffer = ChannelBuffer(10000, compact=True)
+    start = 1.7e9
+    for second in range(0, 7200, 10):
+        times = start + second + numpy.arange(1000) * 0.01
+        buffer.append(times, numpy.ones(1000))
+        assert buffer.times_array.dtype == numpy.int32
+    times, _ = buffer.data()
+    expected = start + 7200 - 100 + numpy.arange(10000) * 0.01
+    assert numpy.abs(times - expected).max() < 1e-6
+
+
+def test_compact_time_going_backwards():
+    buffer = ChannelBuffer(100, compact=True)
+    buffer.append(numpy.arange(100.0, 200.0), numpy.ones(100))
+    buffer.append(numpy.arange(50.0, 90.0), numpy.ones(40))
+    assert buffer.times_array.dtype == numpy.int32
+    times, _ = buffer.data()
+    assert numpy.array_equal(times, numpy.concatenate((numpy.arange(140.0, 200.0), numpy.arange(50.0, 90.0))))
+
+
+def test_compact_returns_to_int32():
+    buffer = ChannelBuffer(100, compact=True)
+    buffer.append(numpy.arange(10.0), numpy.ones(10))
+    # an hour later, more than the int32 range from the base
+    buffer.append(3600 + numpy.arange(10.0), numpy.ones(10))
+    assert buffer.times_array.dtype == numpy.float64
+    for start in range(3610, 3800, 10):
+        buffer.append(start + numpy.arange(10.0), numpy.ones(10))
+    assert buffer.times_array.dtype == numpy.int32
+    times, _ = buffer.data()
+    assert numpy.allclose(times, numpy.arange(3700.0, 3800.0), rtol=0, atol=1e-6)
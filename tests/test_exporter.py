@@ -0,0 +1,55 @@
+import csv
+import numpy
+from graphs_view.capture import CaptureWriter
+from graphs_view.channel_buffer import ChannelStore
+from graphs_view.exporter import Exporter, StoreSource, CaptureSource
+
+
+def export(source, path):
+    exporter = Exporter(source, str(path))
+    errors = []
+    exporter.failed.connect(errors.append)
+    exporter.run()
+    assert errors == []
+
+
+def test_npz_of_the_store(tmp_path):
+    store = ChannelStore(100000, 1 << 24, compact=True)
+    times = 1.7e9 + numpy.arange(70000) * 0.001
+    store.add({0: (times, numpy.sin(times)), 'b': (times[:10], times[:10] * 0)})
+    source = StoreSource(store, [0, 'b'])
+    export(source, tmp_path / 'a.npz')
+    with numpy.load(tmp_path / 'a.npz') as archive:
+        assert sorted(archive.files) == ['time_0', 'time_b', 'value_0', 'value_b']
+        assert numpy.array_equal(archive['time_0'], store.data(0)[0])
+        assert numpy.array_equal(archive['value_0'], store.data(0)[1])
+        assert len(archive['time_b']) == 10
+
+
+def test_npz_of_a_capture(tmp_path):
+    writer = CaptureWriter(str(tmp_path / 'c.gvcap'))
+    times = numpy.arange(10000.0)
+    for start in range(0, 10000, 1000):
+        writer.write({
+            'x': (times[start:start + 1000], times[start:start + 1000]),
+            'y': (times[start:start + 1000], -times[start:start + 1000])})
+    writer.flush()
+    writer.close()
+    export(CaptureSource(str(tmp_path / 'c.gvcap')), tmp_path / 'c.npz')
+    with numpy.load(tmp_path / 'c.npz') as archive:
+        assert numpy.array_equal(archive['time_x'], times)
+        assert numpy.array_equal(archive['value_y'], -times)
+
+
+def test_csv_round_trip(tmp_path):
+    store = ChannelStore(100, 1 << 20)
+    times = 1.7e9 + numpy.arange(5) * 0.0123456789
+    values = numpy.array([1 / 3, 1e-300, -2.5, 1e17 + 1, 0.1])
+    store.add({'50% "duty", a': (times, values)})
+    export(StoreSource(store, ['50% "duty", a']), tmp_path / 'a.csv')
+    with open(tmp_path / 'a.csv', newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ['channel', 'time', 'value']
+    assert all(row[0] == '50% "duty", a' for row in rows[1:])
+    assert numpy.array_equal([float(row[1]) for row in rows[1:]], times)
+    assert numpy.array_equal([float(row[2]) for row in rows[1:]], values)
@@ -0,0 +1,36 @@
+import queue
+from graphs_view.ingestor import Ingestor
+
+
+def test_drain_keeps_every_packet():
+    ingestor = Ingestor(None)
+    ingestor.MAX_DRAIN = 5
+    out_queue = queue.Queue()
+    for index in range(12):
+        out_queue.put((1, float(index), f'line{index}'.encode()))
+    lines = []
+    while not out_queue.empty():
+        ingestor.drain(out_queue, out_queue.get_nowait(), {}, lines)
+    assert [line for _, line in lines] == [f'line{index}'.encode() for index in range(12)]
+
+
+def test_drain_passes_events_on():
+    ingestor = Ingestor(None)
+    ingestor.MAX_DRAIN = 2
+    events = []
+    ingestor.event_received.connect(events.append)
+    out_queue = queue.Queue()
+    out_queue.put((1, 0.0, b'a'))
+    out_queue.put(('port_closed', 1, None))
+    lines = []
+    ingestor.drain(out_queue, out_queue.get_nowait(), {}, lines)
+    assert events == [('port_closed', 1, None)]
+
+
+def test_drain_lines_packet():
+    ingestor = Ingestor(None)
+    out_queue = queue.Queue()
+    out_queue.put(('lines', [1.0, 2.0], [b'a', b'b']))
+    lines = []
+    ingestor.drain(out_queue, out_queue.get_nowait(), {}, lines)
+    assert lines == [(1.0, b'a'), (2.0, b'b')]
@@ -0,0 +1,91 @@
+import random
+import re
+import pytest
+from graphs_view.line_store import LineStore
+
+WORDS = ['alpha', 'Alphabet', 'beta', 'gamma_2', 'delta', 'temp=12', 'ERR', 'rare']
+QUERIES = ['alpha', 'ALPHA', 'lph', 'alp', 'pha', 'bet', 'alpha beta', 'gamma_2', 'a_2',
+           'temp=1', '=', 'err', 'rare', 'missing']
+
+
+def make_lines(count, seed=1):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(count):
+        words = rng.choices(WORDS[:-1], k=rng.randint(0, 5))
+        if rng.random() < 0.02:
+            words.append('rare')
+        lines.append(' '.join(words).encode() + b'\n')
+    return lines
+
+
+def brute_force(lines, first, text, regex=False, case=False, start=0):
+    if regex:
+        pattern = re.compile(text.encode(), 0 if case else re.IGNORECASE)
+        found = lambda line: pattern.search(line)
+    elif case:
+        found = lambda line: text.encode() in line
+    else:
+        found = lambda line: text.encode().lower() in line.lower()
+    return [
+        number for number in range(max(start, first), len(lines))
+        if found(lines[number].rstrip(b'\n'))]
+
+
+def check(store, lines, start=0):
+    for scan_ratio in (0.0, 0.1, 1.0):
+        store.SCAN_RATIO = scan_ratio
+        for text in QUERIES:
+            for case in (False, True):
+                assert list(store.search(text, case=case, start=start)) == \
+                    brute_force(lines, store.first, text, case=case, start=start), (text, case)
+    for text in (r'temp=\d+', r'^err', r'a\b', r'gamma_\d beta'):
+        for case in (False, True):
+            assert list(store.search(text, regex=True, case=case, start=start)) == \
+                brute_force(lines, store.first, text, True, case, start), (text, case)
+
+
+@pytest.mark.parametrize('indexed', [0, 150, 10 ** 6])
+def test_search_matches_brute_force(indexed):
+    lines = make_lines(400)
+    store = LineStore()
+    store.feed_lines(lines[:200], [0.0] * 200)
+    for line in lines[200:]:
+        # lines split across chunks
+        store.feed(line[:3], 1.0)
+        store.feed(line[3:], 1.0)
+    store.index(indexed)
+    assert len(store) == len(lines)
+    check(store, lines)
+    check(store, lines, start=123)
+
+
+def test_search_open_last_line():
+    lines = make_lines(50)
+    store = LineStore()
+    store.feed_lines(lines, [0.0] * len(lines))
+    store.feed(b'alpha rare', 1.0)
+    store.index(10 ** 6)
+    assert store.indexed == len(lines)
+    assert store.unindexed() is False
+    assert list(store.search('rare'))[-1] == len(lines)
+    store.feed(b' beta\n', 1.0)
+    assert store.unindexed()
+    check(store, lines + [b'alpha rare beta\n'])
+
+
+def test_search_after_eviction():
+    lines = make_lines(3000, seed=2)
+    store = LineStore()
+    store.MAX_BYTES = 4096
+    for position in range(0, len(lines), 100):
+        store.feed_lines(lines[position:position + 100], [float(position)] * 100)
+        store.index(60)
+    assert store.first > 0
+    assert len(store.data) <= store.MAX_BYTES
+    assert store.line(store.first) == lines[store.first].rstrip(b'\n')
+    assert all(posting[0] >= store.first for posting in store.postings.values())
+    check(store, lines)
+    check(store, lines, start=store.first + 7)
+    store.index(10 ** 6)
+    check(store, lines)
@@ -0,0 +1,72 @@
+from graphs_view.parsers import CsvParser, WhitespaceParser
+
+
+def test_csv_header_and_rows():
+    parser = CsvParser({})
+    results = parser.parse([0.0, 1.0, 2.0], [b'x,y', b'1,2', b'3, 4'])
+    assert results == {'x': ([1.0, 2.0], [1.0, 3.0]), 'y': ([1.0, 2.0], [2.0, 4.0])}
+    assert parser.errors == 0
+
+
+def test_csv_text_after_data_is_not_a_header():
+    parser = CsvParser({})
+    parser.parse([0.0, 1.0], [b'x,y', b'1,2'])
+    results = parser.parse(
+        [2.0, 3.0, 4.0], [b'RE set,/motor/enable,0', b'booting', b'5,6'])
+    assert parser.header == ['x', 'y']
+    assert results == {'x': ([4.0], [5.0]), 'y': ([4.0], [6.0])}
+    assert parser.errors == 2
+
+
+def test_csv_new_header_with_the_same_layout():
+    parser = CsvParser({})
+    parser.parse([0.0, 1.0], [b'x,y', b'1,2'])
+    results = parser.parse([2.0, 3.0], [b'a;b', b'7;8'])
+    assert results == {'a': ([3.0], [7.0]), 'b': ([3.0], [8.0])}
+
+
+def whitespace_parse(lines, small):
+    # the same lines through the per-line path and the loadtxt path
+    parser = WhitespaceParser({})
+    parser.SMALL_BATCH = len(lines) + 1 if small else 0
+    results = parser.parse([float(time) for time in range(len(lines))], lines)
+    return {
+        channel: (list(map(float, times)), list(map(float, values)))
+        for channel, (times, values) in results.items()}, parser.errors
+
+
+def test_whitespace_uniform():
+    lines = [b'1 2 3', b'4\t5 6', b' 7 8 9 ']
+    for small in (True, False):
+        assert whitespace_parse(lines, small) == ({
+            0: ([0.0, 1.0, 2.0], [1.0, 4.0, 7.0]),
+            1: ([0.0, 1.0, 2.0], [2.0, 5.0, 8.0]),
+            2: ([0.0, 1.0, 2.0], [3.0, 6.0, 9.0])}, 0)
+
+
+def test_whitespace_ragged_rows():
+    lines = [b'1 2', b'3', b'4 5 6', b'', b'7 8']
+    for small in (True, False):
+        assert whitespace_parse(lines, small) == ({
+            0: ([0.0, 1.0, 2.0, 4.0], [1.0, 3.0, 4.0, 7.0]),
+            1: ([0.0, 2.0, 4.0], [2.0, 5.0, 8.0]),
+            2: ([2.0], [6.0])}, 0)
+
+
+def test_whitespace_comment_and_bad_lines():
+    lines = [b'1 2', b'# temperature humidity', b'3 x', b'4 5', b'nan 6']
+    for small in (True, False):
+        results, errors = whitespace_parse(lines, small)
+        assert errors == 2
+        assert results[0][0] == [0.0, 3.0, 4.0]
+        assert results[1] == ([0.0, 3.0, 4.0], [2.0, 5.0, 6.0])
+
+
+def test_whitespace_small_batch_threshold():
+    parser = WhitespaceParser({})
+    lines = [b'1 2'] * WhitespaceParser.SMALL_BATCH
+    # below the threshold values are python lists, from it numpy columns
+    assert isinstance(parser.parse([0.0] * (len(lines) - 1), lines[1:])[0][1], list)
+    results = parser.parse([0.0] * len(lines), lines)
+    assert results[0][0] is results[1][0]
+    assert list(results[1][1]) == [2.0] * len(lines)
@@ -0,0 +1,23 @@
+from graphs_view.parsers import WhitespaceParser
+from graphs_view.pipeline import ReaderPipeline
+from graphs_view.sender import Sender
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, force=False, kind=None):
+        self.items.append(item)
+
+
+def test_one_packet_of_lines_and_one_batch_per_read():
+    out_queue = ListQueue()
+    pipeline = ReaderPipeline(out_queue, Sender(lambda data: None, None, out_queue), WhitespaceParser({}))
+    pipeline.feed_lines(b'1 2\n3 4\n5 6\n', 10.0, 0.0)
+    kinds = [item[0] for item in out_queue.items if item[0] != 'parser_stats']
+    assert kinds == ['lines', 'batch']
+    _, times, lines = out_queue.items[0]
+    assert lines == [b'1 2', b'3 4', b'5 6'] and len(times) == 3
+    # the first line of the stream may be cut, it is shown but not parsed
+    assert out_queue.items[1][1][0] == ([10.0, 10.0], [3.0, 5.0])
@@ -0,0 +1,112 @@
+import pytest
+from graphs_view.parsers import RegexParser
+from graphs_view.pipeline import ReaderPipeline
+from graphs_view.rules import RuleEngine, parse_rules
+from graphs_view.sender import Sender
+
+
+class ListQueue:
+    def __init__(self):
+        self.items = []
+
+    def put(self, item, force=False, kind=None):
+        self.items.append(item)
+
+
+class FakeSender:
+    def __init__(self):
+        self.sent = []
+        self.out_queue = ListQueue()
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def engine(text, line_ending=b'\n'):
+    sender = FakeSender()
+    rules = RuleEngine(sender)
+    rules.configure(parse_rules(text, line_ending))
+    return rules, sender
+
+
+def test_parse_rules():
+    rules = parse_rules(
+        '# comment\n\n0 > 1 -> a\n@holdoff 0.5\nmean(x, 2) <= -1.5 -> b {value}\nrate(1) < 0 -> c')
+    assert [(rule['kind'], rule['channel'], rule['window'], rule['op'], rule['threshold'],
+             rule['holdoff']) for rule in rules] == [
+        ('value', 0, None, '>', 1.0, 0.0),
+        ('mean', 'x', 2.0, '<=', -1.5, 0.5),
+        ('rate', 1, None, '<', 0.0, 0.5)]
+
+
+@pytest.mark.parametrize('text, error', [
+    ('0 > 1', 'line 1: expected'),
+    ('# ok\n@delay 1', 'line 2: unknown directive @delay'),
+    ('mean(0) > 1 -> a', 'line 1: mean needs a window'),
+    ('rate(0, 0) > 1 -> a', 'line 1: the window must be positive'),
+    ('0 > x -> a', 'line 1: could not convert'),
+    ('0 > 1 -> a {speed}', "line 1: unknown field 'speed'"),
+])
+def test_parse_rules_errors(text, error):
+    with pytest.raises(ValueError, match=error):
+        parse_rules(text)
+
+
+def test_value_fires_on_rising_edges_across_batches():
+    rules, sender = engine('0 > 1 -> hit {value:g} at {time:g}')
+    rules.evaluate({0: ([0.0, 1.0, 2.0], [0.0, 2.0, 3.0])}, 2.0, lambda: 2.0)
+    # still above the threshold at the start of the next batch: no new edge
+    rules.evaluate({0: ([3.0, 4.0, 5.0], [5.0, 0.0, 2.0])}, 5.0, lambda: 5.0)
+    # other channels and empty batches are ignored
+    rules.evaluate({1: ([6.0], [9.0]), 0: ([], [])}, 6.0, lambda: 6.0)
+    assert sender.sent == [b'hit 2 at 1\n', b'hit 2 at 5\n']
+
+
+def test_holdoff():
+    rules, sender = engine('@holdoff 2\n0 > 0 -> go')
+    values = [1.0, 0.0] * 5
+    rules.evaluate({0: (list(map(float, range(10))), values)}, 9.0, lambda: 9.0)
+    # edges at 0, 2, 4, 6, 8, only those 2 s apart of the last firing count
+    assert [event[3] for event in sender.out_queue.items] == [0.0, 2.0, 4.0, 6.0, 8.0]
+    rules, sender = engine('@holdoff 3\n0 > 0 -> go')
+    rules.evaluate({0: (list(map(float, range(10))), values)}, 9.0, lambda: 9.0)
+    assert [event[3] for event in sender.out_queue.items] == [0.0, 4.0, 8.0]
+
+
+def test_mean_window_spans_batches():
+    rules, sender = engine('mean(0, 2.5) >= 2 -> m {value}')
+    rules.evaluate({0: ([0.0, 1.0], [0.0, 1.0])}, 1.0, lambda: 1.0)
+    assert sender.sent == []
+    # the window at 2.0 holds 0, 1, 2 and at 3.0 holds 1, 2, 3
+    rules.evaluate({0: ([2.0, 3.0], [2.0, 3.0])}, 3.0, lambda: 3.0)
+    assert sender.sent == [b'm 2.0\n']
+
+
+def test_rate_across_batches():
+    rules, sender = engine('rate(0) > 1 -> r {value} {channel}', b'\r\n')
+    rules.evaluate({0: ([0.0, 1.0], [0.0, 0.5])}, 1.0, lambda: 1.0)
+    # the first sample of a batch is compared with the last of the previous one
+    rules.evaluate({0: ([2.0], [4.5])}, 2.0, lambda: 2.0)
+    assert sender.sent == [b'r 4.0 0\r\n']
+
+
+def test_event_is_queued_after_the_command():
+    rules, sender = engine('x < 0 -> stop')
+    rules.evaluate({'x': ([7.0], [-1.0])}, 10.0, lambda: 10.25)
+    assert sender.sent == [b'stop\n']
+    assert sender.out_queue.items == [('rule', 0, 'x < 0 -> stop', 7.0, -1.0, b'stop\n', 0.25)]
+
+
+def test_reaction_is_measured_on_the_host_clock():
+    # the line carries device time in ms, the reaction must not mix it with host time
+    out_queue = ListQueue()
+    sender = Sender(lambda data: None, None, out_queue)
+    sender.rules.configure(parse_rules('0 > 1 -> stop'))
+    pipeline = ReaderPipeline(
+        out_queue, sender, RegexParser({'pattern': r'v:(\d+) t:(?P<time>\d+)'}))
+    read_time = pipeline.now()
+    pipeline.feed_lines(b'\nv:0 t:500\nv:5 t:510\n', read_time, 0.0)
+    events = [item for item in out_queue.items if item[0] == 'rule']
+    assert len(events) == 1
+    assert events[0][3] == 510.0
+    assert 0.0 <= events[0][6] < 1.0
@@ -0,0 +1,37 @@
+import numpy
+import pyqtgraph
+from graphs_view.channel_buffer import ChannelStore
+from graphs_view.streaming_curve import StreamingCurveItem
+
+app = pyqtgraph.mkQApp()
+
+
+def follow(store, curve, state):
+    # what the display does every frame
+    generation, total, times, values, first, reset = store.since(0, *state)
+    if reset:
+        curve.setData(times, values, first)
+    else:
+        curve.append(times, values)
+        curve.drop_before(first)
+    return generation, total
+
+
+def test_curve_follows_time_going_backwards():
+    store = ChannelStore(40, 1 << 20)
+    curve = StreamingCurveItem()
+    curve.SEGMENT = 4
+    state = (None, 0)
+    # a device reset: times restart from 0 twice
+    times = numpy.concatenate((numpy.arange(100.0, 130.0), numpy.arange(30.0), numpy.arange(50.0)))
+    for start in range(0, len(times), 3):
+        store.add({0: (times[start:start + 3], times[start:start + 3])})
+        state = follow(store, curve, state)
+        retained, _ = store.data(0)
+        x_min, x_max = curve.dataBounds(0)
+        assert x_min <= retained.min() and x_max >= retained.max()
+        # no more than a segment of samples that left the buffer
+        assert len(curve.segments) * curve.SEGMENT <= len(retained) + curve.SEGMENT
+    # the dropped samples, up to a segment, are gone from the bounds too
+    x_min, x_max = curve.dataBounds(0)
+    assert 10.0 - curve.SEGMENT <= x_min <= 10.0 and x_max == 49.0
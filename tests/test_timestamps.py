@@ -0,0 +1,72 @@
+import random
+import pytest
+from graphs_view.timestamps import DriftModel, LineClock
+
+
+def test_spread_over_bytes():
+    clock = LineClock()
+    byte_time = clock.serial_byte_time(115200)
+    times = clock.spread(10.0, 30, [0, 10, 20], byte_time)
+    assert times == pytest.approx([10.0 - 29 * byte_time, 10.0 - 19 * byte_time, 10.0 - 9 * byte_time])
+
+
+def test_spread_never_goes_back():
+    clock = LineClock()
+    first = clock.spread(10.0, 10, [0, 5], 0.01)
+    # a later read with a long spread would start before the last line
+    second = clock.spread(10.02, 100, [0, 50], 0.01)
+    times = first + second
+    assert times == sorted(times)
+    assert second[0] == first[-1]
+
+
+def test_datagram_byte_time():
+    clock = LineClock()
+    assert clock.datagram_byte_time(1.0, 100) == 0.0
+    assert clock.datagram_byte_time(1.1, 100) == pytest.approx(0.001)
+    # a long pause is not spread over, the usual interval is
+    assert clock.datagram_byte_time(5.0, 100) == pytest.approx((0.1 + 0.1 * (3.9 - 0.1)) / 100)
+
+
+def drifting(model, count, start=0.0, offset=100.0, rate=1.01, jitter=0.005, seed=1):
+    # device clock 1% slow against the host, host times with read jitter
+    rng = random.Random(seed)
+    mapped = []
+    for index in range(count):
+        device_time = start + index * 0.01
+        host_time = offset + device_time * rate + rng.uniform(0.0, jitter)
+        mapped.append((device_time, model.map(device_time, host_time)))
+    return mapped
+
+
+def test_drift_fit_follows_a_linear_drift():
+    model = DriftModel()
+    mapped = drifting(model, 3000)
+    for device_time, host_time in mapped[-1000:]:
+        # the jitter is averaged out, the mean of it is in the offset
+        assert host_time == pytest.approx(100.0025 + device_time * 1.01, abs=0.001)
+    steps = [b - a for (_, a), (_, b) in zip(mapped[-100:], mapped[-99:])]
+    assert steps == pytest.approx([0.0101] * 99, rel=1e-3)
+
+
+def test_drift_fit_resets_when_the_device_clock_goes_back():
+    model = DriftModel()
+    drifting(model, 1000)
+    # device restarted, its clock starts over while the host clock goes on
+    mapped = drifting(model, 1000, offset=200.0)
+    assert model.origin[0] == 0.0
+    assert mapped[0][1] == pytest.approx(200.0, abs=0.005)
+    assert mapped[-1][1] == pytest.approx(200.0025 + 9.99 * 1.01, abs=0.001)
+
+
+def test_drift_fit_resets_when_the_device_clock_jumps():
+    model = DriftModel()
+    drifting(model, 1000)
+    # the device clock jumps an hour ahead, the host clock does not
+    mapped = drifting(model, 1000, start=3600.0, offset=10.0 - 3600.0 * 1.01)
+    assert model.origin[0] == 3600.0
+    assert mapped[-1][1] == pytest.approx(10.0025 + 9.99 * 1.01, abs=0.001)
+    # small jitter alone does not reset
+    model = DriftModel()
+    drifting(model, 1000, jitter=0.5)
+    assert model.origin[0] == 0.0